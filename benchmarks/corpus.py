@@ -0,0 +1,104 @@
+"""
+Synthetic documents for the benchmarks: research-paper-shaped PDFs and DOCX files of a chosen
+length, with the usual section headings so section detection and map-reduce paths are exercised.
+PDFs are written directly (no extra dependency); DOCX files use python-docx.
+"""
+import os
+import random
+
+SECTIONS = ["Abstract", "1. Introduction", "2. Literature Review", "3. Methodology", "4. Results",
+            "5. Conclusion", "References"]
+
+WORDS = (
+    "public debt infrastructure investment water supply sanitation growth fiscal policy panel data "
+    "regression estimation instrument variable countries effect significant coefficient model results "
+    "evidence capital spending output employment elasticity sample period analysis robust specification"
+).split()
+
+
+def _sentence(rng, words=14):
+    return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize() + "."
+
+
+def synthetic_lines(pages, lines_per_page=45, seed=0):
+    """Returns the text lines of a synthetic paper, spreading the section headings over the pages."""
+    rng = random.Random(seed)
+    total_lines = pages * lines_per_page
+    heading_every = max(1, total_lines // len(SECTIONS))
+    lines = [f"Synthetic Paper {seed}: Public Debt and Infrastructure", "A. Author, B. Author (2021)"]
+    section = 0
+    while len(lines) < total_lines:
+        if (len(lines) - 2) % heading_every == 0 and section < len(SECTIONS):
+            lines.append(SECTIONS[section])
+            section += 1
+        else:
+            lines.append(_sentence(rng, 12))
+    return lines
+
+
+def _escape_pdf_text(text):
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def write_synthetic_pdf(path, pages, lines_per_page=45, seed=0):
+    """Writes a plain-text PDF with 'pages' pages of synthetic paper text."""
+    lines = synthetic_lines(pages, lines_per_page, seed)
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        None, # Pages object, filled in once the page object numbers are known
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    page_refs = []
+    for page in range(pages):
+        page_lines = lines[page * lines_per_page:(page + 1) * lines_per_page]
+        stream = "BT /F1 10 Tf 12 TL 50 780 Td " + " ".join(
+            f"({_escape_pdf_text(line)}) Tj T*" for line in page_lines
+        ) + " ET"
+        stream_bytes = stream.encode("latin-1")
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream_bytes) + stream_bytes + b"\nendstream")
+        content_ref = len(objects)
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % content_ref
+        )
+        page_refs.append(len(objects))
+    objects[1] = b"<< /Type /Pages /Kids [" + b" ".join(b"%d 0 R" % ref for ref in page_refs) + \
+        b"] /Count %d >>" % pages
+
+    output = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(output))
+        output += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref_offset = len(output)
+    output += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        output += b"%010d 00000 n \n" % offset
+    output += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%EOF\n" % (len(objects) + 1, xref_offset)
+    with open(path, "wb") as f:
+        f.write(output)
+    return path
+
+
+def write_synthetic_docx(path, pages, lines_per_page=45, seed=0):
+    """Writes a DOCX with roughly 'pages' pages of synthetic paper text."""
+    import docx
+
+    document = docx.Document()
+    for line in synthetic_lines(pages, lines_per_page, seed):
+        document.add_paragraph(line)
+    document.save(path)
+    return path
+
+
+def build_corpus(directory, page_counts=(5, 50, 200), copies=1, include_docx=True):
+    """Writes synthetic PDFs (and DOCX files) of each page count into 'directory'. Returns their paths."""
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for pages in page_counts:
+        for copy in range(copies):
+            seed = pages * 1000 + copy
+            paths.append(write_synthetic_pdf(os.path.join(directory, f"synthetic_{pages}p_{copy}.pdf"), pages, seed=seed))
+            if include_docx:
+                paths.append(write_synthetic_docx(os.path.join(directory, f"synthetic_{pages}p_{copy}.docx"), pages, seed=seed))
+    return paths
@@ -0,0 +1,167 @@
+"""
+Local stand-in for the LLM, for offline benchmarks and development without a Gemini key.
+
+Usage (from the repository root):
+    python -m benchmarks.mock_llm_server [--port 8900] [--latency-ms 800] [--latency-jitter-ms 200]
+                                         [--error-rate 0.0] [--rate-limit-rate 0.0] [--responses FILE]
+
+Speaks the protocol of src.backends.HTTPBackend: POST /generate with {"model", "system_instruction",
+"prompt"} returns {"text": "..."}. Review prompts get a canned ResearchPaperData JSON object (from
+--responses, a JSON list of objects, or a built-in default); map-step prompts get plain-text notes,
+and packed prompts get a JSON array with one object per 'paper_key'.
+--error-rate answers that share of requests with HTTP 500, --rate-limit-rate with HTTP 429 and a
+Retry-After header. GET /stats returns request counters. To point the API at it, set
+"model_backend": "http" and "model_backend_url": "http://127.0.0.1:8900" in config.json.
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_RESPONSE = {
+    "title_of_paper": "Benchmark Paper",
+    "author": "Mock Author",
+    "year_of_publication": "2020",
+    "country_of_publication": "N/A",
+    "research_objective": "Stand-in objective returned by the mock LLM server",
+    "independent_variable_or_cause": "N/A",
+    "dependent_variable_or_effect": "N/A",
+    "estimation_techniques": "OLS",
+    "theory": "N/A",
+    "methods": "N/A",
+    "findings": "N/A",
+    "recommendations": "N/A",
+    "research_gap": "N/A",
+    "references": "N/A",
+    "remarks": "Generated by benchmarks/mock_llm_server.py"
+}
+
+MAP_NOTES = "Notes: the excerpt discusses the research objective, data and estimation techniques. " * 5
+
+
+class MockLLMState:
+    def __init__(self, latency_ms, latency_jitter_ms, error_rate, rate_limit_rate, responses, seed=None):
+        self.latency_ms = latency_ms
+        self.latency_jitter_ms = latency_jitter_ms
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.responses = responses or [DEFAULT_RESPONSE]
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.counters = {"requests": 0, "ok": 0, "errors": 0, "rate_limited": 0, "prompt_chars": 0}
+
+    def count(self, name, amount=1):
+        with self.lock:
+            self.counters[name] += amount
+
+    def draw(self):
+        """Returns (latency_seconds, outcome) for one request; outcome is 'ok', 'error' or 'rate_limited'."""
+        with self.lock:
+            latency = max(0.0, self.random.gauss(self.latency_ms, self.latency_jitter_ms)) / 1000.0
+            roll = self.random.random()
+            response = self.random.choice(self.responses)
+        if roll < self.rate_limit_rate:
+            return latency, "rate_limited", response
+        if roll < self.rate_limit_rate + self.error_rate:
+            return latency, "error", response
+        return latency, "ok", response
+
+
+def make_handler(state):
+    class MockLLMHandler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass # Keep benchmark output clean
+
+        def _send_json(self, status, payload, headers=None):
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == "/stats":
+                with state.lock:
+                    self._send_json(200, dict(state.counters))
+            else:
+                self._send_json(404, {"error": "not found"})
+
+        def do_POST(self):
+            if self.path != "/generate":
+                self._send_json(404, {"error": "not found"})
+                return
+            length = int(self.headers.get("Content-Length", 0))
+            payload = json.loads(self.rfile.read(length) or b"{}")
+            prompt = payload.get("prompt", "")
+            state.count("requests")
+            state.count("prompt_chars", len(prompt))
+
+            latency, outcome, response = state.draw()
+            time.sleep(latency)
+            if outcome == "rate_limited":
+                state.count("rate_limited")
+                self._send_json(429, {"error": "quota exceeded"}, headers={"Retry-After": "1"})
+            elif outcome == "error":
+                state.count("errors")
+                self._send_json(500, {"error": "injected failure"})
+            else:
+                state.count("ok")
+                # Map-step prompts ask for notes rather than the JSON review; packed prompts for an array.
+                packed_keys = re.findall(r"=== PAPER paper_key=(\S+) ===", prompt)
+                if packed_keys:
+                    text = json.dumps([{"paper_key": key, **response} for key in packed_keys])
+                elif "Write concise notes" in prompt:
+                    text = MAP_NOTES
+                else:
+                    text = json.dumps(response)
+                self._send_json(200, {"text": text})
+
+    return MockLLMHandler
+
+
+def start_server(host="127.0.0.1", port=8900, latency_ms=800, latency_jitter_ms=200, error_rate=0.0,
+                 rate_limit_rate=0.0, responses=None, seed=None):
+    """Starts the server in a background thread. Returns (server, state); call server.shutdown() to stop."""
+    state = MockLLMState(latency_ms, latency_jitter_ms, error_rate, rate_limit_rate, responses, seed)
+    server = ThreadingHTTPServer((host, port), make_handler(state))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, state
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local stand-in LLM server for offline benchmarks.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--latency-ms", type=float, default=800, help="Mean response latency")
+    parser.add_argument("--latency-jitter-ms", type=float, default=200, help="Standard deviation of the latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests answered with HTTP 500")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Share of requests answered with HTTP 429")
+    parser.add_argument("--responses", help="JSON file with a list of canned review objects")
+    parser.add_argument("--seed", type=int, help="Random seed for reproducible latency/error draws")
+    args = parser.parse_args(argv)
+
+    responses = None
+    if args.responses:
+        with open(args.responses, "r", encoding="utf-8") as f:
+            responses = json.load(f)
+
+    state = MockLLMState(args.latency_ms, args.latency_jitter_ms, args.error_rate, args.rate_limit_rate, responses, args.seed)
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(state))
+    print(f"Mock LLM server listening on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,315 @@
+"""
+Offline benchmark suite for the review pipeline. Needs no Gemini key: model calls go to the local
+stand-in server in benchmarks/mock_llm_server.py, started in-process unless --llm-url is given.
+
+Usage (from the repository root; the upload stage needs httpx, see benchmarks/requirements.txt):
+    python -m benchmarks.run_benchmarks [--stages extraction,preprocess,upload,startup]
+        [--synthetic-pages 5,50,200] [--batch-size 8] [--batches 3]
+        [--llm-latency-ms 800] [--llm-error-rate 0.0] [--startup-runs 5] [--output FILE] [--compare PREVIOUS.json]
+
+Stages:
+    extraction  utils.extract_text_from_pdf / extract_text_from_docx over data/papers and a synthetic corpus
+    preprocess  section detection, budget fitting and chunking of the extracted texts
+    upload      POST /upload/ batches through the FastAPI app (review cache disabled), with the model
+                backend timed separately as the 'llm' stage
+    startup     cold import of src.api in a fresh interpreter (what a worker without preload pays)
+
+Reports throughput, p50/p95/p99 latency per stage and peak memory, and writes the results as JSON
+(default data/benchmarks/bench_<timestamp>_<commit>.json) so runs can be compared across commits.
+"""
+import argparse
+import glob
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from datetime import datetime
+
+from benchmarks.corpus import build_corpus
+from benchmarks.mock_llm_server import start_server
+
+STAGES = ("extraction", "preprocess", "upload", "startup")
+
+
+def percentile(values, fraction):
+    """Linear-interpolated percentile of a list of numbers (fraction between 0 and 1)."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * fraction
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def summarize(latencies, elapsed, items, peak_bytes=None, **extra):
+    """Builds the result block of one stage from per-item latencies (seconds)."""
+    return {
+        "count": len(latencies),
+        "items": items,
+        "elapsed_seconds": round(elapsed, 4),
+        "throughput_per_second": round(items / elapsed, 4) if elapsed > 0 else None,
+        "latency_seconds": {
+            "mean": round(sum(latencies) / len(latencies), 4) if latencies else None,
+            "p50": round(percentile(latencies, 0.50), 4) if latencies else None,
+            "p95": round(percentile(latencies, 0.95), 4) if latencies else None,
+            "p99": round(percentile(latencies, 0.99), 4) if latencies else None,
+            "max": round(max(latencies), 4) if latencies else None,
+        },
+        "peak_python_memory_mb": round(peak_bytes / (1024 * 1024), 2) if peak_bytes is not None else None,
+        **extra,
+    }
+
+
+class TimedBackend:
+    """Wraps a model backend and records the latency of every generate() call."""
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.name = f"timed-{backend.name}"
+        self.model_name = backend.model_name
+        self.latencies = []
+        self.errors = 0
+        self.lock = threading.Lock()
+
+    def generate(self, prompt):
+        started = time.perf_counter()
+        try:
+            return self.backend.generate(prompt)
+        except Exception:
+            with self.lock:
+                self.errors += 1
+            raise
+        finally:
+            with self.lock:
+                self.latencies.append(time.perf_counter() - started)
+
+
+def run_extraction_stage(documents, pdf_backends):
+    from src.utils import extract_text_from_pdf, extract_text_from_docx
+
+    results = {}
+    texts = {}
+    for backend in pdf_backends:
+        latencies = []
+        characters = 0
+        tracemalloc.start()
+        started = time.perf_counter()
+        for path in documents:
+            document_started = time.perf_counter()
+            if path.lower().endswith(".pdf"):
+                text = extract_text_from_pdf(path, backend=backend)
+            else:
+                text = extract_text_from_docx(path)
+            latencies.append(time.perf_counter() - document_started)
+            characters += len(text)
+            texts.setdefault(path, text)
+        elapsed = time.perf_counter() - started
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        results[f"extraction[{backend}]"] = summarize(latencies, elapsed, len(documents), peak, characters=characters)
+    return results, texts
+
+
+def run_preprocess_stage(texts, token_budget, chunk_tokens):
+    from src.sections import detect_sections, fit_sections_to_budget, split_into_chunks
+
+    latencies = []
+    chunks_total = 0
+    tracemalloc.start()
+    started = time.perf_counter()
+    for text in texts.values():
+        document_started = time.perf_counter()
+        sections = detect_sections(text)
+        fit_sections_to_budget(sections, token_budget)
+        chunks_total += len(split_into_chunks(sections, chunk_tokens))
+        latencies.append(time.perf_counter() - document_started)
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"preprocess": summarize(latencies, elapsed, len(texts), peak, chunks=chunks_total)}
+
+
+def run_upload_stage(documents, llm_url, batch_size, batches, keep_rate_limiter):
+    from fastapi.testclient import TestClient
+    from src import api, reviewer
+    from src.backends import HTTPBackend
+    from src.rate_limiter import ModelCallLimiter
+
+    timed_backend = TimedBackend(HTTPBackend(llm_url, model_name="mock-llm", system_instruction=reviewer.SYSTEM_INSTRUCTION))
+    reviewer.configure_backend(timed_backend)
+    # Measure the pipeline itself: no cached results, and no quota throttling unless asked for.
+    api.review_cache = None
+    if not keep_rate_limiter:
+        reviewer.set_call_limiter(ModelCallLimiter(bucket=None, concurrency=None, max_retries=5, base_delay=0.2))
+
+    client = TestClient(api.app)
+    request_latencies = []
+    files_done = 0
+    failures = 0
+    tracemalloc.start()
+    started = time.perf_counter()
+    for batch_number in range(batches):
+        batch = [documents[(batch_number * batch_size + i) % len(documents)] for i in range(batch_size)]
+        handles = [open(path, "rb") for path in batch]
+        try:
+            request_started = time.perf_counter()
+            response = client.post("/upload/", files=[("files", (os.path.basename(path), handle)) for path, handle in zip(batch, handles)])
+            request_latencies.append(time.perf_counter() - request_started)
+        finally:
+            for handle in handles:
+                handle.close()
+        body = response.json()
+        files_done += body.get("total_files_uploaded", 0)
+        failures += body.get("files_failed_or_skipped", 0)
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "upload": summarize(request_latencies, elapsed, files_done, peak, batch_size=batch_size, files_failed=failures),
+        "llm": summarize(list(timed_backend.latencies), elapsed, len(timed_backend.latencies), None, errors=timed_backend.errors),
+    }
+
+
+def run_startup_stage(runs):
+    """Imports src.api in fresh interpreters and records the module import time each one reports."""
+    latencies = []
+    started = time.perf_counter()
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, "-c", "import src.api as api; print(api.IMPORT_SECONDS)"],
+            capture_output=True, text=True, check=True
+        ).stdout.strip().splitlines()
+        latencies.append(float(output[-1]))
+    return {"startup_import": summarize(latencies, time.perf_counter() - started, runs)}
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except Exception:
+        return "unknown"
+
+
+def compare(current, previous):
+    """Prints p50/p95 latency and throughput changes per stage against a previous result file."""
+    print(f"\nComparison with {previous.get('commit')} ({previous.get('timestamp')}):")
+    for stage, result in current["stages"].items():
+        before = previous.get("stages", {}).get(stage)
+        if not before:
+            continue
+        for metric in ("p50", "p95"):
+            now, then = result["latency_seconds"][metric], before["latency_seconds"][metric]
+            if now is not None and then:
+                print(f"  {stage:24s} {metric}: {then:.4f}s -> {now:.4f}s ({(now - then) / then * 100:+.1f}%)")
+        now, then = result["throughput_per_second"], before["throughput_per_second"]
+        if now is not None and then:
+            print(f"  {stage:24s} throughput: {then:.3f}/s -> {now:.3f}/s ({(now - then) / then * 100:+.1f}%)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline benchmarks for extraction, preprocessing and /upload/.")
+    parser.add_argument("--stages", default=",".join(STAGES), help="Comma-separated stages to run")
+    parser.add_argument("--papers-dir", default="data/papers", help="Folder with real sample PDFs")
+    parser.add_argument("--synthetic-pages", default="5,50,200", help="Page counts of the synthetic documents ('' for none)")
+    parser.add_argument("--synthetic-copies", type=int, default=1)
+    parser.add_argument("--pdf-backends", default="pdfplumber,pdfminer")
+    parser.add_argument("--token-budget", type=int, default=30000)
+    parser.add_argument("--chunk-tokens", type=int, default=8000)
+    parser.add_argument("--batch-size", type=int, default=8, help="Files per /upload/ request")
+    parser.add_argument("--batches", type=int, default=3, help="Number of /upload/ requests")
+    parser.add_argument("--llm-url", help="Use an already running stand-in server instead of starting one")
+    parser.add_argument("--llm-port", type=int, default=8900)
+    parser.add_argument("--llm-latency-ms", type=float, default=800)
+    parser.add_argument("--llm-latency-jitter-ms", type=float, default=200)
+    parser.add_argument("--llm-error-rate", type=float, default=0.0)
+    parser.add_argument("--llm-rate-limit-rate", type=float, default=0.0)
+    parser.add_argument("--keep-rate-limiter", action="store_true", help="Keep the configured quota limiter during the upload stage")
+    parser.add_argument("--startup-runs", type=int, default=5, help="Fresh interpreters started by the startup stage")
+    parser.add_argument("--output", help="Result JSON path (default data/benchmarks/bench_<timestamp>_<commit>.json)")
+    parser.add_argument("--compare", help="Previous result JSON to compare against")
+    args = parser.parse_args(argv)
+
+    stages = [stage.strip() for stage in args.stages.split(",") if stage.strip()]
+    unknown = set(stages) - set(STAGES)
+    if unknown:
+        parser.error(f"Unknown stages: {', '.join(sorted(unknown))}")
+
+    corpus_dir = tempfile.mkdtemp(prefix="bench_corpus_")
+    page_counts = [int(pages) for pages in args.synthetic_pages.split(",") if pages.strip()]
+    documents = sorted(glob.glob(os.path.join(args.papers_dir, "*.pdf")))
+    documents += build_corpus(corpus_dir, page_counts, args.synthetic_copies)
+    if not documents:
+        parser.error("No documents to benchmark.")
+
+    results = {}
+    texts = None
+    if "extraction" in stages or "preprocess" in stages:
+        extraction_results, texts = run_extraction_stage(documents, [b.strip() for b in args.pdf_backends.split(",") if b.strip()])
+        if "extraction" in stages:
+            results.update(extraction_results)
+    if "preprocess" in stages:
+        results.update(run_preprocess_stage(texts, args.token_budget, args.chunk_tokens))
+    if "upload" in stages:
+        server = None
+        llm_url = args.llm_url
+        if not llm_url:
+            server, _ = start_server(port=args.llm_port, latency_ms=args.llm_latency_ms,
+                                     latency_jitter_ms=args.llm_latency_jitter_ms, error_rate=args.llm_error_rate,
+                                     rate_limit_rate=args.llm_rate_limit_rate, seed=0)
+            llm_url = f"http://127.0.0.1:{args.llm_port}"
+        try:
+            results.update(run_upload_stage(documents, llm_url, args.batch_size, args.batches, args.keep_rate_limiter))
+        finally:
+            if server is not None:
+                server.shutdown()
+
+    if "startup" in stages:
+        results.update(run_startup_stage(args.startup_runs))
+
+    usage_self = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    usage_children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS.
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+    report = {
+        "commit": git_commit(),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "documents": [os.path.basename(path) for path in documents],
+        "parameters": vars(args),
+        "peak_rss_mb": round(usage_self / scale, 2),
+        "peak_rss_children_mb": round(usage_children / scale, 2),
+        "stages": results,
+    }
+
+    output_path = args.output or os.path.join(
+        "data", "benchmarks", f"bench_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{report['commit']}.json"
+    )
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+
+    print(f"{'stage':28s} {'n':>5s} {'thru/s':>9s} {'p50':>8s} {'p95':>8s} {'p99':>8s} {'peak MB':>8s}")
+    for stage, result in results.items():
+        latency = result["latency_seconds"]
+        fmt = lambda value: f"{value:8.3f}" if value is not None else f"{'-':>8s}"
+        print(f"{stage:28s} {result['count']:5d} {fmt(result['throughput_per_second']):>9s} "
+              f"{fmt(latency['p50'])} {fmt(latency['p95'])} {fmt(latency['p99'])} {fmt(result['peak_python_memory_mb'])}")
+    print(f"Peak RSS: {report['peak_rss_mb']} MB (children: {report['peak_rss_children_mb']} MB)")
+    print(f"Results written to {output_path}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            compare(report, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+# Gunicorn settings for the API (used by the Dockerfile: gunicorn -c gunicorn.conf.py src.api:app).
+import os
+import shutil
+import time
+
+bind = "0.0.0.0:8000"
+# Number of worker processes. Adjust based on your CPU cores and desired concurrency.
+workers = int(os.environ.get("WEB_CONCURRENCY", 4))
+worker_class = "uvicorn.workers.UvicornWorker"
+
+# Import the app (and, in when_ready, its heavy dependencies) once in the master before forking.
+# Workers share those pages copy-on-write, so starting or respawning a worker skips the imports.
+# The model client itself is created per worker, in the app's lifespan handler.
+preload_app = os.environ.get("GUNICORN_PRELOAD", "1") != "0"
+
+# --- Prometheus multi-process metrics ---
+# Each worker writes its metric samples to this directory and /metrics aggregates them.
+# It has to be set before anything imports prometheus_client, i.e. here, before the app is
+# preloaded. The directory is emptied once per server start (not on HUP reloads, which re-run
+# this file), so counters from a previous run are not carried over.
+metrics_dir = os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", "/tmp/research_assistant_metrics")
+os.makedirs(metrics_dir, exist_ok=True)
+
+
+def on_starting(server):
+    shutil.rmtree(metrics_dir, ignore_errors=True)
+    os.makedirs(metrics_dir, exist_ok=True)
+
+
+def when_ready(server):
+    if preload_app:
+        from src.api import preload_heavy_modules
+        server.log.info(f"Preloaded heavy modules in {preload_heavy_modules():.2f}s")
+
+
+def post_fork(server, worker):
+    # Read by the app's lifespan handler to report fork-to-ready time.
+    os.environ["WORKER_FORKED_AT"] = str(time.time())
+
+
+def child_exit(server, worker):
+    # Drops the files of a dead worker's live gauges; its counters and histograms are kept.
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
@@ -1,14 +1,24 @@
-from fastapi import FastAPI, File, UploadFile, HTTPException
-from fastapi.responses import JSONResponse, FileResponse
+import time
+# Startup timing: how long this module takes to import (reported by the lifespan handler).
+IMPORT_STARTED = time.perf_counter()
+
+from fastapi import FastAPI, File, UploadFile, HTTPException, Header, Request, Query
+from fastapi.responses import JSONResponse, FileResponse, StreamingResponse, Response
 from fastapi.staticfiles import StaticFiles
+from starlette.datastructures import Headers, MutableHeaders
 import logging
 import re
 import json
-import pandas as pd
 from pathlib import Path
 import tempfile
 import os # Ensure os is imported for file operations
-from typing import List, Dict, Any, Optional
+import importlib
+from contextlib import asynccontextmanager
+import hashlib
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import List, Dict, Any, Optional, Tuple
 from pydantic import BaseModel, ValidationError
 
 # Imports for unique file naming and finding the latest file
@@ -16,14 +26,26 @@ import uuid
 from datetime import datetime
 import glob # Used in download_csv to find files
 
-# Ensure docx is imported if extract_text_from_docx is defined here or if it's used elsewhere.
-# However, since it's moved to utils, it's only needed if utils needs it.
-# For safety, and if utils were to use it directly, keep it. If utils does not, it could be removed.
-# For now, keeping it as it was in the original api.py.
-import docx
-
-from src.reviewer import review
-from src.utils import extract_text_from_pdf, extract_text_from_docx, save_dataframe_to_csv # Updated import
+from src.reviewer import (
+    review_document, get_model_name, get_prompt_version, is_model_available, set_call_limiter, configure_backend,
+    configure_default_backend, review_overrides, check_prompt_template, SYSTEM_INSTRUCTION
+)
+from src.backends import create_backend
+from src.rate_limiter import SharedTokenBucket, AdaptiveConcurrencyLimiter, ModelCallLimiter
+from src.packing import PackedReviewer
+from src.deadlines import work_scope, current_scope, WorkCancelled, DeadlineExceeded
+from src.extraction import run_isolated, ExtractionTimeoutError, ExtractionCancelledError
+from src.cache import ReviewCache
+from src.dedup import NearDuplicateIndex, compute_signature
+from src.text_store import ExtractedTextStore
+from src.results_store import ResultsStore, RESULT_FIELDS
+from src.jobs import JobStore, JobWorkerPool, JOB_QUEUED, JOB_COMPLETED, FILE_DONE, FILE_FAILED
+from src.export import EXPORT_COLUMNS, ExportFormatError, check_export_format, stream_export, export_filename, export_media_type
+from src.metrics import (
+    time_stage, count_file_outcome, render_metrics, INPUT_BYTES, EXTRACTED_CHARS, DUPLICATES, STARTUP_SECONDS
+)
+from src.tracing import trace_id_var, new_trace_id, with_context, TraceIdFilter
+from src.utils import extract_pdf_document, extract_text_from_docx # Updated import
 
 # --- Pydantic Model Definition ---
 class ResearchPaperData(BaseModel):
@@ -47,7 +69,24 @@ class ResearchPaperData(BaseModel):
 
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import HTMLResponse # Already imported, but confirming
-app = FastAPI()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Per-worker startup and shutdown. The model client is configured here, after gunicorn has
+    forked the worker, instead of at import time; then the background job workers are started.
+    """
+    lifespan_started = time.perf_counter()
+    configure_model()
+    if config.get('job_workers', 2) > 0:
+        await job_worker_pool.start()
+    record_startup_timings(time.perf_counter() - lifespan_started)
+    yield
+    await job_worker_pool.stop()
+
+
+app = FastAPI(lifespan=lifespan)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -104,149 +143,961 @@ if log_dir and not os.path.exists(log_dir):
         print(f"Warning: Could not create log directory '{log_dir}': {e}. Logs will be written to the current directory.")
         log_file_path = 'api.log' # Fallback if directory creation fails
 
+# Optional per-request trace ids: every log line of a request carries the same id
+# (taken from the client's X-Request-ID header, or generated), see src/tracing.py.
+TRACE_IDS_ENABLED = config.get('log_trace_ids', False)
+log_handlers = [
+    logging.StreamHandler(), # Log to console
+    logging.FileHandler(log_file_path) # Log to file
+]
+for handler in log_handlers:
+    handler.addFilter(TraceIdFilter())
 logging.basicConfig(
     level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.StreamHandler(), # Log to console
-        logging.FileHandler(log_file_path) # Log to file
-    ]
+    format='%(asctime)s - %(levelname)s - [%(trace_id)s] %(message)s' if TRACE_IDS_ENABLED else '%(asctime)s - %(levelname)s - %(message)s',
+    handlers=log_handlers,
+    # Modules imported above may already have logged (which installs a default handler); replace it.
+    force=True
 )
 
-# --- API Endpoints ---
-@app.post("/upload/")
-async def upload_files(files: List[UploadFile] = File(...)):
-    """Handles file uploads, processes them with the AI review, and returns results."""
-    processed_data = []
-    failed_files_list = []
-    # Use the base path from config to create unique filenames
-    output_csv_base_path = config.get('output_csv', 'data/response/uploaded_files_result.csv')
 
-    # Track the filename generated for this batch
-    generated_csv_filename = None 
+class TraceIdMiddleware:
+    """
+    Gives every request a trace id (the client's X-Request-ID, or a new one) and echoes it back.
+    The middlewares here are plain ASGI classes rather than @app.middleware("http") functions: those
+    wrap 'receive' in a way that hides client disconnects from request.is_disconnected(), which
+    /upload/ relies on to stop work for clients that have gone.
+    """
+
+    def __init__(self, app):
+        self.app = app
 
-    for file in files:
-        temp_file_path = None
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not TRACE_IDS_ENABLED:
+            await self.app(scope, receive, send)
+            return
+        trace_id = Headers(scope=scope).get("x-request-id") or new_trace_id()
+
+        async def send_with_trace_id(message):
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message)["X-Request-ID"] = trace_id
+            await send(message)
+
+        token = trace_id_var.set(trace_id)
         try:
-            filename = file.filename or ""
-            file_extension = Path(filename).suffix.lower()
-            
-            # Create a temporary file to store uploaded content.
-            # delete=False means we are responsible for cleaning it up.
-            # Using prefix from stem to better identify temp files related to original name.
-            with tempfile.NamedTemporaryFile(delete=False, suffix=file_extension, prefix=f"{Path(filename).stem}_", dir=tempfile.gettempdir()) as tmp_file:
-                tmp_file.write(await file.read())
-                tmp_file_path = tmp_file.name
-
-            logging.info(f"Processing file: {file.filename} (Temp path: {tmp_file_path})")
-            text = ""
-            if file_extension == ".pdf":
-                text = extract_text_from_pdf(tmp_file_path)
-            elif file_extension == ".docx":
-                text = extract_text_from_docx(tmp_file_path)
-            else:
-                logging.warning(f"Unsupported file type: {file.filename}. Skipping.")
-                failed_files_list.append(f"{file.filename} (Unsupported type)")
-                continue
+            await self.app(scope, receive, send_with_trace_id)
+        finally:
+            trace_id_var.reset(token)
 
-            if not text or not text.strip(): # Check if text is empty or only whitespace
-                logging.warning(f"No text extracted from {file.filename}. Skipping review.")
-                failed_files_list.append(f"{file.filename} (No text extracted)")
-                continue
 
-            # Call the review function which interacts with the AI model
-            ai_response_text = review(text)
+app.add_middleware(TraceIdMiddleware)
 
-            if not ai_response_text: # Handle cases where review() returns empty string (e.g., API key missing)
-                logging.warning(f"AI review returned empty response for {file.filename}.")
-                failed_files_list.append(f"{file.filename} (AI review failed)")
-                continue
+# --- Upload Ingestion Limits ---
+# Uploads are copied to disk in fixed-size chunks, so memory use does not grow with file size.
+# Files over max_file_size_mb and requests over max_request_size_mb are rejected before any work is done.
+SUPPORTED_EXTENSIONS = {".pdf", ".docx"}
+UPLOAD_CHUNK_SIZE = int(config.get('upload_chunk_size_kb', 1024)) * 1024
+MAX_FILE_SIZE_BYTES = int(config.get('max_file_size_mb', 200) * 1024 * 1024)
+MAX_REQUEST_SIZE_BYTES = int(config.get('max_request_size_mb', 1000) * 1024 * 1024)
 
-            try:
-                # Clean up potential markdown wrappers and parse as JSON
-                cleaned_response = ai_response_text.strip()
-                if cleaned_response.startswith("```json"):
-                    cleaned_response = cleaned_response[7:]
-                    if cleaned_response.endswith("```"):
-                        cleaned_response = cleaned_response[:-3]
-                elif cleaned_response.startswith("```"): # Handle cases where it's just code block
-                    cleaned_response = cleaned_response[3:]
-                    if cleaned_response.endswith("```"):
-                        cleaned_response = cleaned_response[:-3]
-                
-                parsed_json_data = json.loads(cleaned_response)
-                # Validate the parsed data against the Pydantic model
-                validated_data = ResearchPaperData(**parsed_json_data)
-                processed_data.append(validated_data.dict())
-                logging.info(f"Successfully processed and validated: {file.filename}")
-
-            except json.JSONDecodeError:
-                logging.warning(f"JSON Decode Error for {file.filename}. Response was: '{ai_response_text[:200]}...'")
-                failed_files_list.append(f"{file.filename} (Invalid JSON format)")
-            except ValidationError as ve:
-                logging.warning(f"Pydantic Validation Error for {file.filename}: {ve.errors()}. Response was: '{ai_response_text[:200]}...'")
-                failed_files_list.append(f"{file.filename} (Data validation failed)")
-            except Exception as e:
-                logging.error(f"Unexpected error processing AI response for {file.filename}: {e}")
-                failed_files_list.append(f"{file.filename} (Processing error)")
-
-        except ImportError as ie:
-            logging.error(f"Import Error processing {file.filename}: {ie}")
-            failed_files_list.append(f"{file.filename} (Dependency error: {ie})")
-        except Exception as e:
-            logging.error(f"General error processing file {file.filename}: {e}")
-            failed_files_list.append(f"{file.filename} (General error: {e})")
-        finally:
-            # Crucially, delete the temporary file to ensure statelessness
-            if temp_file_path and os.path.exists(temp_file_path):
-                try:
-                    os.remove(temp_file_path)
-                    logging.debug(f"Cleaned up temporary file: {temp_file_path}")
-                except OSError as e:
-                    logging.error(f"Error removing temporary file {temp_file_path}: {e}")
-
-    # Save results to CSV if any data was processed
-    csv_was_generated = False
-    
-    if processed_data:
-        df = pd.DataFrame(processed_data)
+
+class UploadTooLargeError(Exception):
+    """Raised when an uploaded file exceeds the configured per-file size limit."""
+
+
+class RequestSizeLimitMiddleware:
+    """Rejects uploads whose declared Content-Length exceeds the per-request limit before the body is parsed."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["method"] == "POST" and MAX_REQUEST_SIZE_BYTES:
+            content_length = Headers(scope=scope).get("content-length")
+            if content_length and content_length.isdigit() and int(content_length) > MAX_REQUEST_SIZE_BYTES:
+                logging.warning(f"Rejected request to {scope['path']}: {content_length} bytes exceeds the request limit")
+                response = JSONResponse(
+                    {"detail": f"Request too large: uploads are limited to {config.get('max_request_size_mb', 1000)} MB per request."},
+                    status_code=413
+                )
+                await response(scope, receive, send)
+                return
+        await self.app(scope, receive, send)
+
+
+app.add_middleware(RequestSizeLimitMiddleware)
+
+
+def check_request_size(files: List[UploadFile]):
+    """Rejects the whole request if the combined size of the uploaded files exceeds the per-request limit."""
+    total_size = sum(file.size or 0 for file in files)
+    if MAX_REQUEST_SIZE_BYTES and total_size > MAX_REQUEST_SIZE_BYTES:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Request too large: uploads are limited to {config.get('max_request_size_mb', 1000)} MB per request."
+        )
+
+
+def describe_upload_rejection(file: UploadFile) -> Optional[str]:
+    """
+    Returns a failure string if the file can be rejected without reading it
+    (unsupported type or declared size over the per-file limit), otherwise None.
+    """
+    if Path(file.filename or "").suffix.lower() not in SUPPORTED_EXTENSIONS:
+        logging.warning(f"Unsupported file type: {file.filename}. Skipping.")
+        return f"{file.filename} (Unsupported type)"
+    if MAX_FILE_SIZE_BYTES and file.size is not None and file.size > MAX_FILE_SIZE_BYTES:
+        logging.warning(f"File too large: {file.filename} ({file.size} bytes). Skipping.")
+        return f"{file.filename} (File too large: limit is {config.get('max_file_size_mb', 200)} MB)"
+    return None
+
+
+async def spool_upload(file: UploadFile, destination_path: str) -> str:
+    """
+    Copies an uploaded file to destination_path in chunks of UPLOAD_CHUNK_SIZE bytes while
+    computing its SHA-256. Returns the hex digest. Raises UploadTooLargeError (and removes the
+    partial file) if the file turns out to be larger than the per-file limit.
+    """
+    digest = hashlib.sha256()
+    bytes_written = 0
+    try:
+        with open(destination_path, "wb") as destination:
+            while True:
+                chunk = await file.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                bytes_written += len(chunk)
+                if MAX_FILE_SIZE_BYTES and bytes_written > MAX_FILE_SIZE_BYTES:
+                    raise UploadTooLargeError(f"limit is {config.get('max_file_size_mb', 200)} MB")
+                digest.update(chunk)
+                destination.write(chunk)
+    except Exception:
+        if os.path.exists(destination_path):
+            os.remove(destination_path)
+        raise
+    return digest.hexdigest()
+
+
+# --- Concurrency Setup ---
+# Text extraction (pdfplumber / python-docx) and review() (a blocking Gemini HTTP call) must not run
+# on the event loop, otherwise one large batch stalls every other request on this worker.
+# Each stage gets its own executor so a slow LLM call never starves extraction and vice versa.
+# The pool sizes double as the per-stage concurrency limits and are set in config.json.
+extraction_executor = ThreadPoolExecutor(
+    max_workers=max(1, int(config.get('extraction_concurrency', 4))),
+    thread_name_prefix="extraction"
+)
+# PDF extraction options (see src/extraction.py). Large PDFs are split across a process pool;
+# pdf_first_pages/pdf_last_pages limit extraction to a window at the start and end of the document.
+pdf_extraction_options = {
+    "backend": config.get('pdf_backend', 'pdfplumber'),
+    "max_pages": config.get('pdf_max_pages'),
+    "first_pages": config.get('pdf_first_pages'),
+    "last_pages": config.get('pdf_last_pages'),
+    "timeout": config.get('pdf_extraction_timeout_seconds'),
+    "parallel_min_pages": config.get('pdf_parallel_min_pages', 50),
+    "max_workers": config.get('pdf_process_workers', 2),
+}
+
+
+def get_extraction_settings(file_extension: str) -> str:
+    """
+    Identifies the extraction options that shape a document's text. Stored texts are kept per
+    settings, so changing the PDF backend or page window extracts documents again.
+    """
+    if file_extension == ".pdf":
+        return json.dumps({option: pdf_extraction_options[option] for option in
+                           ("backend", "max_pages", "first_pages", "last_pages")}, sort_keys=True)
+    return file_extension.lstrip(".")
+
+
+def has_current_extraction_settings(entry: Dict[str, Any]) -> bool:
+    """True if a text store entry was extracted with the current settings; only those are re-reviewed."""
+    return entry["extraction_settings"] == get_extraction_settings(Path(entry["filename"] or "").suffix.lower())
+# --- Deadlines and Cancellation ---
+# Each file gets a hard extraction deadline and a model-call deadline; /upload/ requests get an
+# overall deadline and stop their remaining files when the client disconnects. With
+# extraction_isolation on, every extraction (each page range of a large PDF) runs in its own
+# killable process (see extraction.run_isolated_many), so a PDF that hangs the parser is killed
+# at the deadline.
+# pdf_extraction_timeout_seconds stays the soft limit that returns the pages read so far; keep
+# extraction_deadline_seconds above it.
+EXTRACTION_ISOLATION = config.get('extraction_isolation', True)
+EXTRACTION_DEADLINE_SECONDS = config.get('extraction_deadline_seconds', 180)
+LLM_DEADLINE_SECONDS = config.get('llm_deadline_seconds', 300)
+REQUEST_DEADLINE_SECONDS = config.get('request_deadline_seconds', 900)
+DISCONNECT_POLL_SECONDS = config.get('disconnect_poll_interval_seconds', 1.0)
+
+
+def extract_document_text(file_extension: str, file_path: str, cancel_event=None) -> Tuple[str, bool]:
+    """
+    Extracts a PDF or DOCX, in killable processes when extraction_isolation is on. An isolated PDF
+    runs each page range in its own process rather than the shared page pool, so large PDFs are
+    still split across pdf_process_workers processes and all of them are killed at the deadline.
+    Returns (text, complete); complete is False when pdf_extraction_timeout_seconds cut the text short.
+    """
+    if file_extension == ".pdf":
+        if not EXTRACTION_ISOLATION:
+            result = extract_pdf_document(file_path, **pdf_extraction_options)
+        else:
+            result = extract_pdf_document(file_path, **pdf_extraction_options, isolated=True,
+                                          hard_timeout=EXTRACTION_DEADLINE_SECONDS, cancel_event=cancel_event)
+        return result["text"], not result["timed_out"]
+    if not EXTRACTION_ISOLATION:
+        return extract_text_from_docx(file_path), True
+    return run_isolated(extract_text_from_docx, (file_path,), timeout=EXTRACTION_DEADLINE_SECONDS, cancel_event=cancel_event), True
+# Long-paper handling (see reviewer.review_document): papers over review_token_budget are
+# trimmed by section or reviewed map-reduce style, depending on long_paper_strategy.
+review_options = {
+    "token_budget": config.get('review_token_budget', 30000),
+    "chunk_tokens": config.get('review_chunk_tokens', 8000),
+    "map_workers": config.get('review_map_workers', 4),
+    "strategy": config.get('long_paper_strategy', 'map_reduce'),
+}
+_model_configured = False
+
+
+def configure_model():
+    """
+    Sets up the model backend and the quota limiter. Runs once per process, from the lifespan
+    handler (API workers) or the batch CLI, so importing this module never creates a model client.
+    """
+    global _model_configured
+    if _model_configured:
+        return
+    # Model backend: 'gemini' (default, configured by src/reviewer.py from the .env API key) or 'http',
+    # a JSON-over-HTTP server such as the local stand-in in benchmarks/mock_llm_server.py.
+    if config.get('model_backend', 'gemini') != 'gemini':
+        configure_backend(create_backend(
+            config['model_backend'],
+            model_name=config.get('model_name', 'mock-llm'),
+            system_instruction=SYSTEM_INSTRUCTION,
+            base_url=config.get('model_backend_url'),
+            timeout=config.get('model_backend_timeout_seconds', 120)
+        ))
+    else:
+        configure_default_backend()
+
+    # Gemini quota handling: a requests/tokens-per-minute bucket shared by all workers through SQLite,
+    # retries with jittered exponential backoff (honouring server retry hints), and a per-process
+    # concurrency limit that shrinks when errors rise and grows back as calls succeed.
+    set_call_limiter(ModelCallLimiter(
+        bucket=SharedTokenBucket(
+            db_path=config.get('rate_limit_db_path', 'data/ratelimit/gemini.sqlite3'),
+            requests_per_minute=config.get('gemini_requests_per_minute', 15),
+            tokens_per_minute=config.get('gemini_tokens_per_minute', 1000000)
+        ),
+        concurrency=AdaptiveConcurrencyLimiter(
+            initial_limit=max(1, int(config.get('llm_concurrency', 4))),
+            max_limit=max(1, int(config.get('llm_concurrency', 4))) + int(config.get('review_map_workers', 4))
+        ),
+        max_retries=config.get('gemini_max_retries', 5),
+        base_delay=config.get('gemini_retry_base_delay_seconds', 1.0),
+        max_delay=config.get('gemini_retry_max_delay_seconds', 60.0)
+    ))
+    _model_configured = True
+
+
+
+# Backends for models other than the configured one (re-reviews), created on first use.
+_review_backends = {}
+
+
+def get_review_backend(model_name: Optional[str]):
+    """
+    Returns a backend for 'model_name' of the same type and settings as the configured model, or
+    None when model_name is empty or already the configured model. Raises ValueError if the
+    backend cannot be created (e.g. no API key).
+    """
+    if not model_name or model_name == get_model_name():
+        return None
+    if model_name not in _review_backends:
+        backend = create_backend(
+            config.get('model_backend', 'gemini'),
+            model_name=model_name,
+            system_instruction=SYSTEM_INSTRUCTION,
+            api_key=os.getenv('google_ai_studio_key'),
+            base_url=config.get('model_backend_url'),
+            timeout=config.get('model_backend_timeout_seconds', 120)
+        )
+        if backend is None:
+            raise ValueError(f"Model '{model_name}' is not available: the model backend is not configured.")
+        _review_backends[model_name] = backend
+    return _review_backends[model_name]
+
+llm_executor = ThreadPoolExecutor(
+    max_workers=max(1, int(config.get('llm_concurrency', 4))),
+    thread_name_prefix="llm"
+)
+# Packing mode: short papers (up to review_packing_max_paper_tokens) that are processed at the same
+# time share one model request, so the instructions are sent once per pack instead of once per paper.
+review_packer = None
+if config.get('review_packing_enabled', False):
+    review_packer = PackedReviewer(
+        llm_executor,
+        token_budget=config.get('review_packing_token_budget', 24000),
+        max_paper_tokens=config.get('review_packing_max_paper_tokens', 4000),
+        max_papers=config.get('review_packing_max_papers', 8),
+        max_wait_seconds=config.get('review_packing_max_wait_seconds', 0.5),
+        validate_fn=lambda entry: ResearchPaperData(**entry)
+    )
+
+# --- Review Cache Setup ---
+# Repeat uploads of the same document (same bytes, model and prompt) are answered from this
+# cache instead of paying for another Gemini call. Disable with "cache_enabled": false.
+review_cache = None
+if config.get('cache_enabled', True):
+    review_cache = ReviewCache(
+        db_path=config.get('cache_db_path', 'data/cache/review_cache.sqlite3'),
+        max_entries=config.get('cache_max_entries', 10000),
+        max_age_days=config.get('cache_max_age_days', 30)
+    )
+
+
+# --- Near-Duplicate Detection Setup ---
+# Papers whose extracted text is near-identical (MinHash similarity >= dedup_similarity_threshold)
+# to an already reviewed paper reuse its review; the response flags them with 'duplicate_of'.
+duplicate_index = None
+if config.get('dedup_enabled', True):
+    duplicate_index = NearDuplicateIndex(
+        db_path=config.get('dedup_db_path', 'data/dedup/fingerprints.sqlite3'),
+        similarity_threshold=config.get('dedup_similarity_threshold', 0.8)
+    )
+
+
+# --- Extracted Text Store Setup ---
+# The text of every document is kept (compressed, keyed by content hash) after its first
+# extraction, so a repeat upload skips parsing and stored documents can be re-reviewed with
+# another model or prompt through POST /rereview or python -m src.rereview.
+text_store = None
+if config.get('text_store_enabled', True):
+    text_store = ExtractedTextStore(directory=config.get('text_store_dir', 'data/texts'))
+
+
+# --- Results Store Setup ---
+# Every validated row is indexed in SQLite (with FTS) so past results can be queried through
+# GET /results instead of downloading and searching per-batch CSV files.
+results_store = ResultsStore(db_path=config.get('results_db_path', 'data/results/results.sqlite3'))
+
+
+async def record_result(batch_id: Optional[str], filename: str, content_hash: str, result: Dict[str, Any]):
+    """Stores a validated result in the results store (no-op without a batch id)."""
+    if batch_id is None:
+        return
+    with time_stage("results_store"):
+        await asyncio.get_running_loop().run_in_executor(
+            None, results_store.add_result, batch_id, filename, content_hash, result
+        )
+
+
+def parse_ai_response(ai_response_text: str) -> Dict[str, Any]:
+    """
+    Cleans up potential markdown wrappers around the AI response, parses it as JSON
+    and validates it against the ResearchPaperData model.
+    Raises json.JSONDecodeError or ValidationError on bad responses.
+    """
+    cleaned_response = ai_response_text.strip()
+    if cleaned_response.startswith("```json"):
+        cleaned_response = cleaned_response[7:]
+        if cleaned_response.endswith("```"):
+            cleaned_response = cleaned_response[:-3]
+    elif cleaned_response.startswith("```"): # Handle cases where it's just code block
+        cleaned_response = cleaned_response[3:]
+        if cleaned_response.endswith("```"):
+            cleaned_response = cleaned_response[:-3]
+
+    parsed_json_data = json.loads(cleaned_response)
+    # Validate the parsed data against the Pydantic model
+    validated_data = ResearchPaperData(**parsed_json_data)
+    return validated_data.dict()
+
+
+async def process_document(filename: str, file_path: Optional[str], content_hash: str,
+                           batch_id: Optional[str] = None) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+    """
+    Runs extract -> review -> validate for a document that has already been saved to disk.
+    Used both by /upload/ (temporary file) and by the job workers (persisted upload); with no
+    file_path the document's stored text is reviewed instead (/rereview and src/rereview.py).
+    Returns a (result, failure) tuple where exactly one of the two is set; the failure
+    string uses the same "<filename> (<reason>)" format as failed_files_details.
+    Validated results are recorded in the results store under batch_id, if one is given.
+    """
+    with time_stage("document_total"), work_scope() as scope:
         try:
-            # Generate a unique filename with timestamp and UUID for this batch
-            timestamp_str = datetime.now().strftime("%Y%m%d_%H%M%S")
-            unique_id = uuid.uuid4()
-            # This is the filename we will return to the frontend
-            generated_csv_filename = f"review_results_{timestamp_str}_{unique_id}.csv"
+            result, failure = await run_document_stages(filename, file_path, content_hash, batch_id)
+        except asyncio.CancelledError:
+            # Stops model calls, retries and the extraction process still working for this file.
+            scope.cancel("request cancelled")
+            raise
+    count_file_outcome(failure)
+    return result, failure
 
-            # Ensure the output directory exists using the base path from config
-            output_dir = os.path.dirname(output_csv_base_path)
-            os.makedirs(output_dir, exist_ok=True) # Ensure directory exists
 
-            # Construct the full path for this specific CSV file
-            current_output_csv_path = os.path.join(output_dir, generated_csv_filename)
+async def run_document_stages(filename: str, file_path: Optional[str], content_hash: str,
+                              batch_id: Optional[str]) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+    """The stages of process_document, each timed under review_stage_duration_seconds."""
+    loop = asyncio.get_running_loop()
+    try:
+        file_extension = Path(filename).suffix.lower()
+
+        # Serve repeat uploads straight from the review cache, skipping extraction and the AI call.
+        prompt_version = get_prompt_version()
+        if review_cache is not None:
+            with time_stage("cache_lookup"):
+                cached_result = await loop.run_in_executor(None, review_cache.get, content_hash, get_model_name(), prompt_version)
+            if cached_result is not None:
+                logging.info(f"Review cache hit for {filename} ({content_hash[:12]})")
+                await record_result(batch_id, filename, content_hash, cached_result)
+                return cached_result, None
 
-            # Save the dataframe to the uniquely named CSV file
-            save_dataframe_to_csv(df, current_output_csv_path)
-            logging.info(f"Saved results for {len(processed_data)} files to {current_output_csv_path}")
-            csv_was_generated = True # Mark that a CSV has been created for this batch
+        logging.info(f"Processing file: {filename} (Path: {file_path})")
+        scope = current_scope()
+        text = None
+        extraction_settings = get_extraction_settings(file_extension)
+        if text_store is not None:
+            with time_stage("text_store_lookup"):
+                text = await loop.run_in_executor(None, text_store.get, content_hash, extraction_settings)
+            if text is not None:
+                logging.info(f"Using stored text of {filename} ({content_hash[:12]}); skipping extraction.")
 
+        if text is None:
+            # No file means a re-review of a stored document (see /rereview), which needs the stored text.
+            if file_path is None:
+                return None, f"{filename} (No stored text)"
+            if file_extension not in SUPPORTED_EXTENSIONS:
+                logging.warning(f"Unsupported file type: {filename}. Skipping.")
+                return None, f"{filename} (Unsupported type)"
+            try:
+                with time_stage(f"extract_{file_extension.lstrip('.')}"):
+                    # The thread-side wait is a backstop; without isolation a hung thread cannot be killed.
+                    text, complete = await asyncio.wait_for(
+                        loop.run_in_executor(extraction_executor, with_context(
+                            extract_document_text, file_extension, file_path, scope.cancel_event if scope else None
+                        )),
+                        timeout=EXTRACTION_DEADLINE_SECONDS + 5 if EXTRACTION_DEADLINE_SECONDS else None
+                    )
+            except (ExtractionTimeoutError, asyncio.TimeoutError):
+                if scope is not None:
+                    scope.cancel("extraction deadline")
+                logging.warning(f"Extraction of {filename} exceeded {EXTRACTION_DEADLINE_SECONDS}s and was stopped.")
+                return None, f"{filename} (Timed out: extraction exceeded {EXTRACTION_DEADLINE_SECONDS}s)"
+            except ExtractionCancelledError:
+                return None, f"{filename} (Cancelled)"
+            EXTRACTED_CHARS.observe(len(text or ""))
+
+            if not text or not text.strip(): # Check if text is empty or only whitespace
+                logging.warning(f"No text extracted from {filename}. Skipping review.")
+                return None, f"{filename} (No text extracted)"
+            # A soft timeout returns the pages read so far; that text is reviewed but not kept.
+            if text_store is not None and complete:
+                with time_stage("text_store_write"):
+                    await loop.run_in_executor(None, text_store.put, content_hash, extraction_settings, filename, text)
+
+        # A near-identical paper (e.g. the preprint of a published PDF) reuses that paper's review.
+        signature = None
+        if duplicate_index is not None:
+            with time_stage("dedup_lookup"):
+                signature = await loop.run_in_executor(None, compute_signature, text)
+                duplicate = await loop.run_in_executor(
+                    None, duplicate_index.find, signature, get_model_name(), prompt_version, content_hash
+                )
+            if duplicate is not None:
+                logging.info(f"{filename} is a near-duplicate of {duplicate['filename']} "
+                             f"(similarity {duplicate['similarity']:.2f}); reusing its review.")
+                DUPLICATES.inc()
+                await record_result(batch_id, filename, content_hash, duplicate["result"])
+                return {
+                    **duplicate["result"],
+                    "duplicate_of": duplicate["filename"],
+                    "duplicate_of_content_hash": duplicate["content_hash"],
+                    "duplicate_similarity": round(duplicate["similarity"], 3)
+                }, None
+
+        # Call the review function which interacts with the AI model. The deadline covers the whole
+        # stage, including map-step chunks and retries, which stop once it has passed.
+        if scope is not None:
+            scope.set_timeout(LLM_DEADLINE_SECONDS)
+        try:
+            with time_stage("review"):
+                if review_packer is not None and review_packer.accepts(text):
+                    review_call = review_packer.review(text)
+                else:
+                    review_call = loop.run_in_executor(llm_executor, with_context(review_document, text, **review_options))
+                ai_response_text = await asyncio.wait_for(review_call, timeout=LLM_DEADLINE_SECONDS or None)
+        except (asyncio.TimeoutError, DeadlineExceeded):
+            if scope is not None:
+                scope.cancel("model call deadline")
+            logging.warning(f"Model review of {filename} exceeded {LLM_DEADLINE_SECONDS}s.")
+            return None, f"{filename} (Timed out: model call exceeded {LLM_DEADLINE_SECONDS}s)"
+        except WorkCancelled:
+            return None, f"{filename} (Cancelled)"
+
+        if not ai_response_text: # Handle cases where review() returns empty string (e.g., API key missing)
+            logging.warning(f"AI review returned empty response for {filename}.")
+            return None, f"{filename} (AI review failed)"
+
+        try:
+            with time_stage("parse_validate"):
+                validated_data = parse_ai_response(ai_response_text)
+            logging.info(f"Successfully processed and validated: {filename}")
+            # Only cache real model output, not the placeholder returned when the model is unavailable.
+            if review_cache is not None and is_model_available():
+                with time_stage("cache_store"):
+                    await loop.run_in_executor(None, review_cache.set, content_hash, get_model_name(), prompt_version, validated_data)
+            if duplicate_index is not None and is_model_available():
+                await loop.run_in_executor(
+                    None, duplicate_index.add, signature, content_hash, filename, get_model_name(), prompt_version, validated_data
+                )
+            await record_result(batch_id, filename, content_hash, validated_data)
+            return validated_data, None
+
+        except json.JSONDecodeError:
+            logging.warning(f"JSON Decode Error for {filename}. Response was: '{ai_response_text[:200]}...'")
+            return None, f"{filename} (Invalid JSON format)"
+        except ValidationError as ve:
+            logging.warning(f"Pydantic Validation Error for {filename}: {ve.errors()}. Response was: '{ai_response_text[:200]}...'")
+            return None, f"{filename} (Data validation failed)"
         except Exception as e:
-            logging.error(f"Failed to save CSV: {e}")
-            # Reset filename if saving fails, so it's not returned as generated
-            generated_csv_filename = None 
-    else:
-        logging.warning("No data processed successfully to save.")
+            logging.error(f"Unexpected error processing AI response for {filename}: {e}")
+            return None, f"{filename} (Processing error)"
 
-    # Return status including whether CSV was generated for this batch and its filename
-    return JSONResponse({
-        "total_files_uploaded": len(files),
+    except ImportError as ie:
+        logging.error(f"Import Error processing {filename}: {ie}")
+        return None, f"{filename} (Dependency error: {ie})"
+    except Exception as e:
+        logging.error(f"General error processing file {filename}: {e}")
+        return None, f"{filename} (General error: {e})"
+
+
+async def process_uploaded_file(file: UploadFile, batch_id: Optional[str] = None) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+    """
+    Spools a single uploaded file to a temporary file and runs the pipeline on it.
+    The temporary file is always removed afterwards.
+    """
+    # Check the type and declared size first, so rejected files never touch the disk.
+    rejection = describe_upload_rejection(file)
+    if rejection:
+        count_file_outcome(rejection)
+        return None, rejection
+
+    tmp_file_path = None
+    try:
+        filename = file.filename or ""
+        file_extension = Path(filename).suffix.lower()
+
+        # Create a temporary file to store uploaded content.
+        # delete=False means we are responsible for cleaning it up.
+        # Using prefix from stem to better identify temp files related to original name.
+        with tempfile.NamedTemporaryFile(delete=False, suffix=file_extension, prefix=f"{Path(filename).stem}_", dir=tempfile.gettempdir()) as tmp_file:
+            tmp_file_path = tmp_file.name
+        with time_stage("spool_upload"):
+            content_hash = await spool_upload(file, tmp_file_path)
+        INPUT_BYTES.observe(os.path.getsize(tmp_file_path))
+
+        return await process_document(filename, tmp_file_path, content_hash, batch_id)
+
+    except UploadTooLargeError as e:
+        logging.warning(f"File too large: {file.filename} ({e}). Skipping.")
+        failure = f"{file.filename} (File too large: {e})"
+        count_file_outcome(failure)
+        return None, failure
+    except Exception as e:
+        logging.error(f"General error processing file {file.filename}: {e}")
+        failure = f"{file.filename} (General error: {e})"
+        count_file_outcome(failure)
+        return None, failure
+    finally:
+        # Crucially, delete the temporary file to ensure statelessness
+        if tmp_file_path and os.path.exists(tmp_file_path):
+            try:
+                os.remove(tmp_file_path)
+                logging.debug(f"Cleaned up temporary file: {tmp_file_path}")
+            except OSError as e:
+                logging.error(f"Error removing temporary file {tmp_file_path}: {e}")
+
+
+def batch_csv_filename(batch_id: str) -> str:
+    """Download name of a batch's CSV; /download/csv/ streams it from the results store."""
+    return f"review_results_{batch_id}.csv"
+
+
+def build_batch_summary(total_files: int, processed_data: List[Dict[str, Any]], failed_files_list: List[str],
+                        batch_id: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Builds the summary returned by /upload/ and by completed jobs.
+    No CSV is written here: the batch's rows are already in the results store, and
+    /download/csv/ and /export stream them from there on request.
+    """
+    generated_csv_filename = batch_csv_filename(batch_id) if processed_data and batch_id else None
+    return {
+        "batch_id": batch_id, # Use with GET /results?batch_id= to page through every stored result
+        "total_files_uploaded": total_files,
         "files_processed_successfully": len(processed_data),
         "files_failed_or_skipped": len(failed_files_list),
         "failed_files_details": failed_files_list,
+        "duplicates_reused": sum(1 for item in processed_data if "duplicate_of" in item), # Near-duplicates answered from an earlier review
         "results_preview": processed_data[:5], # Show a preview of successful results
-        "csv_generated": csv_was_generated, # Indicate if a CSV was saved for this batch
-        "generated_csv_filename": generated_csv_filename # <-- New: return the filename of the saved CSV
+        "csv_generated": generated_csv_filename is not None, # Indicate if a CSV can be downloaded for this batch
+        "generated_csv_filename": generated_csv_filename # Filename to request from /download/csv/
+    }
+
+
+# --- Background Job Setup ---
+# Job mode persists uploads and returns a job id immediately; files are processed by worker
+# tasks running inside each API process and claimed through a SQLite queue, so a job resumes
+# after a restart without an external broker.
+job_store = JobStore(
+    db_path=config.get('jobs_db_path', 'data/jobs/jobs.sqlite3'),
+    storage_dir=config.get('jobs_storage_dir', 'data/jobs/files'),
+    lease_seconds=config.get('job_lease_seconds', 900)
+)
+
+
+async def collect_file_results(request: Request, filenames: List[str], tasks: List[asyncio.Task],
+                               batch_id: str) -> Tuple[List[Dict[str, Any]], List[str]]:
+    """
+    Waits for the per-file tasks of a request and returns (processed_data, failed_files_list),
+    in the order of 'filenames'.
+
+    Every file runs as its own task; the executors above bound how many are extracting or waiting
+    on the model at once. While they run, the client connection and the request deadline are
+    checked: if the client has gone or the deadline passes, the remaining files are cancelled
+    rather than reviewed for nobody.
+    """
+    loop = asyncio.get_running_loop()
+    processed_data = []
+    failed_files_list = []
+    deadline = loop.time() + REQUEST_DEADLINE_SECONDS if REQUEST_DEADLINE_SECONDS else None
+    pending = set(tasks)
+    stop_reason = None
+    while pending:
+        wait_seconds = DISCONNECT_POLL_SECONDS if deadline is None else max(0.0, min(DISCONNECT_POLL_SECONDS, deadline - loop.time()))
+        _, pending = await asyncio.wait(pending, timeout=wait_seconds)
+        if pending and await request.is_disconnected():
+            stop_reason = "Cancelled: client disconnected"
+        elif pending and deadline is not None and loop.time() >= deadline:
+            stop_reason = f"Timed out: request exceeded {REQUEST_DEADLINE_SECONDS}s"
+        if stop_reason:
+            logging.warning(f"Batch {batch_id}: {stop_reason}; cancelling {len(pending)} unfinished files.")
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+            break
+
+    # Results are kept in request order.
+    for filename, task in zip(filenames, tasks):
+        if task.cancelled():
+            failure = f"{filename} ({stop_reason})"
+            count_file_outcome(failure)
+            failed_files_list.append(failure)
+            continue
+        result, failure = task.result()
+        if result is not None:
+            processed_data.append(result)
+        else:
+            failed_files_list.append(failure)
+    return processed_data, failed_files_list
+
+
+async def finalize_job(job_id: str, finished_files: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Builds the final job summary (same shape as the /upload/ response) once every file is done."""
+    processed_data = [item['result'] for item in finished_files if item['result'] is not None]
+    failed_files_list = [item['failure'] for item in finished_files if item['result'] is None]
+    return build_batch_summary(len(finished_files), processed_data, failed_files_list, job_id)
+
+
+job_worker_pool = JobWorkerPool(
+    job_store,
+    process_fn=process_document,
+    finalize_fn=finalize_job,
+    concurrency=config.get('job_workers', 2),
+    poll_interval=config.get('job_poll_interval_seconds', 1.0)
+)
+
+
+# --- Startup ---
+# Heavy libraries are imported on first use. Under gunicorn with preload_app (gunicorn.conf.py) the
+# master imports them once before forking, so every worker shares them copy-on-write and a
+# respawned worker is ready without importing them again.
+PRELOAD_MODULES = ("pdfplumber", "pdfminer.high_level", "docx", "numpy", "google.generativeai")
+
+
+def preload_heavy_modules():
+    """Imports the optional heavy dependencies now. Returns the seconds it took."""
+    started = time.perf_counter()
+    for module_name in PRELOAD_MODULES:
+        try:
+            importlib.import_module(module_name)
+        except ImportError:
+            logging.info(f"Preload: {module_name} is not installed; skipping.")
+    return time.perf_counter() - started
+
+
+def record_startup_timings(lifespan_seconds: float):
+    """Logs and exports how long this worker took to become ready."""
+    preloaded = IMPORT_PID != os.getpid()
+    STARTUP_SECONDS.labels(phase="lifespan").observe(lifespan_seconds)
+    if not preloaded:
+        STARTUP_SECONDS.labels(phase="import").observe(IMPORT_SECONDS)
+    message = (f"Worker {os.getpid()} ready: app import {IMPORT_SECONDS:.3f}s "
+               f"({'preloaded by the master' if preloaded else 'in this process'}), lifespan {lifespan_seconds:.3f}s")
+    # Set by gunicorn.conf.py's post_fork hook: wall time from fork to ready, the cost of a respawn.
+    forked_at = os.environ.get('WORKER_FORKED_AT')
+    if forked_at:
+        fork_to_ready = time.time() - float(forked_at)
+        STARTUP_SECONDS.labels(phase="fork_to_ready").observe(fork_to_ready)
+        message += f", fork to ready {fork_to_ready:.3f}s"
+    logging.info(message)
+
+
+# --- API Endpoints ---
+@app.post("/upload/")
+async def upload_files(request: Request, files: List[UploadFile] = File(...)):
+    """Handles file uploads, processes them with the AI review, and returns results."""
+    check_request_size(files)
+    # Identifies this batch's rows in the results store
+    batch_id = uuid.uuid4().hex
+
+    tasks = [asyncio.create_task(process_uploaded_file(file, batch_id)) for file in files]
+    processed_data, failed_files_list = await collect_file_results(
+        request, [file.filename for file in files], tasks, batch_id
+    )
+
+    # Return status including whether a CSV can be downloaded and its filename
+    return JSONResponse(build_batch_summary(len(files), processed_data, failed_files_list, batch_id))
+
+
+@app.post("/jobs/")
+async def create_job(files: List[UploadFile] = File(...)):
+    """
+    Job mode for /upload/: persists the uploaded files, queues them for the background workers
+    and returns a job id immediately. Poll GET /jobs/{job_id} or follow GET /jobs/{job_id}/stream.
+    """
+    check_request_size(files)
+    loop = asyncio.get_running_loop()
+    job_id, job_dir = await loop.run_in_executor(None, job_store.new_job)
+    job_files = []
+    for index, file in enumerate(files):
+        filename = file.filename or ""
+        rejection = describe_upload_rejection(file)
+        if rejection:
+            job_files.append({"filename": filename, "failure": rejection})
+            continue
+        try:
+            # Stored under an index-based name; the original filename is only kept in the queue.
+            stored_path = os.path.join(job_dir, f"{index:05d}{Path(filename).suffix.lower()}")
+            with time_stage("spool_upload"):
+                content_hash = await spool_upload(file, stored_path)
+            INPUT_BYTES.observe(os.path.getsize(stored_path))
+            job_files.append({
+                "filename": filename,
+                "stored_path": stored_path,
+                "content_hash": content_hash
+            })
+        except UploadTooLargeError as e:
+            logging.warning(f"File too large: {filename} ({e}). Skipping.")
+            job_files.append({"filename": filename, "failure": f"{filename} (File too large: {e})"})
+        except Exception as e:
+            logging.error(f"Failed to persist {filename} for job {job_id}: {e}")
+            job_files.append({"filename": filename, "failure": f"{filename} (General error: {e})"})
+    # Files rejected here never reach a worker, so they are counted now.
+    for job_file in job_files:
+        if "failure" in job_file:
+            count_file_outcome(job_file["failure"])
+
+    await loop.run_in_executor(None, job_store.enqueue_job, job_id, job_files)
+    logging.info(f"Queued job {job_id} with {len(job_files)} files")
+    # A job whose files were all rejected at upload time has nothing to queue; complete it now.
+    await job_worker_pool.finalize_if_done(job_id)
+    return JSONResponse({
+        "job_id": job_id,
+        "status": JOB_QUEUED,
+        "total_files": len(job_files),
+        "status_url": f"/jobs/{job_id}",
+        "stream_url": f"/jobs/{job_id}/stream"
+    }, status_code=202)
+
+
+@app.get("/jobs/{job_id}")
+async def get_job_status(job_id: str):
+    """Returns the progress of a job and, once completed, the same summary /upload/ returns."""
+    job = await asyncio.get_running_loop().run_in_executor(None, job_store.get_job, job_id)
+    if job is None:
+        return JSONResponse({"detail": f"Job '{job_id}' not found."}, status_code=404)
+
+    counts = job['file_counts']
+    return JSONResponse({
+        "job_id": job_id,
+        "status": job['status'],
+        "total_files": job['total_files'],
+        "files_completed": counts.get(FILE_DONE, 0) + counts.get(FILE_FAILED, 0),
+        "files_processed_successfully": counts.get(FILE_DONE, 0),
+        "files_failed_or_skipped": counts.get(FILE_FAILED, 0),
+        "summary": job['summary']
+    })
+
+
+@app.get("/jobs/{job_id}/stream")
+async def stream_job(job_id: str, format: str = "ndjson"):
+    """
+    Streams job progress: one event per file as soon as it is validated (or fails), followed by
+    a final 'completed' event carrying the job summary. 'format' is 'ndjson' (default) or 'sse'.
+    """
+    loop = asyncio.get_running_loop()
+    if await loop.run_in_executor(None, job_store.get_job, job_id) is None:
+        return JSONResponse({"detail": f"Job '{job_id}' not found."}, status_code=404)
+    if format not in ("ndjson", "sse"):
+        return JSONResponse({"detail": "format must be 'ndjson' or 'sse'."}, status_code=400)
+
+    poll_interval = config.get('job_stream_poll_interval_seconds', 0.5)
+
+    def encode(event: Dict[str, Any]) -> str:
+        if format == "sse":
+            return f"event: {event['event']}\ndata: {json.dumps(event)}\n\n"
+        return json.dumps(event) + "\n"
+
+    async def event_stream():
+        last_seq = -1
+        while True:
+            # The job may be processed by a worker in another process, so progress is read from the store.
+            job = await loop.run_in_executor(None, job_store.get_job, job_id)
+            for item in await loop.run_in_executor(None, job_store.get_finished_files, job_id, last_seq):
+                last_seq = item['finished_seq']
+                yield encode({
+                    "event": "file",
+                    "file_index": item['file_index'],
+                    "filename": item['filename'],
+                    "status": item['status'],
+                    "result": item['result'],
+                    "failure": item['failure']
+                })
+            if job['status'] == JOB_COMPLETED:
+                yield encode({"event": "completed", "job_id": job_id, "summary": job['summary']})
+                return
+            await asyncio.sleep(poll_interval)
+
+    media_type = "text/event-stream" if format == "sse" else "application/x-ndjson"
+    return StreamingResponse(event_stream(), media_type=media_type, headers={"Cache-Control": "no-cache"})
+
+# At most this many stored documents are re-reviewed per /rereview request; page through larger corpora.
+REREVIEW_MAX_DOCUMENTS = config.get('rereview_max_documents', 100)
+
+
+class RereviewRequest(BaseModel):
+    content_hashes: Optional[List[str]] = None # Documents to re-review; default: the stored corpus, page by page
+    model_name: Optional[str] = None # Default: the configured model
+    prompt_template: Optional[str] = None # Replaces the review prompt; must contain {paper}
+    limit: int = 50
+    cursor: Optional[str] = None # 'next_cursor' of the previous page
+
+
+@app.post("/rereview")
+async def rereview_documents(request: Request, body: RereviewRequest):
+    """
+    Re-reviews stored documents with another model and/or prompt, from their stored text: nothing
+    is uploaded or parsed again. Either list 'content_hashes' (as returned by /results), or walk
+    the whole stored corpus 'limit' documents at a time by passing back 'next_cursor' until it is
+    null. Results are cached and recorded under the returned batch_id like /upload/ results, so
+    /results and /export work on them too; the response has the same shape as /upload/'s.
+    """
+    if text_store is None:
+        return JSONResponse({"detail": "The extracted text store is disabled ('text_store_enabled')."}, status_code=400)
+    if body.content_hashes and len(body.content_hashes) > REREVIEW_MAX_DOCUMENTS:
+        return JSONResponse({"detail": f"At most {REREVIEW_MAX_DOCUMENTS} documents can be re-reviewed per request."}, status_code=400)
+    limit = max(1, min(body.limit, REREVIEW_MAX_DOCUMENTS))
+    loop = asyncio.get_running_loop()
+    try:
+        if body.prompt_template is not None:
+            check_prompt_template(body.prompt_template)
+        backend = get_review_backend(body.model_name)
+        if body.content_hashes:
+            requested = list(dict.fromkeys(body.content_hashes))
+            entries = await loop.run_in_executor(None, text_store.find_documents, requested)
+            entries = [entry for entry in entries if has_current_extraction_settings(entry)]
+            stored = {entry["content_hash"] for entry in entries}
+            # Unknown hashes are still run, so they are reported as "(No stored text)" failures.
+            entries += [{"content_hash": content_hash, "filename": content_hash} for content_hash in requested if content_hash not in stored]
+            next_cursor = None
+        else:
+            entries = await loop.run_in_executor(None, text_store.list_documents, limit, body.cursor)
+            next_cursor = entries[-1]["cursor"] if len(entries) == limit else None
+            entries = [entry for entry in entries if has_current_extraction_settings(entry)]
+    except ValueError as e:
+        return JSONResponse({"detail": str(e)}, status_code=400)
+
+    batch_id = uuid.uuid4().hex
+    filenames = [entry["filename"] or entry["content_hash"] for entry in entries]
+    # The tasks copy the current context, so the overrides apply to them (and to the threads they use).
+    with review_overrides(backend=backend, prompt_template=body.prompt_template):
+        model_name, prompt_version = get_model_name(), get_prompt_version()
+        tasks = [
+            asyncio.create_task(process_document(filename, None, entry["content_hash"], batch_id))
+            for filename, entry in zip(filenames, entries)
+        ]
+    logging.info(f"Re-reviewing {len(tasks)} stored documents with {model_name} (prompt {prompt_version}) as batch {batch_id}")
+    processed_data, failed_files_list = await collect_file_results(request, filenames, tasks, batch_id)
+
+    return JSONResponse({
+        **build_batch_summary(len(tasks), processed_data, failed_files_list, batch_id),
+        "model_name": model_name,
+        "prompt_version": prompt_version,
+        "next_cursor": next_cursor # Null when the end of the stored corpus has been reached
     })
 
+
+@app.get("/results")
+async def query_results(limit: int = 50, cursor: Optional[str] = None, year: Optional[int] = None,
+                        year_from: Optional[int] = None, year_to: Optional[int] = None,
+                        country: Optional[str] = None, author: Optional[str] = None,
+                        estimation_technique: Optional[str] = None, q: Optional[str] = None,
+                        batch_id: Optional[str] = None, content_hash: Optional[str] = None):
+    """
+    Pages through stored review results, newest first.
+    Filters: year / year_from / year_to (publication year), country, author, estimation_technique,
+    batch_id, content_hash, and q (full-text search over findings and research gaps).
+    Pass the returned next_cursor as 'cursor' to get the next page.
+    """
+    try:
+        rows, next_cursor = await asyncio.get_running_loop().run_in_executor(None, partial(
+            results_store.query, limit=limit, cursor=cursor, year=year, year_from=year_from, year_to=year_to,
+            country=country, author=author, estimation_technique=estimation_technique, q=q,
+            batch_id=batch_id, content_hash=content_hash
+        ))
+    except ValueError as e:
+        return JSONResponse({"detail": str(e)}, status_code=400)
+    return JSONResponse({"results": rows, "count": len(rows), "next_cursor": next_cursor})
+
+
+@app.get("/export")
+async def export_results(format: str = "csv", gzip: bool = False, batch_id: Optional[List[str]] = Query(None),
+                         year: Optional[int] = None, year_from: Optional[int] = None, year_to: Optional[int] = None,
+                         country: Optional[str] = None, author: Optional[str] = None,
+                         estimation_technique: Optional[str] = None, q: Optional[str] = None,
+                         content_hash: Optional[str] = None):
+    """
+    Streams stored results as one download in csv, ndjson, parquet or xlsx (gzip=true compresses it).
+    Repeat batch_id to merge several batches; the other filters are the same as GET /results.
+    Rows are read from the results store in chunks, so memory use does not grow with the export size.
+    """
+    try:
+        check_export_format(format)
+    except ExportFormatError as e:
+        return JSONResponse({"detail": str(e)}, status_code=400)
+
+    rows = results_store.iter_results(
+        batch_ids=batch_id, year=year, year_from=year_from, year_to=year_to, country=country, author=author,
+        estimation_technique=estimation_technique, q=q, content_hash=content_hash
+    )
+    filename = export_filename(f"review_results_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}", format, gzip)
+    logging.info(f"Streaming {format} export {filename} (batches={batch_id})")
+    # A plain generator: Starlette iterates it in its threadpool, keeping SQLite reads off the event loop.
+    return StreamingResponse(
+        stream_export(rows, format, EXPORT_COLUMNS, gzip),
+        media_type=export_media_type(format, gzip),
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+
 # MODIFIED Endpoint to download a SPECIFIC generated CSV file
 # The route now accepts a filename parameter.
 @app.get("/download/csv/{filename}") 
@@ -280,6 +1131,22 @@ async def download_specific_csv(filename: str): # Added filename parameter
         logging.warning(f"Attempted to access invalid or disallowed file: {filename} from {abs_requested_csv_path}")
         return JSONResponse({"detail": "Invalid filename or path requested."}, status_code=400)
 
+    # Batch CSVs are no longer written at upload time: stream them from the results store,
+    # with the same columns the per-batch CSV files had.
+    if not os.path.exists(requested_csv_path):
+        batch_match = re.fullmatch(r"review_results_([A-Za-z0-9_-]+)\.csv", filename)
+        if batch_match:
+            batch_id = batch_match.group(1)
+            loop = asyncio.get_running_loop()
+            first_rows, _ = await loop.run_in_executor(None, partial(results_store.query, limit=1, batch_id=batch_id))
+            if first_rows:
+                logging.info(f"Streaming CSV for batch {batch_id} from the results store")
+                return StreamingResponse(
+                    stream_export(results_store.iter_results(batch_id=batch_id), "csv", RESULT_FIELDS),
+                    media_type='text/csv',
+                    headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+                )
+
     # Check if the file actually exists at the constructed path
     if not os.path.exists(requested_csv_path):
         logging.warning(f"Requested CSV file not found: {requested_csv_path}")
@@ -295,4 +1162,76 @@ async def download_specific_csv(filename: str): # Added filename parameter
         )
     except Exception as e:
         logging.error(f"Error serving CSV file {requested_csv_path}: {e}")
-        return JSONResponse({"detail": "An error occurred while serving the CSV file."}, status_code=500)
\ No newline at end of file
+        return JSONResponse({"detail": "An error occurred while serving the CSV file."}, status_code=500)
+
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus metrics (text exposition format), aggregated across gunicorn workers."""
+    body, content_type = await asyncio.get_running_loop().run_in_executor(None, render_metrics)
+    return Response(content=body, media_type=content_type)
+
+
+# --- Admin Endpoints ---
+def check_admin_key(x_admin_key: Optional[str]):
+    """
+    Guards admin endpoints. If 'admin_api_key' is set in the environment (.env), the request
+    must send it in the X-Admin-Key header; if it is not set, admin endpoints are open.
+    """
+    expected_key = os.getenv('admin_api_key')
+    if expected_key and x_admin_key != expected_key:
+        raise HTTPException(status_code=403, detail="Invalid or missing admin key.")
+
+
+@app.get("/admin/cache")
+async def get_cache_stats(x_admin_key: Optional[str] = Header(None)):
+    """Returns review cache size and hit/miss counters."""
+    check_admin_key(x_admin_key)
+    if review_cache is None:
+        return JSONResponse({"enabled": False})
+    stats = await asyncio.get_running_loop().run_in_executor(None, review_cache.stats)
+    return JSONResponse({"enabled": True, **stats})
+
+
+@app.get("/admin/texts")
+async def get_text_store_stats(x_admin_key: Optional[str] = Header(None)):
+    """Returns the number of stored document texts and the size of the text store."""
+    check_admin_key(x_admin_key)
+    if text_store is None:
+        return JSONResponse({"enabled": False})
+    stats = await asyncio.get_running_loop().run_in_executor(None, text_store.stats)
+    return JSONResponse({"enabled": True, **stats})
+
+
+@app.delete("/admin/texts")
+async def invalidate_text_store(content_hash: Optional[str] = None, x_admin_key: Optional[str] = Header(None)):
+    """
+    Removes stored document texts, so they are extracted again on their next upload (e.g. after
+    a parser fix). Without query parameters every text is removed; 'content_hash' limits it to
+    one document.
+    """
+    check_admin_key(x_admin_key)
+    if text_store is None:
+        return JSONResponse({"enabled": False, "texts_removed": 0})
+    removed = await asyncio.get_running_loop().run_in_executor(None, text_store.invalidate, content_hash)
+    logging.info(f"Text store invalidated (content_hash={content_hash}): {removed} texts removed")
+    return JSONResponse({"enabled": True, "texts_removed": removed})
+
+
+@app.delete("/admin/cache")
+async def invalidate_cache(content_hash: Optional[str] = None, model_name: Optional[str] = None,
+                           x_admin_key: Optional[str] = Header(None)):
+    """
+    Invalidates the review cache. Without query parameters the whole cache is cleared;
+    'content_hash' and/or 'model_name' limit the invalidation to matching entries.
+    """
+    check_admin_key(x_admin_key)
+    if review_cache is None:
+        return JSONResponse({"enabled": False, "entries_removed": 0})
+    removed = await asyncio.get_running_loop().run_in_executor(None, review_cache.invalidate, content_hash, model_name)
+    logging.info(f"Review cache invalidated (content_hash={content_hash}, model_name={model_name}): {removed} entries removed")
+    return JSONResponse({"enabled": True, "entries_removed": removed})
+
+
+IMPORT_SECONDS = time.perf_counter() - IMPORT_STARTED
+IMPORT_PID = os.getpid()
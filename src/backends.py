@@ -0,0 +1,89 @@
+import json
+import logging
+import urllib.request
+import urllib.error
+
+# Model backends used by reviewer.generate(). Each backend exposes 'name', 'model_name' and
+# generate(prompt) -> response text, raising on errors. Errors carry an HTTP-style 'code' (and,
+# when the server sends one, a 'retry_delay' in seconds) so rate_limiter can decide whether and
+# when to retry.
+
+
+class ModelBackendError(Exception):
+    """Error returned by a model backend, with the HTTP status and optional retry hint."""
+
+    def __init__(self, message, code=None, retry_delay=None):
+        super().__init__(message)
+        self.code = code
+        self.retry_delay = retry_delay
+
+
+class GeminiBackend:
+    """Google Gemini through the google-generativeai client."""
+
+    name = "gemini"
+
+    def __init__(self, api_key, model_name, system_instruction):
+        import google.generativeai as genai
+
+        genai.configure(api_key=api_key)
+        self.model_name = model_name
+        self.model = genai.GenerativeModel(model_name=model_name, system_instruction=system_instruction)
+
+    def generate(self, prompt):
+        return self.model.generate_content(prompt).text
+
+
+class HTTPBackend:
+    """
+    Minimal JSON-over-HTTP backend, e.g. the local stand-in server in benchmarks/mock_llm_server.py.
+
+    POST {base_url}/generate with {"model", "system_instruction", "prompt"}; the server answers
+    {"text": "..."}. Non-2xx answers raise ModelBackendError with the status code, and a
+    Retry-After header is passed on as the retry hint.
+    """
+
+    name = "http"
+
+    def __init__(self, base_url, model_name="mock-llm", system_instruction="", timeout=120):
+        self.base_url = base_url.rstrip("/")
+        self.model_name = model_name
+        self.system_instruction = system_instruction
+        self.timeout = timeout
+
+    def generate(self, prompt):
+        body = json.dumps({
+            "model": self.model_name,
+            "system_instruction": self.system_instruction,
+            "prompt": prompt
+        }).encode("utf-8")
+        request = urllib.request.Request(
+            f"{self.base_url}/generate", data=body, headers={"Content-Type": "application/json"}, method="POST"
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return json.loads(response.read().decode("utf-8"))["text"]
+        except urllib.error.HTTPError as e:
+            retry_after = e.headers.get("Retry-After") if e.headers else None
+            try:
+                retry_delay = float(retry_after) if retry_after else None
+            except ValueError:
+                retry_delay = None
+            raise ModelBackendError(f"HTTP {e.code} from {self.base_url}: {e.reason}", code=e.code, retry_delay=retry_delay)
+        except (urllib.error.URLError, TimeoutError) as e:
+            raise ConnectionError(f"Could not reach model backend at {self.base_url}: {e}")
+
+
+def create_backend(backend_name, model_name, system_instruction, api_key=None, base_url=None, timeout=120):
+    """Builds a backend by name ('gemini' or 'http'). Returns None if it cannot be configured."""
+    if backend_name == "http":
+        if not base_url:
+            logging.error("Model backend 'http' selected but no model_backend_url configured.")
+            return None
+        return HTTPBackend(base_url, model_name=model_name, system_instruction=system_instruction, timeout=timeout)
+    if backend_name == "gemini":
+        if not api_key:
+            logging.error("Google AI API key 'google_ai_studio_key' not found in .env file. Gemini model will not be available.")
+            return None
+        return GeminiBackend(api_key, model_name, system_instruction)
+    raise ValueError(f"Unknown model backend '{backend_name}'. Expected 'gemini' or 'http'.")
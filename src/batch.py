@@ -0,0 +1,208 @@
+"""
+Resumable batch runner for whole directories of papers.
+
+Usage (from the repository root):
+    python -m src.batch [--input-folder DIR] [--output CSV] [--concurrency N] [--retry-failed]
+
+Scans the input folder (config.json 'input_folder' by default) recursively for PDF and DOCX
+files and runs them through the same pipeline as /upload/. Progress is checkpointed in SQLite
+after every file, so an interrupted run picks up where it stopped; files whose mtime and content
+hash are unchanged since they were last processed are skipped. Each validated result is appended
+to the output CSV as soon as it is available.
+"""
+import argparse
+import asyncio
+import csv
+import logging
+import os
+import time
+
+from src.cache import compute_file_hash
+from src.results_store import RESULT_FIELDS
+from src.sqlite_store import connect
+from src.utils import get_document_files
+
+# src.api (the app, its stores and executors) is imported inside the functions, not here: under
+# `python -m src.batch` this module is __main__, which every isolated extraction process imports
+# again (see extraction.run_isolated_many), and that must stay cheap.
+
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+
+
+class BatchCheckpoint:
+    """Records which files have been processed (path, size, mtime, content hash, outcome)."""
+
+    def __init__(self, db_path):
+        db_dir = os.path.dirname(db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+        self.conn = connect(db_path)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS processed_files (
+                path TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                mtime REAL NOT NULL,
+                content_hash TEXT NOT NULL,
+                status TEXT NOT NULL,
+                failure TEXT,
+                processed_at REAL NOT NULL
+            )
+        """)
+        self.conn.commit()
+
+    def get(self, path):
+        row = self.conn.execute(
+            "SELECT size, mtime, content_hash, status FROM processed_files WHERE path = ?", (path,)
+        ).fetchone()
+        if row is None:
+            return None
+        return {"size": row[0], "mtime": row[1], "content_hash": row[2], "status": row[3]}
+
+    def record(self, path, size, mtime, content_hash, status, failure=None):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO processed_files (path, size, mtime, content_hash, status, failure, processed_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (path, size, mtime, content_hash, status, failure, time.time())
+        )
+        self.conn.commit()
+
+    def touch(self, path, mtime):
+        """Updates the stored mtime of a file whose content did not change."""
+        self.conn.execute("UPDATE processed_files SET mtime = ? WHERE path = ?", (mtime, path))
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+
+class ResultWriter:
+    """Appends validated results to a CSV file one row at a time, writing the header only once."""
+
+    FIELDNAMES = ["source_path", "content_hash"] + RESULT_FIELDS
+
+    def __init__(self, output_path):
+        output_dir = os.path.dirname(output_path)
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+        write_header = not os.path.exists(output_path) or os.path.getsize(output_path) == 0
+        self.file = open(output_path, "a", newline="", encoding="utf-8")
+        self.writer = csv.DictWriter(self.file, fieldnames=self.FIELDNAMES, extrasaction="ignore")
+        if write_header:
+            self.writer.writeheader()
+            self.file.flush()
+
+    def append(self, source_path, content_hash, result):
+        self.writer.writerow({"source_path": source_path, "content_hash": content_hash, **result})
+        # Flush every row so an interrupted run keeps everything written so far.
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+def needs_processing(checkpoint, path, retry_failed):
+    """
+    Decides whether a file has to be (re)processed.
+    Returns (needed, size, mtime, content_hash); the hash is only computed when the mtime or size
+    changed, so resuming over thousands of unchanged files stays cheap.
+    """
+    stat = os.stat(path)
+    previous = checkpoint.get(path)
+    if previous is None:
+        return True, stat.st_size, stat.st_mtime, None
+    if previous["status"] == STATUS_FAILED and retry_failed:
+        return True, stat.st_size, stat.st_mtime, None
+    if previous["size"] == stat.st_size and previous["mtime"] == stat.st_mtime:
+        return False, stat.st_size, stat.st_mtime, previous["content_hash"]
+
+    # Touched but possibly unchanged (e.g. copied with a new mtime): compare content hashes.
+    content_hash = compute_file_hash(path)
+    if content_hash == previous["content_hash"] and not (previous["status"] == STATUS_FAILED and retry_failed):
+        checkpoint.touch(path, stat.st_mtime)
+        return False, stat.st_size, stat.st_mtime, content_hash
+    return True, stat.st_size, stat.st_mtime, content_hash
+
+
+async def run_batch(input_folder, output_path, checkpoint_path, concurrency=4, retry_failed=False):
+    """Processes every new or changed document under input_folder. Returns a summary dict."""
+    from src.api import process_document
+
+    loop = asyncio.get_running_loop()
+    checkpoint = BatchCheckpoint(checkpoint_path)
+    writer = ResultWriter(output_path)
+    paths = get_document_files(input_folder, recursive=True)
+    logging.info(f"Batch: found {len(paths)} documents under {input_folder}")
+
+    # Rows of this run are also recorded in the results store under this batch id.
+    batch_id = f"cli_{time.strftime('%Y%m%d_%H%M%S')}"
+    queue = asyncio.Queue()
+    skipped = 0
+    for path in paths:
+        needed, size, mtime, content_hash = needs_processing(checkpoint, path, retry_failed)
+        if needed:
+            queue.put_nowait((path, size, mtime, content_hash))
+        else:
+            skipped += 1
+    total_to_process = queue.qsize()
+    logging.info(f"Batch: {total_to_process} to process, {skipped} unchanged and skipped")
+
+    counts = {"processed": 0, "succeeded": 0, "failed": 0}
+
+    async def worker():
+        while True:
+            try:
+                path, size, mtime, content_hash = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            if content_hash is None:
+                content_hash = await loop.run_in_executor(None, compute_file_hash, path)
+            result, failure = await process_document(os.path.basename(path), path, content_hash, batch_id)
+            # Results and checkpoints are written from the event loop thread only, one file at a time.
+            if result is not None:
+                writer.append(path, content_hash, result)
+                checkpoint.record(path, size, mtime, content_hash, STATUS_DONE)
+                counts["succeeded"] += 1
+            else:
+                checkpoint.record(path, size, mtime, content_hash, STATUS_FAILED, failure)
+                counts["failed"] += 1
+                logging.warning(f"Batch: failed {failure}")
+            counts["processed"] += 1
+            logging.info(f"Batch: {counts['processed']}/{total_to_process} done ({path})")
+
+    try:
+        await asyncio.gather(*(worker() for _ in range(max(1, concurrency))))
+    finally:
+        writer.close()
+        checkpoint.close()
+
+    return {"found": len(paths), "skipped": skipped, **counts}
+
+
+def main(argv=None):
+    from src.api import config, configure_model
+
+    parser = argparse.ArgumentParser(description="Review every PDF/DOCX under a folder, resumably.")
+    parser.add_argument("--input-folder", default=config.get('input_folder', 'data/papers'),
+                        help="Folder to scan recursively (default: config.json input_folder)")
+    parser.add_argument("--output", default=config.get('batch_output_csv', 'data/response/batch_results.csv'),
+                        help="CSV file results are appended to")
+    parser.add_argument("--checkpoint", default=config.get('batch_checkpoint_db', 'data/batch/checkpoint.sqlite3'),
+                        help="SQLite checkpoint database used to resume and skip unchanged files")
+    parser.add_argument("--concurrency", type=int, default=config.get('batch_concurrency', 4),
+                        help="Number of files processed at the same time")
+    parser.add_argument("--retry-failed", action="store_true",
+                        help="Reprocess files that failed in a previous run")
+    args = parser.parse_args(argv)
+
+    if not os.path.isdir(args.input_folder):
+        parser.error(f"Input folder not found: {args.input_folder}")
+
+    configure_model()
+    summary = asyncio.run(run_batch(args.input_folder, args.output, args.checkpoint, args.concurrency, args.retry_failed))
+    logging.info(f"Batch finished: {summary}")
+    print(summary)
+
+
+if __name__ == "__main__":
+    main()
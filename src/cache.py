@@ -0,0 +1,155 @@
+import hashlib
+import json
+import time
+import logging
+
+from src.sqlite_store import SQLiteStore
+
+
+def compute_content_hash(content):
+    """Returns the SHA-256 hex digest of the given bytes."""
+    return hashlib.sha256(content).hexdigest()
+
+
+def compute_file_hash(path, chunk_size=1024 * 1024):
+    """Returns the SHA-256 hex digest of a file, read in chunks."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def make_cache_key(content_hash, model_name, prompt_version):
+    """
+    Builds the cache key for a review result.
+    A result is only reused when the document bytes, the model and the prompt are all the same.
+    """
+    return f"{content_hash}:{model_name}:{prompt_version}"
+
+
+class ReviewCache(SQLiteStore):
+    """
+    Persistent, content-addressed cache of validated ResearchPaperData results, stored in SQLite.
+
+    SQLite is used so the cache is shared by every gunicorn worker on the host without
+    running an extra service. Entries are evicted by age (max_age_days) and by count
+    (max_entries, least recently used first). Hit/miss counters are kept in the same
+    database so they reflect all workers, not just the current process.
+    """
+
+    def __init__(self, db_path='data/cache/review_cache.sqlite3', max_entries=10000, max_age_days=30):
+        super().__init__(db_path)
+        self.max_entries = max_entries
+        self.max_age_seconds = max_age_days * 24 * 60 * 60 if max_age_days else None
+
+    def _create_schema(self, conn):
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS review_cache (
+                cache_key TEXT PRIMARY KEY,
+                content_hash TEXT NOT NULL,
+                model_name TEXT NOT NULL,
+                prompt_version TEXT NOT NULL,
+                result_json TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_accessed REAL NOT NULL
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_review_cache_last_accessed ON review_cache (last_accessed)")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS review_cache_stats (
+                name TEXT PRIMARY KEY,
+                value INTEGER NOT NULL
+            )
+        """)
+        conn.execute("INSERT OR IGNORE INTO review_cache_stats (name, value) VALUES ('hits', 0), ('misses', 0)")
+
+    def _bump_counter(self, conn, name):
+        conn.execute("UPDATE review_cache_stats SET value = value + 1 WHERE name = ?", (name,))
+
+    def get(self, content_hash, model_name, prompt_version):
+        """Returns the cached result dict for this document/model/prompt, or None on a miss."""
+        self._ensure_schema()
+        key = make_cache_key(content_hash, model_name, prompt_version)
+        now = time.time()
+        try:
+            with self._connect() as conn:
+                row = conn.execute(
+                    "SELECT result_json, created_at FROM review_cache WHERE cache_key = ?", (key,)
+                ).fetchone()
+                # Expired entries count as misses; they are removed by the next evict().
+                if row is None or (self.max_age_seconds and now - row[1] > self.max_age_seconds):
+                    self._bump_counter(conn, 'misses')
+                    return None
+                conn.execute("UPDATE review_cache SET last_accessed = ? WHERE cache_key = ?", (now, key))
+                self._bump_counter(conn, 'hits')
+                return json.loads(row[0])
+        except Exception as e:
+            # The cache must never break a review; treat any failure as a miss.
+            logging.error(f"Review cache lookup failed for {content_hash}: {e}")
+            return None
+
+    def set(self, content_hash, model_name, prompt_version, result):
+        """Stores a validated result dict and applies eviction."""
+        self._ensure_schema()
+        key = make_cache_key(content_hash, model_name, prompt_version)
+        now = time.time()
+        try:
+            with self._connect() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO review_cache "
+                    "(cache_key, content_hash, model_name, prompt_version, result_json, created_at, last_accessed) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (key, content_hash, model_name, prompt_version, json.dumps(result), now, now)
+                )
+                self._evict(conn, now)
+        except Exception as e:
+            logging.error(f"Failed to store review cache entry for {content_hash}: {e}")
+
+    def _evict(self, conn, now):
+        if self.max_age_seconds:
+            conn.execute("DELETE FROM review_cache WHERE created_at < ?", (now - self.max_age_seconds,))
+        if self.max_entries:
+            conn.execute(
+                "DELETE FROM review_cache WHERE cache_key IN ("
+                "SELECT cache_key FROM review_cache ORDER BY last_accessed DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            )
+
+    def invalidate(self, content_hash=None, model_name=None):
+        """
+        Removes cache entries. With no arguments the whole cache is cleared;
+        otherwise only entries matching the given content hash and/or model are removed.
+        Returns the number of entries removed.
+        """
+        self._ensure_schema()
+        clauses = []
+        params = []
+        if content_hash:
+            clauses.append("content_hash = ?")
+            params.append(content_hash)
+        if model_name:
+            clauses.append("model_name = ?")
+            params.append(model_name)
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self._connect() as conn:
+            cursor = conn.execute(f"DELETE FROM review_cache{where}", params)
+            return cursor.rowcount
+
+    def stats(self):
+        """Returns entry count and hit/miss counters aggregated across all workers."""
+        self._ensure_schema()
+        with self._connect() as conn:
+            entries = conn.execute("SELECT COUNT(*) FROM review_cache").fetchone()[0]
+            counters = dict(conn.execute("SELECT name, value FROM review_cache_stats").fetchall())
+        hits = counters.get('hits', 0)
+        misses = counters.get('misses', 0)
+        lookups = hits + misses
+        return {
+            "entries": entries,
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            "max_entries": self.max_entries,
+            "max_age_days": self.max_age_seconds / 86400 if self.max_age_seconds else None,
+        }
@@ -0,0 +1,86 @@
+"""
+Deadlines and cancellation for work running in executor threads.
+
+process_document opens a WorkScope per file. The scope travels with the context (see
+tracing.with_context), so model calls, retries and map-step chunks running in other threads can
+check it and stop early once the file is cancelled (client disconnected, request deadline) or
+its deadline has passed, instead of paying for results nobody will receive.
+"""
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+
+
+class WorkCancelled(Exception):
+    """The work was cancelled, e.g. because the client disconnected."""
+
+
+class DeadlineExceeded(Exception):
+    """The work ran past its deadline."""
+
+
+class WorkScope:
+    def __init__(self, timeout=None):
+        self.deadline = time.monotonic() + timeout if timeout else None
+        self.cancel_event = threading.Event()
+        self.cancel_reason = None
+
+    def cancel(self, reason="cancelled"):
+        if not self.cancel_event.is_set():
+            self.cancel_reason = reason
+            self.cancel_event.set()
+
+    def set_timeout(self, timeout):
+        """Starts a new deadline, 'timeout' seconds from now (e.g. when the next stage begins)."""
+        self.deadline = time.monotonic() + timeout if timeout else None
+
+    def remaining(self):
+        """Seconds left before the deadline (None without a deadline)."""
+        return None if self.deadline is None else max(0.0, self.deadline - time.monotonic())
+
+    def check(self):
+        """Raises WorkCancelled or DeadlineExceeded if the work should stop."""
+        if self.cancel_event.is_set():
+            raise WorkCancelled(self.cancel_reason or "cancelled")
+        if self.deadline is not None and time.monotonic() >= self.deadline:
+            raise DeadlineExceeded("deadline exceeded")
+
+
+_current_scope = contextvars.ContextVar("work_scope", default=None)
+
+
+@contextmanager
+def work_scope(timeout=None):
+    """Runs the with-block (and everything it hands to with_context) under a new WorkScope."""
+    scope = WorkScope(timeout)
+    token = _current_scope.set(scope)
+    try:
+        yield scope
+    finally:
+        _current_scope.reset(token)
+
+
+def current_scope():
+    return _current_scope.get()
+
+
+def check_current_scope():
+    """Raises if the current work was cancelled or is past its deadline; no-op outside a scope."""
+    scope = _current_scope.get()
+    if scope is not None:
+        scope.check()
+
+
+def interruptible_sleep(seconds):
+    """time.sleep() that wakes up (and raises) as soon as the current work is cancelled."""
+    scope = _current_scope.get()
+    if scope is None:
+        time.sleep(seconds)
+        return
+    remaining = scope.remaining()
+    if remaining is not None and remaining < seconds:
+        # Sleeping past the deadline is pointless: stop now.
+        raise DeadlineExceeded("deadline would pass while waiting to retry")
+    scope.cancel_event.wait(seconds)
+    scope.check()
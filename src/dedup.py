@@ -0,0 +1,184 @@
+import hashlib
+import json
+import re
+import time
+import zlib
+import logging
+from functools import lru_cache
+
+from src.sqlite_store import SQLiteStore
+
+# MinHash signature length and its LSH banding: 20 bands of 6 rows. A pair with Jaccard
+# similarity s becomes a candidate with probability 1 - (1 - s^6)^20: ~99.8% at 0.8, ~27% at 0.5
+# and ~1.5% at 0.3, so almost every true near-duplicate is found while few unrelated papers are
+# ever compared.
+NUM_PERMUTATIONS = 120
+LSH_BANDS = 20
+LSH_ROWS = NUM_PERMUTATIONS // LSH_BANDS
+SHINGLE_WORDS = 5
+# Texts with fewer shingles than this are too short to fingerprint reliably.
+MIN_SHINGLES = 50
+# Upper bound on candidates verified per lookup, so a very common bucket cannot slow lookups down.
+MAX_CANDIDATES = 200
+
+_MERSENNE_PRIME = (1 << 31) - 1
+
+
+@lru_cache(maxsize=1)
+def _permutations():
+    """
+    The (a, b) coefficients of the MinHash permutations. numpy is imported here, on first use,
+    so importing this module (and so starting the API) does not load it.
+    """
+    import numpy as np
+
+    rng = np.random.RandomState(20240531) # Fixed seed: signatures must be comparable across processes and restarts
+    return (rng.randint(1, _MERSENNE_PRIME, size=NUM_PERMUTATIONS, dtype=np.uint64),
+            rng.randint(0, _MERSENNE_PRIME, size=NUM_PERMUTATIONS, dtype=np.uint64))
+
+
+def shingle_hashes(text):
+    """Returns the distinct 32-bit hashes of the word 5-grams of the normalized text."""
+    import numpy as np
+
+    words = re.findall(r"\w+", (text or "").lower())
+    shingles = {
+        zlib.crc32(" ".join(words[i:i + SHINGLE_WORDS]).encode("utf-8"))
+        for i in range(max(0, len(words) - SHINGLE_WORDS + 1))
+    }
+    return np.fromiter(shingles, dtype=np.uint64, count=len(shingles))
+
+
+def compute_signature(text):
+    """
+    Returns the MinHash signature of a text (NUM_PERMUTATIONS uint32 values), or None when
+    the text is too short to fingerprint.
+    """
+    import numpy as np
+
+    hashes = shingle_hashes(text)
+    if len(hashes) < MIN_SHINGLES:
+        return None
+    perm_a, perm_b = _permutations()
+    signature = np.full(NUM_PERMUTATIONS, _MERSENNE_PRIME, dtype=np.uint64)
+    # Universal hashing (a*x + b) mod p for every permutation, in blocks to bound memory on long texts.
+    for start in range(0, len(hashes), 20000):
+        block = hashes[start:start + 20000]
+        permuted = (np.outer(perm_a, block) + perm_b[:, None]) % _MERSENNE_PRIME
+        np.minimum(signature, permuted.min(axis=1), out=signature)
+    return signature.astype(np.uint32)
+
+
+def estimate_similarity(signature_a, signature_b):
+    """Estimated Jaccard similarity of the two texts behind two signatures."""
+    return float((signature_a == signature_b).mean())
+
+
+def band_keys(signature):
+    """One 63-bit bucket key per LSH band (the band number is part of the key)."""
+    keys = []
+    for band in range(LSH_BANDS):
+        rows = signature[band * LSH_ROWS:(band + 1) * LSH_ROWS].tobytes()
+        digest = hashlib.blake2b(bytes([band]) + rows, digest_size=8).digest()
+        keys.append(int.from_bytes(digest, "big") >> 1) # Fits in SQLite's signed 64-bit INTEGER
+    return keys
+
+
+class NearDuplicateIndex(SQLiteStore):
+    """
+    MinHash/LSH index of extracted texts and their validated reviews, stored in SQLite.
+
+    The same paper often arrives as a preprint, the published PDF and a DOCX draft; their bytes
+    (and so the review cache key) differ, but their text is nearly identical. find() looks a new
+    text up through LSH_BANDS indexed bucket keys and verifies the candidates' signatures, so a
+    lookup costs a couple of index probes regardless of how many papers are stored.
+    Results are only reused for the same model and prompt version, like the review cache.
+    """
+
+    # One connection per thread: opening a connection per call would cost more than the lookup.
+    thread_local_connections = True
+
+    def __init__(self, db_path='data/dedup/fingerprints.sqlite3', similarity_threshold=0.8):
+        super().__init__(db_path)
+        self.similarity_threshold = similarity_threshold
+
+    def _create_schema(self, conn):
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS fingerprints (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                content_hash TEXT NOT NULL,
+                filename TEXT,
+                model_name TEXT NOT NULL,
+                prompt_version TEXT NOT NULL,
+                signature BLOB NOT NULL,
+                result_json TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                UNIQUE (content_hash, model_name, prompt_version)
+            )
+        """)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS lsh_buckets (
+                bucket INTEGER NOT NULL,
+                fingerprint_id INTEGER NOT NULL
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_lsh_buckets_bucket ON lsh_buckets (bucket)")
+
+    def find(self, signature, model_name, prompt_version, exclude_content_hash=None):
+        """
+        Returns the most similar stored paper at or above the similarity threshold as a dict
+        (content_hash, filename, similarity, result), or None.
+        """
+        if signature is None:
+            return None
+        import numpy as np
+
+        self._ensure_schema()
+        keys = band_keys(signature)
+        try:
+            rows = self._connect().execute(
+                f"""
+                SELECT f.content_hash, f.filename, f.signature, f.result_json
+                FROM fingerprints f
+                WHERE f.id IN (SELECT fingerprint_id FROM lsh_buckets WHERE bucket IN ({', '.join('?' for _ in keys)}))
+                  AND f.model_name = ? AND f.prompt_version = ?
+                LIMIT ?
+                """,
+                keys + [model_name, prompt_version, MAX_CANDIDATES]
+            ).fetchall()
+        except Exception as e:
+            logging.error(f"Near-duplicate lookup failed: {e}")
+            return None
+
+        best = None
+        for content_hash, filename, signature_blob, result_json in rows:
+            if content_hash == exclude_content_hash:
+                continue
+            similarity = estimate_similarity(signature, np.frombuffer(signature_blob, dtype=np.uint32))
+            if similarity >= self.similarity_threshold and (best is None or similarity > best["similarity"]):
+                best = {"content_hash": content_hash, "filename": filename, "similarity": similarity,
+                        "result_json": result_json}
+        if best is None:
+            return None
+        best["result"] = json.loads(best.pop("result_json"))
+        return best
+
+    def add(self, signature, content_hash, filename, model_name, prompt_version, result):
+        """Indexes a reviewed paper. Does nothing if it is already indexed or too short to fingerprint."""
+        if signature is None:
+            return
+        self._ensure_schema()
+        try:
+            with self._connect() as conn:
+                cursor = conn.execute(
+                    "INSERT OR IGNORE INTO fingerprints (content_hash, filename, model_name, prompt_version, signature, "
+                    "result_json, created_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (content_hash, filename, model_name, prompt_version, signature.tobytes(), json.dumps(result), time.time())
+                )
+                if cursor.rowcount:
+                    conn.executemany(
+                        "INSERT INTO lsh_buckets (bucket, fingerprint_id) VALUES (?, ?)",
+                        [(key, cursor.lastrowid) for key in band_keys(signature)]
+                    )
+        except Exception as e:
+            logging.error(f"Failed to index {filename} for near-duplicate detection: {e}")
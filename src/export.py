@@ -0,0 +1,175 @@
+import csv
+import io
+import json
+import logging
+import tempfile
+import zlib
+
+from src.results_store import RESULT_FIELDS
+
+# Columns of an export: where each row came from, followed by the ResearchPaperData fields.
+EXPORT_COLUMNS = ["batch_id", "source_filename", "content_hash"] + RESULT_FIELDS
+
+EXPORT_FORMATS = {
+    # format: (media type, file extension)
+    "csv": ("text/csv", "csv"),
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+    "xlsx": ("application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", "xlsx"),
+}
+
+# Rows buffered before a chunk is yielded (and, for Parquet, per row group).
+EXPORT_CHUNK_ROWS = 500
+# Read size when streaming a spooled XLSX workbook back to the client.
+FILE_READ_CHUNK_BYTES = 64 * 1024
+
+
+class ExportFormatError(ValueError):
+    """Raised for unknown formats or formats whose package is not installed."""
+
+
+def check_export_format(export_format):
+    """Validates the format before the response starts, so errors can still be reported as JSON."""
+    if export_format not in EXPORT_FORMATS:
+        raise ExportFormatError(f"Unsupported export format '{export_format}'. Use one of: {', '.join(EXPORT_FORMATS)}.")
+    # Parquet and XLSX use pyarrow and openpyxl (both in requirements.txt). They are imported on
+    # first use so starting the API does not load them; an install without them gets a clear error.
+    if export_format == "parquet":
+        try:
+            import pyarrow # noqa: F401
+        except ImportError:
+            raise ExportFormatError("Parquet export requires the 'pyarrow' package.")
+    if export_format == "xlsx":
+        try:
+            import openpyxl # noqa: F401
+        except ImportError:
+            raise ExportFormatError("XLSX export requires the 'openpyxl' package.")
+
+
+def _chunked(rows, size=EXPORT_CHUNK_ROWS):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _stream_csv(rows, columns):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=columns, extrasaction="ignore")
+    writer.writeheader()
+    for chunk in _chunked(rows):
+        writer.writerows(chunk)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+def _stream_ndjson(rows, columns):
+    for chunk in _chunked(rows):
+        yield "".join(
+            json.dumps({column: row.get(column) for column in columns}, ensure_ascii=False) + "\n" for row in chunk
+        ).encode("utf-8")
+
+
+class _DrainableSink(io.RawIOBase):
+    """Write-only file object whose written bytes are collected and handed out by drain()."""
+
+    def __init__(self):
+        self.buffer = bytearray()
+        self.position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.buffer += data
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def drain(self):
+        data = bytes(self.buffer)
+        self.buffer.clear()
+        return data
+
+
+def _stream_parquet(rows, columns):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([(column, pa.string()) for column in columns])
+    sink = _DrainableSink()
+    # Each chunk becomes one row group; its bytes are yielded as soon as it is written.
+    with pq.ParquetWriter(pa.PythonFile(sink, mode="w"), schema) as writer:
+        for chunk in _chunked(rows):
+            table = pa.Table.from_pylist(
+                [{column: None if row.get(column) is None else str(row.get(column)) for column in columns} for row in chunk],
+                schema=schema
+            )
+            writer.write_table(table)
+            yield sink.drain()
+    yield sink.drain()
+
+
+def _stream_xlsx(rows, columns):
+    import openpyxl
+
+    # An XLSX file is a zip archive that can only be finished at the end, so the write-only
+    # workbook (constant memory) is saved to a spooled temporary file and streamed from there.
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet("results")
+    sheet.append(columns)
+    for row in rows:
+        sheet.append([row.get(column) for column in columns])
+    with tempfile.SpooledTemporaryFile(max_size=8 * 1024 * 1024) as spool:
+        workbook.save(spool)
+        spool.seek(0)
+        while True:
+            data = spool.read(FILE_READ_CHUNK_BYTES)
+            if not data:
+                break
+            yield data
+
+
+def _gzip_stream(chunks):
+    compressor = zlib.compressobj(wbits=31) # 31 = gzip container
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def stream_export(rows, export_format="csv", columns=EXPORT_COLUMNS, gzip=False):
+    """
+    Serializes an iterable of result dicts in the given format, yielding bytes chunk by chunk.
+    Combined with ResultsStore.iter_results the whole export runs in constant memory.
+    """
+    check_export_format(export_format)
+    writers = {"csv": _stream_csv, "ndjson": _stream_ndjson, "parquet": _stream_parquet, "xlsx": _stream_xlsx}
+    chunks = writers[export_format](rows, columns)
+    if gzip:
+        chunks = _gzip_stream(chunks)
+    try:
+        yield from chunks
+    except Exception as e:
+        # Headers are already sent at this point; log and end the (truncated) download.
+        logging.error(f"Export ({export_format}) failed while streaming: {e}")
+        raise
+
+
+def export_filename(base_name, export_format, gzip=False):
+    extension = EXPORT_FORMATS[export_format][1]
+    return f"{base_name}.{extension}" + (".gz" if gzip else "")
+
+
+def export_media_type(export_format, gzip=False):
+    return "application/gzip" if gzip else EXPORT_FORMATS[export_format][0]
@@ -0,0 +1,304 @@
+import io
+import time
+import multiprocessing
+import multiprocessing.connection
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_EXCEPTION
+
+# Page-level PDF text extraction engine used by utils.extract_text_from_pdf.
+#
+# Backends:
+#   'pdfplumber' - layout-aware extraction (default, same output style as before).
+#   'pdfminer'   - plain text without layout analysis; much faster, for PDFs whose reading
+#                  order is simple. pdfminer.six is already installed as a pdfplumber dependency.
+#
+# Each page is extracted exactly once. Large documents are split into contiguous page ranges
+# that run in a process pool, since pdfplumber is pure Python and bound to one core per process.
+# With isolation (extract_pdf_text(isolated=True)) every range runs in its own killable process
+# instead of the shared pool, so the hard deadline and cancellation stop all of them.
+
+PDF_BACKENDS = ("pdfplumber", "pdfminer")
+
+# Worker processes stop at the deadline on their own and return the pages read so far;
+# the parent waits this much longer to collect those partial results.
+PARALLEL_TIMEOUT_GRACE_SECONDS = 2.0
+
+_process_pool = None
+_process_pool_workers = None
+
+# Isolated extraction (run_isolated): how often the parent checks for cancellation and deadlines.
+ISOLATION_POLL_SECONDS = 0.2
+# Modules imported once by the forkserver, so each isolated extraction starts without importing them.
+ISOLATION_PRELOAD_MODULES = ["src.utils", "pdfplumber", "pdfminer.high_level", "docx"]
+_isolation_context = None
+
+
+class ExtractionTimeoutError(Exception):
+    """An isolated extraction ran past its hard deadline and was killed."""
+
+
+class ExtractionCancelledError(Exception):
+    """An isolated extraction was killed because the work was cancelled."""
+
+
+def select_pages(page_count, max_pages=None, first_pages=None, last_pages=None):
+    """
+    Returns the 0-based page indexes to extract.
+    - first_pages / last_pages: extract only the first N and last M pages (a section window,
+      e.g. abstract + introduction and conclusion + references). Either may be used alone.
+    - max_pages: hard cap on the number of pages, applied after the window.
+    With no options every page is selected.
+    """
+    if first_pages is not None or last_pages is not None:
+        head = range(0, min(first_pages or 0, page_count))
+        tail = range(max(page_count - (last_pages or 0), 0), page_count)
+        indexes = sorted(set(head) | set(tail))
+    else:
+        indexes = list(range(page_count))
+    if max_pages is not None:
+        indexes = indexes[:max_pages]
+    return indexes
+
+
+def count_pdf_pages(pdf_path):
+    """Returns the number of pages without parsing page content."""
+    from pdfminer.pdfparser import PDFParser
+    from pdfminer.pdfdocument import PDFDocument
+    from pdfminer.pdftypes import resolve1
+
+    with open(pdf_path, 'rb') as fp:
+        document = PDFDocument(PDFParser(fp))
+        return resolve1(document.catalog['Pages'])['Count']
+
+
+def _extract_range_pdfplumber(pdf_path, page_indexes, deadline):
+    import pdfplumber
+
+    pages = []
+    with pdfplumber.open(pdf_path) as pdf:
+        for index in page_indexes:
+            if deadline is not None and time.monotonic() > deadline:
+                break
+            started = time.perf_counter()
+            text = pdf.pages[index].extract_text() or ""
+            pages.append((index, text, time.perf_counter() - started))
+    return pages
+
+
+def _extract_range_pdfminer(pdf_path, page_indexes, deadline):
+    from pdfminer.pdfpage import PDFPage
+    from pdfminer.pdfinterp import PDFResourceManager, PDFPageInterpreter
+    from pdfminer.converter import TextConverter
+
+    wanted = set(page_indexes)
+    last_wanted = max(wanted) if wanted else -1
+    resource_manager = PDFResourceManager(caching=True)
+    pages = []
+    with open(pdf_path, 'rb') as fp:
+        for index, page in enumerate(PDFPage.get_pages(fp)):
+            if index > last_wanted:
+                break
+            if index not in wanted:
+                continue
+            if deadline is not None and time.monotonic() > deadline:
+                break
+            started = time.perf_counter()
+            output = io.StringIO()
+            # laparams=None skips layout analysis, which is where most of the time goes.
+            device = TextConverter(resource_manager, output, laparams=None)
+            try:
+                PDFPageInterpreter(resource_manager, device).process_page(page)
+            finally:
+                device.close()
+            pages.append((index, output.getvalue(), time.perf_counter() - started))
+    return pages
+
+
+def extract_page_range(pdf_path, page_indexes, backend="pdfplumber", deadline=None):
+    """
+    Extracts the given pages with the chosen backend.
+    Returns a list of (page_index, text, seconds) tuples; stops early once 'deadline'
+    (a time.monotonic() value) has passed. Runs in worker processes for large documents.
+    """
+    if backend == "pdfminer":
+        return _extract_range_pdfminer(pdf_path, page_indexes, deadline)
+    return _extract_range_pdfplumber(pdf_path, page_indexes, deadline)
+
+
+def _get_process_pool(max_workers):
+    global _process_pool, _process_pool_workers
+    if _process_pool is None or _process_pool_workers != max_workers:
+        if _process_pool is not None:
+            _process_pool.shutdown(wait=False)
+        # 'spawn' avoids forking a process that already runs executor threads.
+        _process_pool = ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context("spawn"))
+        _process_pool_workers = max_workers
+    return _process_pool
+
+
+def _split_ranges(page_indexes, parts):
+    """Splits page indexes into at most 'parts' contiguous, similarly sized ranges."""
+    parts = max(1, min(parts, len(page_indexes)))
+    size, remainder = divmod(len(page_indexes), parts)
+    ranges = []
+    start = 0
+    for part in range(parts):
+        end = start + size + (1 if part < remainder else 0)
+        ranges.append(page_indexes[start:end])
+        start = end
+    return ranges
+
+
+def _time_left(deadline, timeout):
+    """Seconds left before a hard deadline (None without one); raises once it has passed."""
+    if deadline is None:
+        return None
+    left = deadline - time.monotonic()
+    if left <= 0:
+        raise ExtractionTimeoutError(f"extraction exceeded {timeout}s")
+    return left
+
+
+def extract_pdf_text(pdf_path, backend="pdfplumber", max_pages=None, first_pages=None, last_pages=None,
+                     timeout=None, parallel_min_pages=50, max_workers=2, isolated=False, hard_timeout=None,
+                     cancel_event=None):
+    """
+    Extracts text from a PDF page by page.
+
+    Returns a dict with:
+        text             - extracted text, pages joined by newlines in page order
+        page_count       - number of pages in the document
+        pages_extracted  - number of pages actually extracted
+        page_timings     - list of {"page": n, "seconds": s} (1-based page numbers)
+        timed_out        - True if 'timeout' seconds passed before all selected pages were read
+        backend          - backend used
+    Documents with at least 'parallel_min_pages' selected pages are spread across a process pool
+    of 'max_workers' processes; smaller ones are extracted in the calling thread.
+
+    With 'isolated', the page count and every page range run in separate processes (see
+    run_isolated_many) that are killed once 'hard_timeout' seconds pass (ExtractionTimeoutError)
+    or 'cancel_event' is set (ExtractionCancelledError). 'timeout' stays the soft limit that
+    returns the pages read so far.
+    """
+    if backend not in PDF_BACKENDS:
+        raise ValueError(f"Unknown PDF backend '{backend}'. Expected one of: {', '.join(PDF_BACKENDS)}")
+
+    deadline = time.monotonic() + timeout if timeout else None
+    if isolated:
+        hard_deadline = time.monotonic() + hard_timeout if hard_timeout else None
+        try:
+            page_count = run_isolated(count_pdf_pages, (pdf_path,), timeout=_time_left(hard_deadline, hard_timeout),
+                                      cancel_event=cancel_event)
+        except ExtractionTimeoutError:
+            raise ExtractionTimeoutError(f"extraction exceeded {hard_timeout}s") from None
+    else:
+        page_count = count_pdf_pages(pdf_path)
+    page_indexes = select_pages(page_count, max_pages, first_pages, last_pages)
+
+    if isolated:
+        page_ranges = _split_ranges(page_indexes, max_workers) if len(page_indexes) >= parallel_min_pages else [page_indexes]
+        calls = [(extract_page_range, (pdf_path, page_range, backend, deadline), None) for page_range in page_ranges]
+        try:
+            results = run_isolated_many(calls, timeout=_time_left(hard_deadline, hard_timeout), cancel_event=cancel_event)
+        except ExtractionTimeoutError:
+            raise ExtractionTimeoutError(f"extraction exceeded {hard_timeout}s") from None
+        pages = [page for range_pages in results for page in range_pages]
+    elif max_workers > 1 and len(page_indexes) >= parallel_min_pages:
+        pool = _get_process_pool(max_workers)
+        futures = [
+            pool.submit(extract_page_range, pdf_path, page_range, backend, deadline)
+            for page_range in _split_ranges(page_indexes, max_workers)
+        ]
+        remaining = max(deadline - time.monotonic(), 0) + PARALLEL_TIMEOUT_GRACE_SECONDS if deadline is not None else None
+        done, not_done = wait(futures, timeout=remaining, return_when=FIRST_EXCEPTION)
+        for future in not_done:
+            future.cancel()
+        pages = []
+        for future in done:
+            pages.extend(future.result())
+    else:
+        pages = extract_page_range(pdf_path, page_indexes, backend, deadline)
+
+    pages.sort(key=lambda page: page[0])
+    return {
+        "text": '\n'.join(text for _, text, _ in pages if text),
+        "page_count": page_count,
+        "pages_extracted": len(pages),
+        "page_timings": [{"page": index + 1, "seconds": round(seconds, 4)} for index, _, seconds in pages],
+        "timed_out": len(pages) < len(page_indexes),
+        "backend": backend,
+    }
+
+
+def _get_isolation_context():
+    global _isolation_context
+    if _isolation_context is None:
+        if "forkserver" in multiprocessing.get_all_start_methods():
+            # Children fork from a small single-threaded server process that has already imported
+            # the extraction libraries: cheap to start, and safe although this process runs threads.
+            context = multiprocessing.get_context("forkserver")
+            context.set_forkserver_preload(ISOLATION_PRELOAD_MODULES)
+        else:
+            context = multiprocessing.get_context("spawn")
+        _isolation_context = context
+    return _isolation_context
+
+
+def _isolated_entry(connection, fn, args, kwargs):
+    try:
+        connection.send((True, fn(*args, **kwargs)))
+    except BaseException as e:
+        connection.send((False, f"{e.__class__.__name__}: {e}"))
+    finally:
+        connection.close()
+
+
+def run_isolated_many(calls, timeout=None, cancel_event=None):
+    """
+    Runs each (fn, args, kwargs) of 'calls' in its own process, all at the same time, and returns
+    their results in the same order.
+
+    Unlike threads, the processes can be killed: all of them are terminated once 'timeout' seconds
+    pass (ExtractionTimeoutError), 'cancel_event' is set (ExtractionCancelledError) or one of them
+    fails, so a PDF that hangs the parser cannot hold on to a worker. Each fn must be importable
+    (module-level) and should not start processes of its own, as those would outlive a killed parent.
+    """
+    context = _get_isolation_context()
+    running = [] # (process, receiver)
+    try:
+        for fn, args, kwargs in calls:
+            receiver, sender = context.Pipe(duplex=False)
+            process = context.Process(target=_isolated_entry, args=(sender, fn, args, kwargs or {}))
+            process.start()
+            running.append((process, receiver))
+            sender.close()
+        deadline = time.monotonic() + timeout if timeout else None
+        results = [None] * len(running)
+        pending = {receiver: index for index, (_, receiver) in enumerate(running)}
+        while pending:
+            for receiver in multiprocessing.connection.wait(list(pending), ISOLATION_POLL_SECONDS):
+                index = pending.pop(receiver)
+                try:
+                    succeeded, payload = receiver.recv()
+                except EOFError:
+                    raise RuntimeError(f"extraction process exited without a result (exit code {running[index][0].exitcode})")
+                if not succeeded:
+                    raise RuntimeError(payload)
+                results[index] = payload
+            if not pending:
+                break
+            if cancel_event is not None and cancel_event.is_set():
+                raise ExtractionCancelledError("extraction cancelled")
+            if deadline is not None and time.monotonic() >= deadline:
+                raise ExtractionTimeoutError(f"extraction exceeded {timeout}s")
+        return results
+    finally:
+        for process, receiver in running:
+            receiver.close()
+            if process.is_alive():
+                process.kill()
+            process.join()
+
+
+def run_isolated(fn, args=(), kwargs=None, timeout=None, cancel_event=None):
+    """Runs fn(*args, **kwargs) in a separate, killable process and returns its result (see run_isolated_many)."""
+    return run_isolated_many([(fn, args, kwargs)], timeout, cancel_event)[0]
@@ -0,0 +1,388 @@
+import sqlite3
+import json
+import os
+import shutil
+import time
+import uuid
+import socket
+import asyncio
+import logging
+
+from src.tracing import trace_id_var
+from src.sqlite_store import SQLiteStore
+
+
+# Job and file states. A job is 'queued' until a worker picks up its first file, 'running'
+# while files are being processed, 'finalizing' while its results are saved, then 'completed'.
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_FINALIZING = "finalizing"
+JOB_COMPLETED = "completed"
+
+FILE_PENDING = "pending"
+FILE_RUNNING = "running"
+FILE_DONE = "done"
+FILE_FAILED = "failed"
+
+
+class JobStore(SQLiteStore):
+    """
+    Durable job queue backed by a local SQLite database.
+
+    Each uploaded file is one row in job_files. Workers claim rows with a lease; if a worker
+    dies (gunicorn restart, crash, deploy) its lease expires and another worker picks the file
+    up again, so jobs survive restarts without an external broker. Uploaded files are kept
+    under storage_dir/<job_id>/ until they have been processed.
+    """
+
+    isolation_level = None # Explicit BEGIN IMMEDIATE / COMMIT
+    row_factory = sqlite3.Row
+
+    def __init__(self, db_path='data/jobs/jobs.sqlite3', storage_dir='data/jobs/files', lease_seconds=900):
+        super().__init__(db_path)
+        self.storage_dir = storage_dir
+        self.lease_seconds = lease_seconds
+
+    def _create_schema(self, conn):
+        os.makedirs(self.storage_dir, exist_ok=True)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                job_id TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                total_files INTEGER NOT NULL,
+                summary_json TEXT,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            )
+        """)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS job_files (
+                job_id TEXT NOT NULL,
+                file_index INTEGER NOT NULL,
+                filename TEXT NOT NULL,
+                stored_path TEXT,
+                content_hash TEXT,
+                status TEXT NOT NULL,
+                result_json TEXT,
+                failure TEXT,
+                lease_owner TEXT,
+                lease_expires REAL,
+                finished_seq INTEGER,
+                PRIMARY KEY (job_id, file_index)
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_job_files_status ON job_files (status, lease_expires)")
+
+    def new_job(self):
+        """Creates a job id and the directory its uploaded files are persisted to."""
+        self._ensure_schema()
+        job_id = uuid.uuid4().hex
+        job_dir = os.path.join(self.storage_dir, job_id)
+        os.makedirs(job_dir, exist_ok=True)
+        return job_id, job_dir
+
+    def enqueue_job(self, job_id, files):
+        """
+        Registers a job once all its files are persisted.
+        'files' is a list of dicts with filename, stored_path, content_hash and, for files that
+        were rejected at upload time, a 'failure' string (those are recorded as already failed).
+        """
+        self._ensure_schema()
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(
+                "INSERT INTO jobs (job_id, status, total_files, created_at, updated_at) VALUES (?, ?, ?, ?, ?)",
+                (job_id, JOB_QUEUED, len(files), now, now)
+            )
+            for index, file_info in enumerate(files):
+                failure = file_info.get('failure')
+                conn.execute(
+                    "INSERT INTO job_files (job_id, file_index, filename, stored_path, content_hash, status, failure, finished_seq) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (job_id, index, file_info['filename'], file_info.get('stored_path'), file_info.get('content_hash'),
+                     FILE_FAILED if failure else FILE_PENDING, failure, index if failure else None)
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def claim_next_file(self, worker_id):
+        """
+        Atomically leases the oldest pending file (or one whose lease has expired).
+        Returns a dict describing the file, or None if there is nothing to do.
+        """
+        self._ensure_schema()
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT f.job_id, f.file_index, f.filename, f.stored_path, f.content_hash FROM job_files f "
+                "JOIN jobs j ON j.job_id = f.job_id "
+                "WHERE f.status = ? OR (f.status = ? AND f.lease_expires < ?) "
+                "ORDER BY j.created_at, f.file_index LIMIT 1",
+                (FILE_PENDING, FILE_RUNNING, now)
+            ).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            conn.execute(
+                "UPDATE job_files SET status = ?, lease_owner = ?, lease_expires = ? WHERE job_id = ? AND file_index = ?",
+                (FILE_RUNNING, worker_id, now + self.lease_seconds, row['job_id'], row['file_index'])
+            )
+            conn.execute(
+                "UPDATE jobs SET status = ?, updated_at = ? WHERE job_id = ? AND status = ?",
+                (JOB_RUNNING, now, row['job_id'], JOB_QUEUED)
+            )
+            conn.execute("COMMIT")
+            return dict(row)
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def release_files(self, worker_ids):
+        """
+        Puts the files leased by the given workers back to pending, so another worker can pick
+        them up at once instead of after the lease expires. Returns the number of files released.
+        """
+        self._ensure_schema()
+        if not worker_ids:
+            return 0
+        conn = self._connect()
+        try:
+            return conn.execute(
+                f"UPDATE job_files SET status = ?, lease_owner = NULL, lease_expires = NULL "
+                f"WHERE status = ? AND lease_owner IN ({', '.join('?' for _ in worker_ids)})",
+                [FILE_PENDING, FILE_RUNNING] + list(worker_ids)
+            ).rowcount
+        finally:
+            conn.close()
+
+    def complete_file(self, job_id, file_index, result=None, failure=None):
+        """Records the outcome of one file and removes its persisted upload."""
+        self._ensure_schema()
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            # finished_seq orders rows by completion so streams can emit them as they finish.
+            next_seq = conn.execute(
+                "SELECT COALESCE(MAX(finished_seq), -1) + 1 FROM job_files WHERE job_id = ?", (job_id,)
+            ).fetchone()[0]
+            row = conn.execute(
+                "SELECT stored_path FROM job_files WHERE job_id = ? AND file_index = ?", (job_id, file_index)
+            ).fetchone()
+            conn.execute(
+                "UPDATE job_files SET status = ?, result_json = ?, failure = ?, lease_owner = NULL, "
+                "lease_expires = NULL, finished_seq = ? WHERE job_id = ? AND file_index = ?",
+                (FILE_DONE if result is not None else FILE_FAILED,
+                 json.dumps(result) if result is not None else None, failure, next_seq, job_id, file_index)
+            )
+            conn.execute("UPDATE jobs SET updated_at = ? WHERE job_id = ?", (time.time(), job_id))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+        stored_path = row['stored_path'] if row else None
+        if stored_path and os.path.exists(stored_path):
+            try:
+                os.remove(stored_path)
+            except OSError as e:
+                logging.error(f"Error removing persisted upload {stored_path}: {e}")
+
+    def claim_finalization(self, job_id):
+        """
+        Returns True if all files of the job are finished and this caller won the right to
+        finalize it. Only one worker across all processes gets True for a given job.
+        """
+        self._ensure_schema()
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            unfinished = conn.execute(
+                "SELECT COUNT(*) FROM job_files WHERE job_id = ? AND status NOT IN (?, ?)",
+                (job_id, FILE_DONE, FILE_FAILED)
+            ).fetchone()[0]
+            claimed = False
+            if unfinished == 0:
+                cursor = conn.execute(
+                    "UPDATE jobs SET status = ?, updated_at = ? WHERE job_id = ? AND status IN (?, ?)",
+                    (JOB_FINALIZING, time.time(), job_id, JOB_QUEUED, JOB_RUNNING)
+                )
+                claimed = cursor.rowcount == 1
+            conn.execute("COMMIT")
+            return claimed
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def complete_job(self, job_id, summary):
+        """Marks a job completed with its final summary and removes its upload directory."""
+        self._ensure_schema()
+        conn = self._connect()
+        try:
+            conn.execute(
+                "UPDATE jobs SET status = ?, summary_json = ?, updated_at = ? WHERE job_id = ?",
+                (JOB_COMPLETED, json.dumps(summary), time.time(), job_id)
+            )
+        finally:
+            conn.close()
+        shutil.rmtree(os.path.join(self.storage_dir, job_id), ignore_errors=True)
+
+    def find_unfinalized_jobs(self):
+        """
+        Returns ids of jobs whose files are all finished but that were never completed, e.g.
+        because the finalizing worker was restarted. Stale 'finalizing' jobs are reset so they
+        can be claimed again.
+        """
+        self._ensure_schema()
+        stale_before = time.time() - self.lease_seconds
+        conn = self._connect()
+        try:
+            conn.execute(
+                "UPDATE jobs SET status = ? WHERE status = ? AND updated_at < ?",
+                (JOB_RUNNING, JOB_FINALIZING, stale_before)
+            )
+            rows = conn.execute(
+                "SELECT j.job_id FROM jobs j WHERE j.status IN (?, ?) AND NOT EXISTS ("
+                "SELECT 1 FROM job_files f WHERE f.job_id = j.job_id AND f.status NOT IN (?, ?))",
+                (JOB_QUEUED, JOB_RUNNING, FILE_DONE, FILE_FAILED)
+            ).fetchall()
+            return [row['job_id'] for row in rows]
+        finally:
+            conn.close()
+
+    def get_job(self, job_id):
+        """Returns the job row as a dict (with per-state file counts), or None if unknown."""
+        self._ensure_schema()
+        conn = self._connect()
+        try:
+            job = conn.execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+            if job is None:
+                return None
+            counts = dict(conn.execute(
+                "SELECT status, COUNT(*) FROM job_files WHERE job_id = ? GROUP BY status", (job_id,)
+            ).fetchall())
+        finally:
+            conn.close()
+        job = dict(job)
+        summary_json = job.pop('summary_json')
+        job['summary'] = json.loads(summary_json) if summary_json else None
+        job['file_counts'] = counts
+        return job
+
+    def get_finished_files(self, job_id, after_seq=-1):
+        """Returns finished files of a job with finished_seq > after_seq, in completion order."""
+        self._ensure_schema()
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                "SELECT file_index, filename, status, result_json, failure, finished_seq FROM job_files "
+                "WHERE job_id = ? AND finished_seq > ? ORDER BY finished_seq",
+                (job_id, after_seq)
+            ).fetchall()
+        finally:
+            conn.close()
+        finished = []
+        for row in rows:
+            item = dict(row)
+            result_json = item.pop('result_json')
+            item['result'] = json.loads(result_json) if result_json else None
+            finished.append(item)
+        return finished
+
+
+class JobWorkerPool:
+    """
+    Runs job files in the background of an API worker process.
+
+    'process_fn(filename, stored_path, content_hash, job_id)' must be a coroutine returning the same
+    (result, failure) tuple as the upload pipeline; 'finalize_fn(job_id, files)' is a coroutine
+    that receives every finished file of the job and returns the job summary dict.
+    """
+
+    def __init__(self, store, process_fn, finalize_fn, concurrency=2, poll_interval=1.0):
+        self.store = store
+        self.process_fn = process_fn
+        self.finalize_fn = finalize_fn
+        self.concurrency = max(1, concurrency)
+        self.poll_interval = poll_interval
+        self.worker_id = None # Set in start(): the pool is built at import time, maybe in the gunicorn master
+        self._tasks = []
+
+    async def start(self):
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        loop = asyncio.get_running_loop()
+        # Complete any job whose finalizer died before it could save the results.
+        for job_id in await loop.run_in_executor(None, self.store.find_unfinalized_jobs):
+            await self.finalize_if_done(job_id)
+        self._tasks = [asyncio.create_task(self._worker_loop(n)) for n in range(self.concurrency)]
+        logging.info(f"Started {self.concurrency} job workers ({self.worker_id})")
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        # Files that were in flight go back to the queue, so after a restart or deploy the next
+        # workers resume them right away rather than waiting out job_lease_seconds.
+        if self._tasks:
+            worker_ids = [self._worker_name(n) for n in range(len(self._tasks))]
+            released = await asyncio.get_running_loop().run_in_executor(None, self.store.release_files, worker_ids)
+            if released:
+                logging.info(f"Returned {released} unfinished job files to the queue ({self.worker_id})")
+        self._tasks = []
+
+    def _worker_name(self, worker_number):
+        return f"{self.worker_id}:{worker_number}"
+
+    async def _worker_loop(self, worker_number):
+        loop = asyncio.get_running_loop()
+        worker_id = self._worker_name(worker_number)
+        while True:
+            try:
+                job_file = await loop.run_in_executor(None, self.store.claim_next_file, worker_id)
+                if job_file is None:
+                    await asyncio.sleep(self.poll_interval)
+                    continue
+
+                # Log lines for this file share a trace id made of the job id and file index.
+                trace_id_var.set(f"{job_file['job_id'][:12]}-{job_file['file_index']}")
+                try:
+                    result, failure = await self.process_fn(
+                        job_file['filename'], job_file['stored_path'], job_file['content_hash'], job_file['job_id']
+                    )
+                except Exception as e:
+                    logging.error(f"Job {job_file['job_id']}: unexpected error processing {job_file['filename']}: {e}")
+                    result, failure = None, f"{job_file['filename']} (General error: {e})"
+
+                await loop.run_in_executor(
+                    None, self.store.complete_file, job_file['job_id'], job_file['file_index'], result, failure
+                )
+                await self.finalize_if_done(job_file['job_id'])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logging.error(f"Job worker {worker_id} error: {e}")
+                await asyncio.sleep(self.poll_interval)
+
+    async def finalize_if_done(self, job_id):
+        """Completes the job if all its files are finished and no other worker is already doing so."""
+        loop = asyncio.get_running_loop()
+        if not await loop.run_in_executor(None, self.store.claim_finalization, job_id):
+            return
+        files = await loop.run_in_executor(None, self.store.get_finished_files, job_id)
+        files.sort(key=lambda item: item['file_index'])
+        summary = await self.finalize_fn(job_id, files)
+        await loop.run_in_executor(None, self.store.complete_job, job_id, summary)
+        logging.info(f"Job {job_id} completed")
@@ -0,0 +1,89 @@
+"""
+Prometheus metrics for the review pipeline: per-stage latency histograms, size histograms
+(upload bytes, extracted characters, prompt tokens, response characters) and counters of
+file outcomes by failure category.
+
+Under gunicorn every worker is a separate process. When PROMETHEUS_MULTIPROC_DIR is set
+(gunicorn.conf.py does this before the workers fork), each process writes its samples to that
+directory and /metrics aggregates all of them, so a scrape sees the whole server and not just
+the worker that happened to answer it.
+"""
+import os
+import time
+from contextlib import contextmanager
+
+from prometheus_client import (
+    CollectorRegistry, Counter, Histogram, REGISTRY, CONTENT_TYPE_LATEST, generate_latest, multiprocess
+)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300, 600)
+BYTES_BUCKETS = (10e3, 50e3, 100e3, 500e3, 1e6, 5e6, 10e6, 25e6, 50e6, 100e6, 200e6)
+CHARS_BUCKETS = (1e3, 5e3, 10e3, 25e3, 50e3, 100e3, 250e3, 500e3, 1e6, 2.5e6)
+TOKENS_BUCKETS = (500, 1e3, 2.5e3, 5e3, 10e3, 20e3, 30e3, 50e3, 100e3, 250e3)
+
+STAGE_SECONDS = Histogram(
+    "review_stage_duration_seconds", "Time spent in each pipeline stage.", ["stage"], buckets=LATENCY_BUCKETS
+)
+INPUT_BYTES = Histogram("review_input_bytes", "Size of uploaded documents.", buckets=BYTES_BUCKETS)
+EXTRACTED_CHARS = Histogram("review_extracted_chars", "Characters of text extracted per document.", buckets=CHARS_BUCKETS)
+PROMPT_TOKENS = Histogram(
+    "review_prompt_tokens", "Estimated tokens per model prompt.", ["kind"], buckets=TOKENS_BUCKETS
+)
+RESPONSE_CHARS = Histogram(
+    "review_response_chars", "Characters per model response.", ["kind"], buckets=CHARS_BUCKETS
+)
+PACK_SIZE = Histogram("review_pack_size", "Papers per packed review request.", buckets=(1, 2, 3, 4, 6, 8, 12, 16))
+PACK_FALLBACKS = Counter("review_pack_fallbacks_total", "Packed papers re-sent individually after a missing or invalid entry.")
+DUPLICATES = Counter("review_duplicates_total", "Files answered with the review of a near-duplicate paper.")
+STARTUP_SECONDS = Histogram(
+    "app_startup_seconds", "Worker startup time by phase (import, lifespan, fork_to_ready).", ["phase"],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2, 3, 5, 10, 20, 30)
+)
+MODEL_CALLS = Counter("review_model_calls_total", "Model calls by outcome (ok, error or cancelled).", ["kind", "outcome"])
+FILES = Counter("review_files_total", "Processed files by outcome: 'success' or the failure category.", ["outcome"])
+
+
+@contextmanager
+def time_stage(stage):
+    """Records how long the with-block took under review_stage_duration_seconds{stage=...}."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_SECONDS.labels(stage=stage).observe(time.perf_counter() - start)
+
+
+def failure_category(failure):
+    """
+    Maps a failure string ("<filename> (<reason>)" or "<filename> (<reason>: <detail>)") to its
+    category, e.g. "Unsupported type", "AI review failed", "General error".
+    The detail may contain parentheses of its own, as may the filename, so the reason is found
+    by walking back from the final ')' to the '(' that opens it.
+    """
+    text = (failure or "").rstrip()
+    if not text.endswith(")"):
+        return "Unknown"
+    depth = 0
+    for position in range(len(text) - 1, -1, -1):
+        if text[position] == ")":
+            depth += 1
+        elif text[position] == "(":
+            depth -= 1
+            if depth == 0:
+                category = text[position + 1:-1].split(":", 1)[0].strip()
+                return category or "Unknown"
+    return "Unknown"
+
+
+def count_file_outcome(failure=None):
+    """Counts one finished file: a success when failure is None, otherwise its failure category."""
+    FILES.labels(outcome="success" if failure is None else failure_category(failure)).inc()
+
+
+def render_metrics():
+    """Returns (body, content_type) for /metrics, aggregated across worker processes if configured."""
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
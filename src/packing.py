@@ -0,0 +1,135 @@
+import asyncio
+import contextvars
+import json
+import logging
+from functools import partial
+
+from src.metrics import PACK_SIZE, PACK_FALLBACKS
+from src.reviewer import (
+    review, review_packed, format_packed_paper, is_model_available, has_review_overrides,
+    PACKED_PROMPT_TEMPLATE, PACKED_PAPER_SEPARATOR
+)
+from src.sections import estimate_tokens
+from src.tracing import with_context
+
+
+class PackedReviewer:
+    """
+    Packs short papers that arrive close together into one model request.
+
+    review(text) waits up to max_wait_seconds for other short papers to share the request with; a
+    pack is sent as soon as it reaches max_papers or would go over token_budget. The model answers
+    with a keyed JSON array that is split back out per paper. Entries that are missing or fail
+    'validate_fn' (which should raise on invalid data) are re-sent one by one through review(), so
+    a bad entry never fails the rest of the pack.
+
+    A pack serves papers from different requests, so it is sent in a fresh context rather than
+    that of the paper that happened to fill it: one request's work scope (cancellation, deadline),
+    trace id or overrides never reach the others. Each paper's own scope only decides whether it
+    still waits for its result; its individual re-send runs in its own context.
+    """
+
+    def __init__(self, executor, token_budget=24000, max_paper_tokens=4000, max_papers=8,
+                 max_wait_seconds=0.5, validate_fn=None):
+        self.executor = executor
+        self.token_budget = token_budget
+        self.max_paper_tokens = max_paper_tokens
+        self.max_papers = max_papers
+        self.max_wait_seconds = max_wait_seconds
+        self.validate_fn = validate_fn
+        # The instructions are sent once per pack; each paper adds its own text plus the header,
+        # footer and separator it is wrapped in (measured with the longest key a pack can use).
+        self.overhead_tokens = estimate_tokens(PACKED_PROMPT_TEMPLATE.format(count=max_papers, papers=""))
+        self.paper_overhead_tokens = estimate_tokens(format_packed_paper(f"paper_{max_papers}", "") + PACKED_PAPER_SEPARATOR)
+        self._pending = [] # (text, tokens, future, context)
+        self._pending_tokens = 0
+        self._flush_handle = None
+
+    def accepts(self, text):
+        """
+        True if the paper is short enough to be packed (and a real model is configured). Reviews
+        with another model or prompt (reviewer.review_overrides) are never packed, since a pack
+        is sent with the default backend and prompt.
+        """
+        return (is_model_available() and not has_review_overrides()
+                and estimate_tokens(text) + self.paper_overhead_tokens <= self.max_paper_tokens)
+
+    async def review(self, text):
+        """Returns the review of one paper as JSON text, like review()."""
+        tokens = estimate_tokens(text) + self.paper_overhead_tokens
+        if self._pending and self.overhead_tokens + self._pending_tokens + tokens > self.token_budget:
+            self._flush()
+
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((text, tokens, future, contextvars.copy_context()))
+        self._pending_tokens += tokens
+
+        if len(self._pending) >= self.max_papers:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = asyncio.get_running_loop().call_later(self.max_wait_seconds, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        batch, self._pending, self._pending_tokens = self._pending, [], 0
+        if batch:
+            # create_task() copies the current context; run it in an empty one instead.
+            contextvars.Context().run(asyncio.get_running_loop().create_task, self._send(batch))
+
+    def _is_valid(self, entry):
+        if self.validate_fn is None:
+            return True
+        try:
+            self.validate_fn(entry)
+            return True
+        except Exception:
+            return False
+
+    async def _send(self, batch):
+        loop = asyncio.get_running_loop()
+        # Papers cancelled while waiting for the pack to fill are not sent at all.
+        batch = [item for item in batch if not item[2].done()]
+        if not batch:
+            return
+        PACK_SIZE.observe(len(batch))
+        try:
+            if len(batch) == 1:
+                reviews = {}
+            else:
+                papers = {f"paper_{number}": text for number, (text, _, _, _) in enumerate(batch, start=1)}
+                reviews = await loop.run_in_executor(self.executor, with_context(review_packed, papers))
+                logging.info(f"Packed review of {len(batch)} papers returned {len(reviews)} entries.")
+
+            retries = []
+            for number, (text, _, future, context) in enumerate(batch, start=1):
+                entry = reviews.get(f"paper_{number}")
+                if future.done():
+                    continue # The file was cancelled while the pack was in flight
+                if entry is not None and self._is_valid(entry):
+                    future.set_result(json.dumps(entry))
+                else:
+                    retries.append((text, future, context))
+
+            if retries and len(batch) > 1:
+                PACK_FALLBACKS.inc(len(retries))
+                logging.warning(f"Re-sending {len(retries)} of {len(batch)} packed papers individually.")
+            # Lone papers and failed entries get their own request, all at the same time.
+            responses = await asyncio.gather(
+                *(loop.run_in_executor(self.executor, partial(context.run, review, text)) for text, _, context in retries),
+                return_exceptions=True
+            )
+            for (_, future, _), response in zip(retries, responses):
+                if future.done():
+                    continue
+                if isinstance(response, Exception):
+                    future.set_exception(response)
+                else:
+                    future.set_result(response)
+        except Exception as e:
+            logging.error(f"Packed review failed: {e}")
+            for _, _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
@@ -0,0 +1,242 @@
+import os
+import re
+import time
+import random
+import logging
+import threading
+
+from src.deadlines import check_current_scope, interruptible_sleep
+from src.sqlite_store import connect
+
+# Rate limiting for model calls, shared by every gunicorn worker on the host.
+#
+# SharedTokenBucket keeps request and token buckets in a local SQLite file; BEGIN IMMEDIATE
+# serialises updates across processes, so all workers together stay under the quota.
+# AdaptiveConcurrencyLimiter lowers this process's in-flight call limit when errors rise and
+# raises it again as calls succeed (additive increase, multiplicative decrease).
+# ModelCallLimiter combines both with jittered exponential backoff that honours server retry hints.
+
+# HTTP status codes worth retrying: quota / rate limit, and transient server errors.
+RETRYABLE_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+RATE_LIMIT_STATUS_CODES = {429}
+
+
+class SharedTokenBucket:
+    """Requests-per-minute and tokens-per-minute buckets shared across processes through SQLite."""
+
+    def __init__(self, db_path='data/ratelimit/gemini.sqlite3', requests_per_minute=60, tokens_per_minute=1000000):
+        self.db_path = db_path
+        self.capacities = {"requests": float(requests_per_minute), "tokens": float(tokens_per_minute)}
+        db_dir = os.path.dirname(db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+        conn = self._connect()
+        try:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS buckets (
+                    name TEXT PRIMARY KEY,
+                    level REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS cooldown (
+                    id INTEGER PRIMARY KEY CHECK (id = 1),
+                    until REAL NOT NULL
+                )
+            """)
+            now = time.time()
+            for name, capacity in self.capacities.items():
+                conn.execute("INSERT OR IGNORE INTO buckets (name, level, updated_at) VALUES (?, ?, ?)", (name, capacity, now))
+            conn.execute("INSERT OR IGNORE INTO cooldown (id, until) VALUES (1, 0)")
+        finally:
+            conn.close()
+
+    def _connect(self):
+        return connect(self.db_path, isolation_level=None)
+
+    def _try_acquire(self, tokens):
+        """Takes one request and 'tokens' tokens if available. Returns 0 on success, else seconds to wait."""
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            now = time.time()
+            cooldown_until = conn.execute("SELECT until FROM cooldown WHERE id = 1").fetchone()[0]
+            if cooldown_until > now:
+                conn.execute("COMMIT")
+                return cooldown_until - now
+
+            wanted = {"requests": 1.0, "tokens": float(min(tokens, self.capacities["tokens"]))}
+            levels = {}
+            wait_seconds = 0.0
+            for name, capacity in self.capacities.items():
+                level, updated_at = conn.execute("SELECT level, updated_at FROM buckets WHERE name = ?", (name,)).fetchone()
+                # Refill continuously at capacity per minute, never above capacity.
+                level = min(capacity, level + (now - updated_at) * capacity / 60.0)
+                levels[name] = level
+                if level < wanted[name]:
+                    wait_seconds = max(wait_seconds, (wanted[name] - level) * 60.0 / capacity)
+
+            if wait_seconds == 0:
+                for name, level in levels.items():
+                    levels[name] = level - wanted[name]
+            for name, level in levels.items():
+                conn.execute("UPDATE buckets SET level = ?, updated_at = ? WHERE name = ?", (level, now, name))
+            conn.execute("COMMIT")
+            return wait_seconds
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def acquire(self, tokens):
+        """Blocks until one request and 'tokens' tokens are available, then takes them."""
+        while True:
+            wait_seconds = self._try_acquire(tokens)
+            if wait_seconds <= 0:
+                return
+            # Cancelled or timed-out work stops waiting for quota instead of spending it later.
+            interruptible_sleep(min(wait_seconds, 5.0))
+
+    def pause(self, seconds):
+        """Stops all workers from starting new calls for 'seconds' (e.g. after a 429 with a retry hint)."""
+        conn = self._connect()
+        try:
+            conn.execute("UPDATE cooldown SET until = MAX(until, ?) WHERE id = 1", (time.time() + seconds,))
+        finally:
+            conn.close()
+
+
+class AdaptiveConcurrencyLimiter:
+    """
+    Per-process limit on in-flight model calls that adapts to the error rate:
+    the limit is halved on a rate-limit or server error and grows by one after
+    'increase_after' consecutive successes, between min_limit and max_limit.
+    """
+
+    def __init__(self, initial_limit=4, min_limit=1, max_limit=16, increase_after=10):
+        self.limit = initial_limit
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.increase_after = increase_after
+        self.in_flight = 0
+        self.successes = 0
+        self.condition = threading.Condition()
+
+    def __enter__(self):
+        with self.condition:
+            while self.in_flight >= self.limit:
+                self.condition.wait()
+            self.in_flight += 1
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        with self.condition:
+            self.in_flight -= 1
+            self.condition.notify_all()
+        return False
+
+    def record_success(self):
+        with self.condition:
+            self.successes += 1
+            if self.successes >= self.increase_after and self.limit < self.max_limit:
+                self.limit += 1
+                self.successes = 0
+                self.condition.notify_all()
+
+    def record_error(self):
+        with self.condition:
+            new_limit = max(self.min_limit, self.limit // 2)
+            if new_limit < self.limit:
+                logging.warning(f"Model call errors rising; lowering concurrency from {self.limit} to {new_limit}")
+            self.limit = new_limit
+            self.successes = 0
+
+
+def get_status_code(error):
+    """Returns the HTTP status of an API error (google.api_core exceptions expose it as .code), or None."""
+    code = getattr(error, 'code', None)
+    try:
+        return int(code) if code is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def get_retry_hint(error):
+    """
+    Returns the server's suggested retry delay in seconds, if the error carries one:
+    a 'retry_delay' attribute, a RetryInfo entry in 'details', or "retry in 12.5s" /
+    "retry_delay { seconds: 12 }" in the message.
+    """
+    retry_delay = getattr(error, 'retry_delay', None)
+    if retry_delay is not None:
+        seconds = getattr(retry_delay, 'total_seconds', None)
+        return seconds() if callable(seconds) else float(getattr(retry_delay, 'seconds', retry_delay))
+    for detail in getattr(error, 'details', None) or []:
+        delay = getattr(detail, 'retry_delay', None)
+        if delay is not None:
+            return float(getattr(delay, 'seconds', 0)) + float(getattr(delay, 'nanos', 0)) / 1e9
+    message = str(error)
+    match = re.search(r"retry in ([\d.]+)\s*s", message, re.IGNORECASE) or \
+        re.search(r"retry_delay\s*\{\s*seconds:\s*(\d+)", message)
+    return float(match.group(1)) if match else None
+
+
+def is_retryable(error):
+    status = get_status_code(error)
+    if status is not None:
+        return status in RETRYABLE_STATUS_CODES
+    return isinstance(error, (TimeoutError, ConnectionError))
+
+
+class ModelCallLimiter:
+    """
+    Wraps model calls with the shared token bucket, adaptive concurrency and retries.
+
+    call(fn, estimated_tokens) takes a request and the estimated tokens from the shared bucket,
+    waits for a concurrency slot and runs fn(). Retryable errors are retried up to max_retries
+    times with full-jitter exponential backoff; a server retry hint is used as the minimum delay
+    and, for rate-limit errors, pauses every worker for that long.
+    """
+
+    def __init__(self, bucket=None, concurrency=None, max_retries=5, base_delay=1.0, max_delay=60.0):
+        self.bucket = bucket
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def backoff_delay(self, attempt, retry_hint=None):
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+        if retry_hint is not None:
+            delay = max(delay, retry_hint + random.uniform(0, self.base_delay))
+        return delay
+
+    def call(self, fn, estimated_tokens=0):
+        attempt = 0
+        while True:
+            check_current_scope()
+            if self.bucket is not None:
+                self.bucket.acquire(estimated_tokens)
+            try:
+                if self.concurrency is not None:
+                    with self.concurrency:
+                        result = fn()
+                else:
+                    result = fn()
+                if self.concurrency is not None:
+                    self.concurrency.record_success()
+                return result
+            except Exception as e:
+                if not is_retryable(e) or attempt >= self.max_retries:
+                    raise
+                if self.concurrency is not None:
+                    self.concurrency.record_error()
+                retry_hint = get_retry_hint(e)
+                delay = self.backoff_delay(attempt, retry_hint)
+                if self.bucket is not None and retry_hint is not None and get_status_code(e) in RATE_LIMIT_STATUS_CODES:
+                    self.bucket.pause(retry_hint)
+                attempt += 1
+                logging.warning(f"Model call failed ({e.__class__.__name__}: {str(e)[:200]}); retry {attempt}/{self.max_retries} in {delay:.1f}s")
+                interruptible_sleep(delay)
@@ -0,0 +1,136 @@
+"""
+Re-reviews stored documents with another model or prompt, without the original files.
+
+Usage (from the repository root):
+    python -m src.rereview [--model NAME] [--prompt-file FILE] [--content-hash HASH ...]
+                           [--output CSV] [--concurrency N] [--limit N]
+
+Every document whose text is in the extracted text store (config.json 'text_store_dir') is
+reviewed again from that text, so a whole corpus can be re-run without re-uploading or
+re-parsing a single PDF. --model picks another model of the configured backend; --prompt-file
+replaces the review prompt (it must contain {paper}; other literal braces are doubled, as in
+reviewer.PROMPT_TEMPLATE). Results are appended to the output CSV and recorded in the results
+store under a 'rereview_<timestamp>' batch id. Validated results also go to the review cache
+under the new model and prompt, so an interrupted run that is started again only pays for the
+documents it had not reached.
+"""
+import argparse
+import asyncio
+import logging
+import os
+import time
+
+from src.batch import ResultWriter
+
+# The app is imported inside the functions, as in src.batch: this module is __main__ under
+# `python -m src.rereview`, and every isolated extraction process imports __main__ again.
+
+
+def iter_stored_documents(content_hashes=None, page_size=500):
+    """
+    Yields the index entries of the stored documents to re-review, in segment order. Texts
+    extracted with other settings than the current ones (e.g. another page window) are skipped.
+    """
+    from src.api import has_current_extraction_settings, text_store
+
+    if content_hashes:
+        entries = text_store.find_documents(list(dict.fromkeys(content_hashes)))
+        yield from filter(has_current_extraction_settings, entries)
+        return
+    cursor = None
+    while True:
+        entries = text_store.list_documents(page_size, cursor)
+        yield from filter(has_current_extraction_settings, entries)
+        if len(entries) < page_size:
+            return
+        cursor = entries[-1]["cursor"]
+
+
+async def run_rereview(output_path, content_hashes=None, concurrency=4, limit=None):
+    """Re-reviews the stored documents under the current review_overrides. Returns a summary dict."""
+    from src.api import process_document
+    from src.reviewer import get_model_name, get_prompt_version
+
+    writer = ResultWriter(output_path)
+    batch_id = f"rereview_{time.strftime('%Y%m%d_%H%M%S')}"
+    queue = asyncio.Queue()
+    for entry in iter_stored_documents(content_hashes):
+        if limit is not None and queue.qsize() >= limit:
+            break
+        queue.put_nowait(entry)
+    total = queue.qsize()
+    logging.info(f"Re-review: {total} stored documents with {get_model_name()} (prompt {get_prompt_version()}) as batch {batch_id}")
+
+    counts = {"processed": 0, "succeeded": 0, "failed": 0}
+
+    async def worker():
+        while True:
+            try:
+                entry = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            filename = entry["filename"] or entry["content_hash"]
+            result, failure = await process_document(filename, None, entry["content_hash"], batch_id)
+            if result is not None:
+                writer.append(filename, entry["content_hash"], result)
+                counts["succeeded"] += 1
+            else:
+                counts["failed"] += 1
+                logging.warning(f"Re-review: failed {failure}")
+            counts["processed"] += 1
+            logging.info(f"Re-review: {counts['processed']}/{total} done ({filename})")
+
+    try:
+        await asyncio.gather(*(worker() for _ in range(max(1, concurrency))))
+    finally:
+        writer.close()
+
+    return {"batch_id": batch_id, "model_name": get_model_name(), "prompt_version": get_prompt_version(),
+            "documents": total, **counts}
+
+
+def main(argv=None):
+    from src.api import config, configure_model, get_review_backend, text_store
+    from src.reviewer import review_overrides, check_prompt_template
+
+    parser = argparse.ArgumentParser(description="Re-review stored document texts with another model or prompt.")
+    parser.add_argument("--model", default=None,
+                        help="Model to review with (default: the configured model)")
+    parser.add_argument("--prompt-file", default=None,
+                        help="Text file with the review prompt to use instead of the built-in one")
+    parser.add_argument("--content-hash", action="append", default=None,
+                        help="Only re-review this document (repeatable; default: every stored document)")
+    parser.add_argument("--output", default=config.get('rereview_output_csv', 'data/response/rereview_results.csv'),
+                        help="CSV file results are appended to")
+    parser.add_argument("--concurrency", type=int, default=config.get('batch_concurrency', 4),
+                        help="Number of documents reviewed at the same time")
+    parser.add_argument("--limit", type=int, default=None,
+                        help="Stop after this many documents")
+    args = parser.parse_args(argv)
+
+    if text_store is None:
+        parser.error("The extracted text store is disabled ('text_store_enabled' in config.json).")
+    prompt_template = None
+    if args.prompt_file:
+        if not os.path.isfile(args.prompt_file):
+            parser.error(f"Prompt file not found: {args.prompt_file}")
+        with open(args.prompt_file, encoding="utf-8") as f:
+            prompt_template = f.read()
+
+    configure_model()
+    try:
+        if prompt_template is not None:
+            check_prompt_template(prompt_template)
+        backend = get_review_backend(args.model)
+    except ValueError as e:
+        parser.error(str(e))
+
+    # asyncio.run() copies the current context, so the overrides apply to the whole run.
+    with review_overrides(backend=backend, prompt_template=prompt_template):
+        summary = asyncio.run(run_rereview(args.output, args.content_hash, args.concurrency, args.limit))
+    logging.info(f"Re-review finished: {summary}")
+    print(summary)
+
+
+if __name__ == "__main__":
+    main()
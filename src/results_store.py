@@ -0,0 +1,207 @@
+import sqlite3
+import base64
+import json
+import re
+import time
+import logging
+
+from src.sqlite_store import SQLiteStore
+
+# Columns of a stored review, in ResearchPaperData field order.
+RESULT_FIELDS = [
+    "title_of_paper", "author", "year_of_publication", "country_of_publication", "research_objective",
+    "independent_variable_or_cause", "dependent_variable_or_effect", "estimation_techniques", "theory",
+    "methods", "findings", "recommendations", "research_gap", "references", "remarks",
+]
+
+# Columns indexed for full-text search. 'q' searches findings and research_gap; the author,
+# country and estimation technique filters are column-restricted matches on the same index.
+FTS_COLUMNS = ["findings", "research_gap", "author", "country_of_publication", "estimation_techniques"]
+
+MAX_PAGE_SIZE = 500
+
+
+def parse_year(value):
+    """Extracts a 4-digit year from free text such as '2019', 'March 2019' or 'N/A' (None)."""
+    match = re.search(r"\b(1[89]\d\d|20\d\d)\b", value or "")
+    return int(match.group(1)) if match else None
+
+
+def _fts_phrase(text):
+    """Quotes user input as FTS5 phrases (one per word) so it cannot inject query syntax."""
+    words = re.findall(r"\w+", text or "", re.UNICODE)
+    return " ".join('"' + word.replace('"', '""') + '"' for word in words)
+
+
+def encode_cursor(result_id):
+    return base64.urlsafe_b64encode(json.dumps({"id": result_id}).encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor):
+    """Returns the result id encoded in a cursor. Raises ValueError on malformed cursors."""
+    try:
+        return int(json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))["id"])
+    except Exception:
+        raise ValueError("Invalid cursor.")
+
+
+class ResultsStore(SQLiteStore):
+    """
+    Persistent, indexed store of every validated ResearchPaperData row, in SQLite.
+
+    Each row keeps its batch id (the /upload/ batch, job or CLI run), source filename, content hash
+    and timestamps. Year filters use an indexed integer column parsed from year_of_publication; text
+    filters and search go through an FTS5 index, so queries stay fast without scanning CSV files.
+    Pagination is keyset-based on the row id (newest first), so deep pages cost the same as the first.
+    """
+
+    row_factory = sqlite3.Row
+
+    def __init__(self, db_path='data/results/results.sqlite3'):
+        super().__init__(db_path)
+
+    def _create_schema(self, conn):
+        # Field names are quoted because 'references' is an SQL keyword.
+        field_columns = ",\n".join(f'"{field}" TEXT' for field in RESULT_FIELDS)
+        conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS results (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                batch_id TEXT NOT NULL,
+                source_filename TEXT,
+                content_hash TEXT,
+                year INTEGER,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL,
+                {field_columns}
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_results_batch ON results (batch_id, id)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_results_hash ON results (content_hash)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_results_year ON results (year, id)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_results_created ON results (created_at)")
+        conn.execute(f"""
+            CREATE VIRTUAL TABLE IF NOT EXISTS results_fts USING fts5(
+                {', '.join(FTS_COLUMNS)}, content='results', content_rowid='id'
+            )
+        """)
+        # Keep the external-content FTS index in sync with the results table.
+        new_values = ", ".join(f"new.{column}" for column in FTS_COLUMNS)
+        old_values = ", ".join(f"old.{column}" for column in FTS_COLUMNS)
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS results_ai AFTER INSERT ON results BEGIN
+                INSERT INTO results_fts (rowid, {', '.join(FTS_COLUMNS)}) VALUES (new.id, {new_values});
+            END
+        """)
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS results_ad AFTER DELETE ON results BEGIN
+                INSERT INTO results_fts (results_fts, rowid, {', '.join(FTS_COLUMNS)}) VALUES ('delete', old.id, {old_values});
+            END
+        """)
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS results_au AFTER UPDATE ON results BEGIN
+                INSERT INTO results_fts (results_fts, rowid, {', '.join(FTS_COLUMNS)}) VALUES ('delete', old.id, {old_values});
+                INSERT INTO results_fts (rowid, {', '.join(FTS_COLUMNS)}) VALUES (new.id, {new_values});
+            END
+        """)
+
+    def add_result(self, batch_id, source_filename, content_hash, result):
+        """Stores one validated result dict. Returns the new row id, or None if storing failed."""
+        self._ensure_schema()
+        now = time.time()
+        columns = ["batch_id", "source_filename", "content_hash", "year", "created_at", "updated_at"] + RESULT_FIELDS
+        values = [batch_id, source_filename, content_hash, parse_year(result.get("year_of_publication")), now, now] + \
+            [result.get(field) for field in RESULT_FIELDS]
+        quoted_columns = ", ".join(f'"{column}"' for column in columns)
+        try:
+            with self._connect() as conn:
+                cursor = conn.execute(
+                    f"INSERT INTO results ({quoted_columns}) VALUES ({', '.join('?' for _ in columns)})", values
+                )
+                return cursor.lastrowid
+        except Exception as e:
+            logging.error(f"Failed to store result for {source_filename} in results store: {e}")
+            return None
+
+    def _build_filters(self, year=None, year_from=None, year_to=None, country=None, author=None,
+                       estimation_technique=None, q=None, batch_id=None, content_hash=None, batch_ids=None):
+        """Returns (clauses, params) for the shared result filters, over the 'results r' alias."""
+        clauses = []
+        params = []
+
+        match_parts = []
+        if q and _fts_phrase(q):
+            match_parts.append(f"{{findings research_gap}} : ({_fts_phrase(q)})")
+        for column, value in (("author", author), ("country_of_publication", country),
+                              ("estimation_techniques", estimation_technique)):
+            if value and _fts_phrase(value):
+                match_parts.append(f"{column} : ({_fts_phrase(value)})")
+        if match_parts:
+            clauses.append("r.id IN (SELECT rowid FROM results_fts WHERE results_fts MATCH ?)")
+            params.append(" AND ".join(match_parts))
+
+        if year is not None:
+            clauses.append("r.year = ?")
+            params.append(year)
+        if year_from is not None:
+            clauses.append("r.year >= ?")
+            params.append(year_from)
+        if year_to is not None:
+            clauses.append("r.year <= ?")
+            params.append(year_to)
+        if batch_id:
+            clauses.append("r.batch_id = ?")
+            params.append(batch_id)
+        if batch_ids:
+            clauses.append(f"r.batch_id IN ({', '.join('?' for _ in batch_ids)})")
+            params.extend(batch_ids)
+        if content_hash:
+            clauses.append("r.content_hash = ?")
+            params.append(content_hash)
+        return clauses, params
+
+    def query(self, limit=50, cursor=None, **filters):
+        """
+        Returns (rows, next_cursor). Rows are dicts, newest first; next_cursor is None on the last page.
+        Filters: year, year_from, year_to, country, author, estimation_technique, q, batch_id,
+        batch_ids, content_hash. 'q' is a full-text search over findings and research_gap; author,
+        country and estimation_technique match words within those fields.
+        """
+        self._ensure_schema()
+        limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+        clauses, params = self._build_filters(**filters)
+        if cursor:
+            clauses.append("r.id < ?")
+            params.append(decode_cursor(cursor))
+
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self._connect() as conn:
+            rows = conn.execute(
+                f"SELECT r.* FROM results r {where} ORDER BY r.id DESC LIMIT ?", params + [limit + 1]
+            ).fetchall()
+
+        has_more = len(rows) > limit
+        rows = [dict(row) for row in rows[:limit]]
+        next_cursor = encode_cursor(rows[-1]["id"]) if has_more and rows else None
+        return rows, next_cursor
+
+    def iter_results(self, chunk_size=MAX_PAGE_SIZE, **filters):
+        """
+        Yields every matching row as a dict, oldest first, fetching chunk_size rows per query
+        (keyset on id), so exporting any number of rows keeps memory constant.
+        Takes the same filters as query().
+        """
+        self._ensure_schema()
+        base_clauses, base_params = self._build_filters(**filters)
+        last_id = 0
+        while True:
+            clauses = base_clauses + ["r.id > ?"]
+            with self._connect() as conn:
+                rows = conn.execute(
+                    f"SELECT r.* FROM results r WHERE {' AND '.join(clauses)} ORDER BY r.id ASC LIMIT ?",
+                    base_params + [last_id, chunk_size]
+                ).fetchall()
+            for row in rows:
+                yield dict(row)
+            if len(rows) < chunk_size:
+                return
+            last_id = rows[-1]["id"]
@@ -1,63 +1,31 @@
-import google.generativeai as genai
 import os
+import json
+import hashlib
+import contextvars
+from contextlib import contextmanager
 from dotenv import load_dotenv
 import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from src.backends import create_backend
+from src.metrics import time_stage, PROMPT_TOKENS, RESPONSE_CHARS, MODEL_CALLS
+from src.tracing import with_context
+from src.deadlines import check_current_scope, WorkCancelled, DeadlineExceeded
+from src.sections import (
+    estimate_tokens, detect_sections, fit_sections_to_budget, split_into_chunks, get_front_matter,
+    truncate_to_tokens, LOW_VALUE_SECTIONS, SECTION_SEPARATOR
+)
 
 # Load environment variables from .env file
 load_dotenv()
 
-# --- Global variable to hold the model ---
-generator_model = None
-api_key_present = False # Flag to track if API key was found
-
-try:
-    # Configure the generative AI model
-    api_key = os.getenv('google_ai_studio_key')
-
-    if not api_key:
-        logging.error("Google AI API key 'google_ai_studio_key' not found in .env file. Gemini model will not be available.")
-    else:
-        genai.configure(api_key=api_key)
-        generator_model = genai.GenerativeModel(
-            model_name="gemini-1.5-flash",
-            system_instruction="You are an experienced doctoral research assistant. Your task is to extract specific information from research papers and provide it in a structured JSON format. Ensure all keys are in snake_case. If any information is unavailable, use 'N/A' as the value."
-        )
-        api_key_present = True # Set flag if configuration is successful
-        logging.info("Gemini model configured successfully.")
-
-except Exception as e:
-    # Catch any exception during configuration (e.g., invalid key format recognized by genai)
-    logging.error(f"Error configuring Gemini model: {e}")
-    generator_model = None # Ensure model is None if configuration fails
-    api_key_present = False
-
-
-def review(paper):
-    """
-    Reviews a paper using a generative model, requesting JSON output.
-    """
-    if not api_key_present or generator_model is None:
-        logging.error("Cannot perform review: Gemini model not available due to missing API key or configuration error.")
-        # Return a placeholder that mimics the expected structure but indicates an error
-        return json.dumps({
-            "title_of_paper": "N/A",
-            "author": "N/A",
-            "year_of_publication": "N/A",
-            "country_of_publication": "N/A",
-            "research_objective": "Error: API key missing or invalid",
-            "independent_variable_or_cause": "N/A",
-            "dependent_variable_or_effect": "N/A",
-            "estimation_techniques": "N/A",
-            "theory": "N/A",
-            "methods": "N/A",
-            "findings": "N/A",
-            "recommendations": "N/A",
-            "research_gap": "N/A",
-            "references": "N/A",
-            "remarks": "Error: API key missing or invalid"
-        })
+# --- Model and prompt definition ---
+# Kept at module level so callers (e.g. the review cache) can tell which model and prompt
+# produced a stored result. Any edit to these changes get_prompt_version().
+MODEL_NAME = "gemini-1.5-flash"
+SYSTEM_INSTRUCTION = "You are an experienced doctoral research assistant. Your task is to extract specific information from research papers and provide it in a structured JSON format. Ensure all keys are in snake_case. If any information is unavailable, use 'N/A' as the value."
 
-    prompt = f"""Please review the following research paper and extract the requested information.
+PROMPT_TEMPLATE = """Please review the following research paper and extract the requested information.
     Return the output STRICTLY as a JSON object.
     The JSON object should contain the following keys:
     'title_of_paper', 'author', 'year_of_publication', 'country_of_publication', 'research_objective',
@@ -92,9 +60,363 @@ def review(paper):
     ---
     """
 
+# Map step of the map-reduce path for long papers: each chunk is condensed to notes covering the
+# same fields, and the notes are then reviewed with PROMPT_TEMPLATE as if they were the paper.
+MAP_PROMPT_TEMPLATE = """The following is part {part} of {total_parts} of a research paper that is too long to review in one pass.
+    Write concise notes (at most 300 words) on anything in this part that is relevant to:
+    title, author(s), year and country of publication, research objective, independent and dependent
+    variables, estimation techniques, theory, methods, findings, recommendations, research gap and references.
+    Quote numbers, variable names and estimation techniques exactly. Skip fields this part says nothing about.
+    Return plain text notes only.
+
+    ---
+    {chunk}
+    ---
+    """
+
+REDUCE_PREAMBLE = """NOTE: The full paper was too long to include. Below are its title page and abstract,
+    followed by notes taken from consecutive parts of the paper. Base the review on these.
+    """
+
+# Packing mode for short papers: several papers share one request and the model returns a JSON
+# array with one review per paper, tagged with the key the paper was sent under.
+PACKED_PROMPT_TEMPLATE = """Please review each of the {count} research papers below and extract the requested information for each one.
+    Return the output STRICTLY as a JSON array with exactly one object per paper, in any order.
+    Every object must contain the key 'paper_key', set to the key shown in that paper's header, plus the keys:
+    'title_of_paper', 'author', 'year_of_publication', 'country_of_publication', 'research_objective',
+    'independent_variable_or_cause', 'dependent_variable_or_effect', 'estimation_techniques', 'theory',
+    'methods', 'findings', 'recommendations', 'research_gap', 'references', 'remarks'.
+
+    If any of the requested information is not available in a paper, use 'N/A' for its value.
+    Never mix information between papers. Ensure all keys and string values are enclosed in double quotes.
+
+    Example JSON format:
+    [
+        {{"paper_key": "paper_1", "title_of_paper": "Sample Title", "author": "Sample Author", "year_of_publication": "N/A", ...}},
+        {{"paper_key": "paper_2", "title_of_paper": "Another Title", "author": "N/A", "year_of_publication": "2019", ...}}
+    ]
+
+    The papers are as follows:
+    {papers}
+    """
+
+PACKED_PAPER_HEADER = "=== PAPER paper_key={key} ==="
+PACKED_PAPER_FOOTER = "=== END PAPER {key} ==="
+PACKED_PAPER_SEPARATOR = "\n\n"
+
+# Tokens reserved for the model's answer when charging a call against the tokens-per-minute quota.
+RESPONSE_TOKEN_RESERVE = 2048
+
+# --- Global variable to hold the model backend ---
+# Gemini by default; configure_backend() swaps in another backend (e.g. the local HTTP stand-in
+# used by the benchmarks) without touching the review code.
+model_backend = None
+api_key_present = False # Flag to track if API key was found
+
+
+def configure_default_backend():
+    """
+    Configures Gemini from the .env API key. Called at startup (the API's lifespan handler or
+    the batch CLI) rather than at import, so importing this module does not load
+    google.generativeai or configure a client that a forked worker would inherit.
+    """
+    global model_backend, api_key_present
     try:
-        response = generator_model.generate_content(prompt)
-        return response.text
+        # Configure the generative AI model
+        model_backend = create_backend("gemini", MODEL_NAME, SYSTEM_INSTRUCTION, api_key=os.getenv('google_ai_studio_key'))
+        if model_backend is not None:
+            api_key_present = True # Set flag if configuration is successful
+            logging.info("Gemini model configured successfully.")
+
     except Exception as e:
+        # Catch any exception during configuration (e.g., invalid key format recognized by genai)
+        logging.error(f"Error configuring Gemini model: {e}")
+        model_backend = None # Ensure model is None if configuration fails
+        api_key_present = False
+
+
+def configure_backend(backend):
+    """Replaces the model backend used by review() and generate()."""
+    global model_backend
+    model_backend = backend
+    logging.info(f"Model backend set to {backend.name if backend else None} ({get_model_name()})")
+
+
+# Per-run overrides of the backend and review prompt, e.g. to re-review stored texts with another
+# model. A contextvar rather than a global, so concurrent requests with different settings do not
+# interfere; the settings follow the work into executor threads through tracing.with_context.
+_review_overrides = contextvars.ContextVar("review_overrides", default=None)
+
+
+@contextmanager
+def review_overrides(backend=None, prompt_template=None):
+    """
+    Reviews started inside the with-block use 'backend' instead of the configured one and
+    'prompt_template' instead of PROMPT_TEMPLATE (either may be None to keep the default).
+    get_model_name() and get_prompt_version() follow the overrides, so cached results stay
+    keyed by the model and prompt that actually produced them.
+    """
+    token = _review_overrides.set({"backend": backend, "prompt_template": prompt_template})
+    try:
+        yield
+    finally:
+        _review_overrides.reset(token)
+
+
+def has_review_overrides():
+    overrides = _review_overrides.get()
+    return overrides is not None and any(value is not None for value in overrides.values())
+
+
+def _current_backend():
+    overrides = _review_overrides.get()
+    if overrides and overrides["backend"] is not None:
+        return overrides["backend"]
+    return model_backend
+
+
+def _current_prompt_template():
+    overrides = _review_overrides.get()
+    if overrides and overrides["prompt_template"] is not None:
+        return overrides["prompt_template"]
+    return PROMPT_TEMPLATE
+
+
+def check_prompt_template(template):
+    """
+    Raises ValueError unless 'template' can replace PROMPT_TEMPLATE: it must contain a {paper}
+    placeholder, and any other literal braces must be doubled ({{ and }}) as in PROMPT_TEMPLATE.
+    """
+    if "{paper}" not in (template or ""):
+        raise ValueError("The prompt template must contain a {paper} placeholder.")
+    try:
+        template.format(paper="")
+    except (KeyError, IndexError, ValueError) as e:
+        raise ValueError(f"The prompt template cannot be formatted ({e!r}); double any literal braces.")
+
+
+def get_model_name():
+    """Returns the name of the model that produces reviews (part of the review cache key)."""
+    backend = _current_backend()
+    return backend.model_name if backend is not None else MODEL_NAME
+
+
+def get_prompt_version():
+    """
+    Returns a short hash of the prompt template and system instruction.
+    Used to tell apart results produced by different prompt revisions.
+    """
+    digest = hashlib.sha256()
+    digest.update(SYSTEM_INSTRUCTION.encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(_current_prompt_template().encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(MAP_PROMPT_TEMPLATE.encode("utf-8"))
+    digest.update(REDUCE_PREAMBLE.encode("utf-8"))
+    digest.update(PACKED_PROMPT_TEMPLATE.encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+
+def is_model_available():
+    """Returns True if a model backend is configured and real reviews can be produced."""
+    return _current_backend() is not None
+
+
+def review(paper):
+    """
+    Reviews a paper using a generative model, requesting JSON output.
+    """
+    if not is_model_available():
+        logging.error("Cannot perform review: Gemini model not available due to missing API key or configuration error.")
+        # Return a placeholder that mimics the expected structure but indicates an error
+        return json.dumps({
+            "title_of_paper": "N/A",
+            "author": "N/A",
+            "year_of_publication": "N/A",
+            "country_of_publication": "N/A",
+            "research_objective": "Error: API key missing or invalid",
+            "independent_variable_or_cause": "N/A",
+            "dependent_variable_or_effect": "N/A",
+            "estimation_techniques": "N/A",
+            "theory": "N/A",
+            "methods": "N/A",
+            "findings": "N/A",
+            "recommendations": "N/A",
+            "research_gap": "N/A",
+            "references": "N/A",
+            "remarks": "Error: API key missing or invalid"
+        })
+
+    prompt = _current_prompt_template().format(paper=paper)
+    return generate(prompt)
+
+
+# Optional rate limiter/retry policy (rate_limiter.ModelCallLimiter), installed by the API or CLI
+# from config.json through set_call_limiter(). Without one, calls go straight to the model.
+call_limiter = None
+
+
+def set_call_limiter(limiter):
+    """Routes every model call through the given ModelCallLimiter (or directly, if None)."""
+    global call_limiter
+    call_limiter = limiter
+
+
+def generate(prompt, kind="review", response_tokens=RESPONSE_TOKEN_RESERVE):
+    """
+    Sends a prompt to the model and returns the response text, or "" on error.
+    'kind' ("review", "map" or "packed") labels the call in the metrics; response_tokens is the
+    answer size charged against the tokens-per-minute quota.
+    """
+    # Raises (rather than returning "") when the file was cancelled or is past its deadline.
+    check_current_scope()
+    PROMPT_TOKENS.labels(kind=kind).observe(estimate_tokens(prompt))
+    backend = _current_backend()
+    try:
+        with time_stage(f"model_call_{kind}"):
+            if call_limiter is not None:
+                text = call_limiter.call(
+                    lambda: backend.generate(prompt),
+                    estimated_tokens=estimate_tokens(prompt) + response_tokens
+                )
+            else:
+                text = backend.generate(prompt)
+        MODEL_CALLS.labels(kind=kind, outcome="ok").inc()
+        RESPONSE_CHARS.labels(kind=kind).observe(len(text or ""))
+        return text
+    except (WorkCancelled, DeadlineExceeded):
+        MODEL_CALLS.labels(kind=kind, outcome="cancelled").inc()
+        raise
+    except Exception as e:
+        MODEL_CALLS.labels(kind=kind, outcome="error").inc()
         logging.error(f"Error generating content from AI: {e}")
-        return "" # Return empty string or specific error indicator
\ No newline at end of file
+        return "" # Return empty string or specific error indicator
+
+
+def _strip_code_fence(text):
+    text = text.strip()
+    if text.startswith("```"):
+        text = text[3:]
+        if text.startswith("json"):
+            text = text[4:]
+        if text.endswith("```"):
+            text = text[:-3]
+    return text.strip()
+
+
+def format_packed_paper(key, text):
+    """Wraps one paper of a pack in its header and footer."""
+    return f"{PACKED_PAPER_HEADER.format(key=key)}\n{text}\n{PACKED_PAPER_FOOTER.format(key=key)}"
+
+
+def review_packed(papers):
+    """
+    Reviews several short papers in a single request.
+    'papers' maps a key to the paper text. Returns a dict of key -> review dict for every entry the
+    model returned under a known key; missing or unparseable entries are simply absent, and the
+    caller reviews those papers on their own.
+    """
+    papers_text = PACKED_PAPER_SEPARATOR.join(format_packed_paper(key, text) for key, text in papers.items())
+    prompt = PACKED_PROMPT_TEMPLATE.format(count=len(papers), papers=papers_text)
+    response_text = generate(prompt, kind="packed", response_tokens=RESPONSE_TOKEN_RESERVE * len(papers))
+    if not response_text:
+        return {}
+
+    try:
+        entries = json.loads(_strip_code_fence(response_text))
+    except json.JSONDecodeError:
+        logging.warning(f"Packed review of {len(papers)} papers returned invalid JSON: '{response_text[:200]}...'")
+        return {}
+    if isinstance(entries, dict): # A single object instead of an array
+        entries = [entries]
+    if not isinstance(entries, list):
+        return {}
+
+    reviews = {}
+    for entry in entries:
+        if not isinstance(entry, dict):
+            continue
+        key = str(entry.pop("paper_key", ""))
+        if key in papers and key not in reviews:
+            reviews[key] = entry
+    return reviews
+
+
+# Shared pool for the map step, so concurrent long papers don't each start their own threads.
+_map_executor = None
+
+
+def _get_map_executor(max_workers):
+    global _map_executor
+    if _map_executor is None:
+        _map_executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="review-map")
+    return _map_executor
+
+
+def summarize_chunk(chunk, part, total_parts):
+    """Map step: condenses one chunk of a long paper into field-oriented notes."""
+    return generate(MAP_PROMPT_TEMPLATE.format(chunk=chunk, part=part, total_parts=total_parts), kind="map")
+
+
+def _summarize_all(executor, texts):
+    """Runs the map step over texts in parallel, keeping order and the caller's trace id."""
+    futures = [
+        executor.submit(with_context(summarize_chunk, text, part, len(texts)))
+        for part, text in enumerate(texts, start=1)
+    ]
+    return [future.result() for future in futures]
+
+
+def review_document(paper, token_budget=30000, chunk_tokens=8000, map_workers=4, strategy="map_reduce"):
+    """
+    Reviews a paper of any length, keeping every prompt within token_budget (approximate tokens).
+
+    Papers that fit are sent to review() unchanged. Longer papers are split into detected sections
+    (abstract, introduction, methodology, results, conclusion, references, ...) and then either:
+      - strategy="sections": trimmed section by section to fit the budget and reviewed in one call, or
+      - strategy="map_reduce": split into chunks that are condensed to notes in parallel, after which
+        the title page, abstract and notes are reviewed in one final call.
+    Returns the raw model response text, like review().
+    """
+    # The budget covers the whole prompt, so the instructions around the paper are taken off first.
+    paper_budget = max(1, token_budget - estimate_tokens(_current_prompt_template().format(paper="")))
+    if not is_model_available() or estimate_tokens(paper) <= paper_budget:
+        return review(paper)
+
+    sections = detect_sections(paper)
+    # Dropping appendices and acknowledgements is often enough to fit.
+    kept_text = "\n\n".join(section["text"] for section in sections if section["name"] not in LOW_VALUE_SECTIONS)
+    if estimate_tokens(kept_text) <= paper_budget:
+        return review(fit_sections_to_budget(sections, paper_budget))
+
+    if strategy == "sections":
+        logging.info(f"Paper of ~{estimate_tokens(paper)} tokens trimmed by section to a {token_budget} token budget.")
+        return review(fit_sections_to_budget(sections, paper_budget))
+
+    chunks = split_into_chunks(sections, chunk_tokens)
+    logging.info(f"Paper of ~{estimate_tokens(paper)} tokens split into {len(chunks)} chunks for map-reduce review.")
+    executor = _get_map_executor(map_workers)
+    with time_stage("map_reduce_map"):
+        notes = _summarize_all(executor, chunks)
+    notes = [note.strip() for note in notes if note and note.strip()]
+    if not notes:
+        logging.error("Map step returned no notes for any chunk; cannot review paper.")
+        return ""
+
+    # The preamble and front matter share the budget with the notes (and their part markers).
+    header = REDUCE_PREAMBLE + "\n" + get_front_matter(sections, max_tokens=min(1000, paper_budget // 4)) + SECTION_SEPARATOR
+    notes_budget = max(1, paper_budget - estimate_tokens(header))
+
+    def format_notes(notes):
+        return SECTION_SEPARATOR.join(f"[NOTES ON PART {number}]\n{note}" for number, note in enumerate(notes, start=1))
+
+    # If the notes themselves are over budget (very long books), condense them again in groups.
+    while estimate_tokens(format_notes(notes)) > notes_budget and len(notes) > 1:
+        group_size = max(2, len(notes) // max(1, notes_budget // chunk_tokens))
+        groups = [SECTION_SEPARATOR.join(notes[i:i + group_size]) for i in range(0, len(notes), group_size)]
+        with time_stage("map_reduce_map"):
+            notes = _summarize_all(executor, groups)
+        notes = [note.strip() for note in notes if note and note.strip()]
+
+    # A single note can still be too long; cut it rather than going over the budget.
+    return review(header + truncate_to_tokens(format_notes(notes), notes_budget - 1))
\ No newline at end of file
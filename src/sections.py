@@ -0,0 +1,185 @@
+import re
+
+# Preprocessing between text extraction and review(): detects the usual sections of a research
+# paper and fits the text to a token budget, either by trimming sections by priority or by
+# splitting it into chunks for map-reduce review.
+
+# Rough token estimate used for budgeting; Gemini averages about 4 characters per token on English prose.
+CHARS_PER_TOKEN = 4
+
+# Section name -> heading pattern. Order matters: the first matching pattern names the section.
+SECTION_PATTERNS = [
+    ("abstract", r"abstract|executive summary|summary"),
+    ("introduction", r"introduction|background|motivation"),
+    ("literature_review", r"literature review|review of (the )?(related )?literature|related (work|literature)"),
+    ("theory", r"theoretical (framework|background|model)|conceptual framework|theory"),
+    ("methodology", r"methodology|methods?|data( and (methodology|methods?))?|research design|empirical (strategy|model|framework)|model specification|estimation (strategy|techniques?)"),
+    ("results", r"(empirical )?results?( and discussion)?|findings|empirical analysis|analysis"),
+    ("discussion", r"discussion"),
+    ("conclusion", r"(summary and )?conclusions?( and (recommendations|policy implications))?|concluding remarks|policy (implications|recommendations)|recommendations"),
+    ("references", r"references|bibliography|works cited|literature cited"),
+    ("appendix", r"appendi(x|ces)( [a-z0-9]+)?|annex(es)?( [a-z0-9]+)?"),
+    ("acknowledgements", r"acknowledge?ments?"),
+]
+
+# A heading is a short line, optionally numbered ("2.", "2.1", "IV.", "A."), made of a section keyword.
+_HEADING_RE = re.compile(
+    r"^\s*(?:(?:\d+(?:\.\d+)*|[IVXLC]+|[A-H])[.)]?\s+)?(?P<title>" +
+    "|".join(f"(?:{pattern})" for _, pattern in SECTION_PATTERNS) +
+    r")\s*[:.]?\s*$",
+    re.IGNORECASE | re.MULTILINE
+)
+
+# How much of the budget each section may claim when a paper has to be trimmed to fit.
+# Sections not listed (and the untitled front matter) share the 'other' weight.
+SECTION_WEIGHTS = {
+    "front_matter": 3,
+    "abstract": 4,
+    "introduction": 3,
+    "literature_review": 1,
+    "theory": 2,
+    "methodology": 4,
+    "results": 4,
+    "discussion": 2,
+    "conclusion": 4,
+    "references": 1,
+    "other": 1,
+}
+
+# Sections that add little to the extracted fields and are dropped first.
+LOW_VALUE_SECTIONS = {"appendix", "acknowledgements"}
+
+
+def estimate_tokens(text):
+    """Returns an approximate token count for budgeting purposes."""
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def _section_name(title):
+    for name, pattern in SECTION_PATTERNS:
+        if re.fullmatch(pattern, title.strip(), re.IGNORECASE):
+            return name
+    return "other"
+
+
+def detect_sections(text):
+    """
+    Splits extracted text into sections based on heading lines.
+    Returns a list of {"name", "heading", "text"} dicts in document order. Text before the first
+    recognised heading (title, authors, affiliations) is returned as 'front_matter'.
+    """
+    sections = []
+    matches = list(_HEADING_RE.finditer(text))
+    first_start = matches[0].start() if matches else len(text)
+    if text[:first_start].strip():
+        sections.append({"name": "front_matter", "heading": "", "text": text[:first_start].strip()})
+    for position, match in enumerate(matches):
+        end = matches[position + 1].start() if position + 1 < len(matches) else len(text)
+        body = text[match.end():end].strip()
+        heading = match.group("title").strip()
+        sections.append({"name": _section_name(heading), "heading": heading, "text": body})
+    return sections
+
+
+TRUNCATION_MARKER = " [...]"
+SECTION_SEPARATOR = "\n\n"
+
+
+def truncate_to_tokens(text, max_tokens):
+    """Cuts text to at most max_tokens (by estimate_tokens), ending in TRUNCATION_MARKER if it was cut."""
+    max_chars = max(0, max_tokens) * CHARS_PER_TOKEN
+    if len(text) <= max_chars:
+        return text
+    # The marker counts against the limit too, so the result is never longer than max_chars.
+    return text[:max(0, max_chars - len(TRUNCATION_MARKER))].rsplit(" ", 1)[0] + TRUNCATION_MARKER
+
+
+def _format_section(section, body):
+    if not section["heading"]:
+        return body
+    return f"[{section['heading'].upper()}]\n{body}"
+
+
+def fit_sections_to_budget(sections, token_budget):
+    """
+    Builds one text of at most token_budget tokens (by estimate_tokens, formatting included) from
+    the detected sections.
+    Low-value sections are dropped; the remaining budget is shared by section weight, and
+    budget a short section does not use is handed on to the longer ones.
+    """
+    kept = [section for section in sections if section["name"] not in LOW_VALUE_SECTIONS]
+    allowances = {}
+    # Heading labels, separators and truncation markers take up room as well; reserve it first.
+    formatting_tokens = sum(
+        estimate_tokens(_format_section(section, "") + SECTION_SEPARATOR + TRUNCATION_MARKER) for section in kept
+    )
+    remaining_budget = max(0, token_budget - formatting_tokens)
+    pending = list(range(len(kept)))
+    # Repeatedly give every pending section its weighted share; sections that fit are settled
+    # and their leftover share is redistributed on the next pass.
+    while pending:
+        total_weight = sum(SECTION_WEIGHTS.get(kept[i]["name"], SECTION_WEIGHTS["other"]) for i in pending)
+        settled = []
+        for i in pending:
+            share = remaining_budget * SECTION_WEIGHTS.get(kept[i]["name"], SECTION_WEIGHTS["other"]) // total_weight
+            if estimate_tokens(kept[i]["text"]) <= share:
+                allowances[i] = estimate_tokens(kept[i]["text"])
+                settled.append(i)
+        if not settled:
+            for i in pending:
+                allowances[i] = remaining_budget * SECTION_WEIGHTS.get(kept[i]["name"], SECTION_WEIGHTS["other"]) // total_weight
+            break
+        for i in settled:
+            remaining_budget -= allowances[i]
+            pending.remove(i)
+
+    text = SECTION_SEPARATOR.join(
+        _format_section(section, truncate_to_tokens(section["text"], allowances[i]))
+        for i, section in enumerate(kept) if allowances.get(i, 0) > 0
+    )
+    # Per-section estimates round differently from the estimate of the whole text: trim the tail
+    # if the result still comes out over budget.
+    if estimate_tokens(text) > token_budget:
+        text = truncate_to_tokens(text, token_budget - 1)
+    return text
+
+
+def split_into_chunks(sections, chunk_tokens):
+    """
+    Splits the sections into chunks of at most ~chunk_tokens tokens for map-reduce review.
+    Chunks follow section boundaries where possible; sections longer than a chunk are split on
+    paragraph (or, failing that, sentence) boundaries. Low-value sections are skipped.
+    """
+    chunk_chars = chunk_tokens * CHARS_PER_TOKEN
+    chunks = []
+    current = ""
+    for section in sections:
+        if section["name"] in LOW_VALUE_SECTIONS:
+            continue
+        pieces = re.split(r"\n\s*\n", _format_section(section, section["text"]))
+        for piece in pieces:
+            # A single oversized paragraph is split on sentence ends, then hard-cut if needed.
+            sub_pieces = [piece] if len(piece) <= chunk_chars else re.split(r"(?<=[.!?])\s+", piece)
+            for sub_piece in sub_pieces:
+                while len(sub_piece) > chunk_chars:
+                    if current:
+                        chunks.append(current)
+                        current = ""
+                    chunks.append(sub_piece[:chunk_chars])
+                    sub_piece = sub_piece[chunk_chars:]
+                if current and len(current) + len(sub_piece) + 2 > chunk_chars:
+                    chunks.append(current)
+                    current = ""
+                current = f"{current}\n\n{sub_piece}" if current else sub_piece
+    if current.strip():
+        chunks.append(current)
+    return chunks
+
+
+def get_front_matter(sections, max_tokens=1000):
+    """Returns the title/author block (and abstract, if any) that the reduce step needs for bibliographic fields."""
+    parts = [
+        _format_section(section, section["text"])
+        for section in sections if section["name"] in ("front_matter", "abstract")
+    ]
+    return truncate_to_tokens("\n\n".join(parts), max_tokens)
@@ -0,0 +1,70 @@
+import os
+import sqlite3
+import threading
+
+# Shared plumbing of the SQLite-backed stores (review cache, jobs, results, near-duplicate index,
+# text store, rate limiter). SQLite in WAL mode lets every gunicorn worker on the host read and
+# write the same file without an extra service.
+
+
+def connect(db_path, isolation_level="", row_factory=None):
+    """
+    Opens a connection in WAL mode. isolation_level is passed to sqlite3.connect: "" (Python's
+    default) opens transactions implicitly, None is autocommit with explicit BEGIN/COMMIT.
+    """
+    conn = sqlite3.connect(db_path, timeout=30, isolation_level=isolation_level)
+    conn.execute("PRAGMA journal_mode=WAL")
+    if row_factory is not None:
+        conn.row_factory = row_factory
+    return conn
+
+
+class SQLiteStore:
+    """
+    Base class for a store kept in one SQLite file.
+
+    The schema is created on first use (not in __init__, which runs at import time, possibly in
+    the gunicorn master) by _ensure_schema(), once per process: subclasses put their CREATE
+    statements in _create_schema(conn). The class attributes choose how _connect() connects.
+    """
+
+    isolation_level = "" # See connect()
+    row_factory = None
+    # Reuse one connection per thread instead of opening one per call (for very frequent lookups).
+    # Such connections are never closed by the caller.
+    thread_local_connections = False
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._init_lock = threading.Lock()
+        self._initialized = False
+        self._local = threading.local()
+
+    def _connect(self):
+        if not self.thread_local_connections:
+            return connect(self.db_path, self.isolation_level, self.row_factory)
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = connect(self.db_path, self.isolation_level, self.row_factory)
+        return conn
+
+    def _create_schema(self, conn):
+        raise NotImplementedError
+
+    def _ensure_schema(self):
+        if self._initialized:
+            return
+        with self._init_lock:
+            if self._initialized:
+                return
+            db_dir = os.path.dirname(self.db_path)
+            if db_dir:
+                os.makedirs(db_dir, exist_ok=True)
+            conn = self._connect()
+            try:
+                self._create_schema(conn)
+                conn.commit()
+            finally:
+                if not self.thread_local_connections:
+                    conn.close()
+            self._initialized = True
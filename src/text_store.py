@@ -0,0 +1,239 @@
+import mmap
+import os
+import struct
+import time
+import zlib
+import logging
+import threading
+
+from src.sqlite_store import SQLiteStore
+
+# Every record in the segment file is this header followed by the zlib-compressed UTF-8 text:
+# magic, content hash (32 raw bytes), compressed length, uncompressed length, CRC-32 of the
+# compressed bytes. The header makes each record self-describing, so a damaged record is detected
+# on read and the index could be rebuilt by scanning the segment.
+RECORD_MAGIC = b"RTX1"
+RECORD_HEADER = struct.Struct("<4s32sIII")
+COMPRESSION_LEVEL = 6
+# Stored in the index's PRAGMA user_version. Version 2 keys texts by content hash and extraction
+# settings; version 1 indexes (content hash only, possibly holding texts cut short by a timeout)
+# are dropped on first use, so those documents are extracted once more.
+SCHEMA_VERSION = 2
+
+
+class ExtractedTextStore(SQLiteStore):
+    """
+    Extracted document texts, keyed by content hash and extraction settings, so a document is
+    only parsed once. The settings (see api.get_extraction_settings) cover every option that
+    changes the text, such as the PDF backend and page window: a text read with other settings is
+    never served in place of the one the current configuration would extract.
+
+    Texts are appended zlib-compressed to a single append-only segment file and located through
+    an offset index in SQLite; reads slice the segment through mmap, so fetching a text costs an
+    index lookup and a decompress, and walking the whole corpus reads the segment sequentially.
+    Records are never rewritten: a document is stored once per settings and identical uploads
+    reuse it. invalidate() removes index rows; their bytes stay in the segment, unreferenced.
+
+    Appends from several gunicorn workers are serialized by the index's write transaction (taken
+    before the segment is touched), which works on every platform without file locks. A record
+    only becomes visible once its index row commits, so a crash mid-append leaves at worst some
+    unreferenced bytes at the end of the segment.
+    """
+
+    isolation_level = None # Explicit BEGIN IMMEDIATE / COMMIT around appends
+
+    def __init__(self, directory='data/texts'):
+        super().__init__(os.path.join(directory, 'index.sqlite3'))
+        self.directory = directory
+        self.segment_path = os.path.join(directory, 'texts.seg')
+        # Read-only map of the segment, shared by all threads and replaced when the file has grown.
+        self._map_lock = threading.Lock()
+        self._map = None
+
+    def _create_schema(self, conn):
+        # Created (empty) here so the segment exists before anything maps it.
+        open(self.segment_path, 'ab').close()
+        # Taken so that only one process checks and migrates the schema.
+        conn.execute("BEGIN IMMEDIATE")
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        if version < SCHEMA_VERSION:
+            if conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'texts'").fetchone():
+                logging.warning(f"Text store index {self.db_path} has schema version {version}; "
+                                f"dropping it (documents will be extracted again).")
+            conn.execute("DROP TABLE IF EXISTS texts")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS texts (
+                content_hash TEXT NOT NULL,
+                extraction_settings TEXT NOT NULL,
+                filename TEXT,
+                segment_offset INTEGER NOT NULL,
+                record_length INTEGER NOT NULL,
+                text_chars INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                PRIMARY KEY (content_hash, extraction_settings)
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_texts_segment_offset ON texts (segment_offset)")
+        conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        conn.execute("COMMIT")
+
+    def _read_record(self, offset, length):
+        """Returns the bytes of one record, remapping the segment if it has grown since it was mapped."""
+        with self._map_lock:
+            if self._map is None or offset + length > len(self._map):
+                with open(self.segment_path, 'rb') as f:
+                    # The old map is not closed: other threads may still be slicing it.
+                    self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            segment = self._map
+        return segment[offset:offset + length]
+
+    def _decode(self, content_hash, record):
+        magic, digest, compressed_length, raw_length, crc = RECORD_HEADER.unpack_from(record)
+        payload = record[RECORD_HEADER.size:RECORD_HEADER.size + compressed_length]
+        if magic != RECORD_MAGIC or digest != bytes.fromhex(content_hash) or zlib.crc32(payload) != crc:
+            raise ValueError(f"corrupt text record for {content_hash}")
+        return zlib.decompress(payload, bufsize=max(raw_length, 1)).decode("utf-8")
+
+    def get(self, content_hash, extraction_settings):
+        """Returns the stored text of a document, or None if it was never stored with these settings."""
+        self._ensure_schema()
+        try:
+            conn = self._connect()
+            try:
+                row = conn.execute(
+                    "SELECT segment_offset, record_length FROM texts WHERE content_hash = ? AND extraction_settings = ?",
+                    (content_hash, extraction_settings)
+                ).fetchone()
+            finally:
+                conn.close()
+            if row is None:
+                return None
+            return self._decode(content_hash, self._read_record(*row))
+        except Exception as e:
+            # Like the review cache, the store must never break a review: fall back to extracting.
+            logging.error(f"Text store lookup failed for {content_hash}: {e}")
+            return None
+
+    def put(self, content_hash, extraction_settings, filename, text):
+        """
+        Stores a document's text unless it is already stored with these settings. Returns True if
+        a record was written. Only complete extractions belong here, not text cut short by a timeout.
+        """
+        self._ensure_schema()
+        raw = text.encode("utf-8")
+        payload = zlib.compress(raw, COMPRESSION_LEVEL)
+        record = RECORD_HEADER.pack(
+            RECORD_MAGIC, bytes.fromhex(content_hash), len(payload), len(raw), zlib.crc32(payload)
+        ) + payload
+        try:
+            conn = self._connect()
+            try:
+                # Held until COMMIT, so only one process appends to the segment at a time.
+                conn.execute("BEGIN IMMEDIATE")
+                if conn.execute(
+                    "SELECT 1 FROM texts WHERE content_hash = ? AND extraction_settings = ?", (content_hash, extraction_settings)
+                ).fetchone():
+                    conn.execute("ROLLBACK")
+                    return False
+                with open(self.segment_path, 'ab') as f:
+                    offset = f.seek(0, os.SEEK_END)
+                    f.write(record)
+                    f.flush()
+                    os.fsync(f.fileno()) # The record must be on disk before the index points at it
+                conn.execute(
+                    "INSERT INTO texts (content_hash, extraction_settings, filename, segment_offset, record_length, "
+                    "text_chars, created_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (content_hash, extraction_settings, filename, offset, len(record), len(text), time.time())
+                )
+                conn.execute("COMMIT")
+                return True
+            except Exception:
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+                raise
+            finally:
+                conn.close()
+        except Exception as e:
+            logging.error(f"Failed to store extracted text of {filename} ({content_hash}): {e}")
+            return False
+
+    def _rows_to_entries(self, rows):
+        return [
+            {"content_hash": row[0], "extraction_settings": row[1], "filename": row[2], "text_chars": row[3],
+             "created_at": row[4], "cursor": str(row[5])}
+            for row in rows
+        ]
+
+    def list_documents(self, limit=100, cursor=None):
+        """
+        Returns up to 'limit' stored documents (content_hash, extraction_settings, filename,
+        text_chars, created_at, cursor) in the order they were stored. Pass the last entry's 'cursor' to get the next page.
+        Only the index is read; use get() for the texts.
+        """
+        self._ensure_schema()
+        try:
+            after_offset = int(cursor) if cursor else -1
+        except ValueError:
+            raise ValueError(f"Invalid cursor: {cursor!r}")
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                "SELECT content_hash, extraction_settings, filename, text_chars, created_at, segment_offset FROM texts "
+                "WHERE segment_offset > ? ORDER BY segment_offset LIMIT ?",
+                (after_offset, limit)
+            ).fetchall()
+        finally:
+            conn.close()
+        return self._rows_to_entries(rows)
+
+    def find_documents(self, content_hashes):
+        """Returns the index entries of the given content hashes that are stored, in segment order."""
+        self._ensure_schema()
+        if not content_hashes:
+            return []
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                f"SELECT content_hash, extraction_settings, filename, text_chars, created_at, segment_offset FROM texts "
+                f"WHERE content_hash IN ({', '.join('?' for _ in content_hashes)}) ORDER BY segment_offset",
+                list(content_hashes)
+            ).fetchall()
+        finally:
+            conn.close()
+        return self._rows_to_entries(rows)
+
+    def invalidate(self, content_hash=None, extraction_settings=None):
+        """
+        Removes stored texts, so the documents are extracted again on their next upload. With no
+        arguments every text is removed; otherwise only those matching the given content hash
+        and/or settings. Returns the number of texts removed.
+        """
+        self._ensure_schema()
+        clauses = []
+        params = []
+        if content_hash:
+            clauses.append("content_hash = ?")
+            params.append(content_hash)
+        if extraction_settings:
+            clauses.append("extraction_settings = ?")
+            params.append(extraction_settings)
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        conn = self._connect()
+        try:
+            return conn.execute(f"DELETE FROM texts{where}", params).rowcount
+        finally:
+            conn.close()
+
+    def stats(self):
+        """Returns the number of stored documents, their total characters and the segment size on disk."""
+        self._ensure_schema()
+        conn = self._connect()
+        try:
+            documents, text_chars = conn.execute("SELECT COUNT(*), COALESCE(SUM(text_chars), 0) FROM texts").fetchone()
+        finally:
+            conn.close()
+        return {
+            "documents": documents,
+            "text_chars": text_chars,
+            "segment_bytes": os.path.getsize(self.segment_path),
+        }
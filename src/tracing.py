@@ -0,0 +1,32 @@
+"""
+Per-request trace ids for the logs. The id lives in a context variable that is set by the API
+middleware (or by a job worker for each file) and added to every log record by TraceIdFilter,
+so all lines belonging to one upload can be grepped together.
+"""
+import contextvars
+import logging
+import uuid
+from functools import partial
+
+trace_id_var = contextvars.ContextVar("trace_id", default="-")
+
+
+def new_trace_id():
+    return uuid.uuid4().hex[:16]
+
+
+class TraceIdFilter(logging.Filter):
+    """Adds 'trace_id' to log records so formats can use %(trace_id)s."""
+
+    def filter(self, record):
+        record.trace_id = trace_id_var.get()
+        return True
+
+
+def with_context(fn, *args, **kwargs):
+    """
+    Wraps fn so it runs in a copy of the current context. loop.run_in_executor does not carry
+    context variables into the worker thread; without this, logs from extraction and review
+    would lose the trace id.
+    """
+    return partial(contextvars.copy_context().run, fn, *args, **kwargs)
@@ -1,9 +1,8 @@
-import pdfplumber
 import glob
 import os
-import pandas as pd
 import logging
-import docx
+
+from src.extraction import extract_pdf_text, ExtractionTimeoutError, ExtractionCancelledError
 
 # Configure logging for utils if needed, or rely on main logger
 # logging.basicConfig(level=logging.INFO)
@@ -14,22 +13,59 @@ def get_pdf_files(directory):
     """
     return glob.glob(os.path.join(directory, '*.pdf'))
 
-def extract_text_from_pdf(pdf_path):
+def get_document_files(directory, recursive=True):
     """
-    Extracts text from a PDF file.
+    Retrieves all PDF and DOCX files from the specified directory, including subdirectories
+    when recursive is True. Paths are returned sorted so batch runs process files in a stable order.
+    """
+    pattern = os.path.join(directory, '**', '*') if recursive else os.path.join(directory, '*')
+    return sorted(
+        path for path in glob.glob(pattern, recursive=recursive)
+        if os.path.isfile(path) and os.path.splitext(path)[1].lower() in ('.pdf', '.docx')
+    )
+
+def extract_pdf_document(pdf_path, **options):
+    """
+    Extracts a PDF and returns extraction.extract_pdf_text's result dict (text, page_count,
+    pages_extracted, page_timings, timed_out, backend). Keyword options are passed to
+    extraction.extract_pdf_text (backend, max_pages, first_pages, last_pages, timeout,
+    parallel_min_pages, max_workers, isolated, hard_timeout, cancel_event). Errors give an empty
+    text; isolated extractions that are killed raise instead.
     """
     try:
-        with pdfplumber.open(pdf_path) as pdf:
-            text = ''.join(page.extract_text() for page in pdf.pages if page.extract_text())
-        return text
+        result = extract_pdf_text(pdf_path, **options)
+        timings = result["page_timings"]
+        if timings:
+            slowest = max(timings, key=lambda timing: timing["seconds"])
+            logging.info(
+                f"Extracted {result['pages_extracted']}/{result['page_count']} pages from {pdf_path} "
+                f"with {result['backend']} in {sum(t['seconds'] for t in timings):.2f}s "
+                f"(slowest: page {slowest['page']}, {slowest['seconds']:.2f}s)"
+            )
+        if result["timed_out"]:
+            logging.warning(f"PDF extraction timed out for {pdf_path}; using the {result['pages_extracted']} pages read so far.")
+        return result
+    except (ExtractionTimeoutError, ExtractionCancelledError):
+        raise
     except Exception as e:
         # Use logging instead of print for errors
         logging.error(f"Error extracting text from {pdf_path}: {e}")
-        return ""
+        return {"text": "", "page_count": 0, "pages_extracted": 0, "page_timings": [], "timed_out": False,
+                "backend": options.get("backend")}
+
+def extract_text_from_pdf(pdf_path, **options):
+    """
+    Extracts text from a PDF file.
+    Takes the same options as extract_pdf_document and returns only the text ("" on errors).
+    """
+    return extract_pdf_document(pdf_path, **options)["text"]
 
 def extract_text_from_docx(docx_path_or_file_obj):
     """Extracts text from a docx file path or file object."""
-    if not docx:
+    # Imported on first use so processes that never see a DOCX file don't pay for python-docx/lxml.
+    try:
+        import docx
+    except ImportError:
         raise ImportError("python-docx is not installed. Please install it to process Word files.")
     try:
         document = docx.Document(docx_path_or_file_obj)
@@ -41,6 +77,7 @@ def extract_text_from_docx(docx_path_or_file_obj):
 def save_dataframe_to_csv(df, output_path='data/review/output.csv'):
     """
     Saves the DataFrame to a CSV file.
+    Takes the DataFrame from the caller, so this module does not need to import pandas itself.
     """
     # Ensure the directory exists
     os.makedirs(os.path.dirname(output_path), exist_ok=True)
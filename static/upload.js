@@ -28,22 +28,25 @@ uploadForm.addEventListener('submit', async (e) => {
     }
 
     try {
-        // Make the POST request to the API
-        const response = await fetch('/upload/', {
+        // Submit the files as a background job so large batches don't hit request timeouts
+        const response = await fetch('/jobs/', {
             method: 'POST',
             body: formData
         });
         
         // Parse the JSON response from the server
-        const result = await response.json();
+        const job = await response.json();
 
         // Check if the response indicates an error (e.g., status code not in 2xx range)
         if (!response.ok) {
             // Extract error message from the server response if available
-            const errorMessage = result.detail || `Upload failed with status ${response.status}`;
+            const errorMessage = job.detail || `Upload failed with status ${response.status}`;
             throw new Error(errorMessage);
         }
 
+        // Follow the job until it completes; the summary has the same shape as the /upload/ response
+        const result = await followJobProgress(job);
+
         // Store the entire result object (which now includes generated_csv_filename) 
         // in sessionStorage for the results page.
         sessionStorage.setItem('analysisResults', JSON.stringify(result));
@@ -60,6 +63,55 @@ uploadForm.addEventListener('submit', async (e) => {
     }
 });
 
+// Reads the job's NDJSON progress stream, updating the loading indicator as each file finishes.
+// Resolves with the job summary. If the stream drops before the job completes, falls back to polling.
+async function followJobProgress(job) {
+    let filesDone = 0;
+    loadingIndicator.textContent = `Processing files, please wait... (0 of ${job.total_files} done)`;
+
+    try {
+        const response = await fetch(job.stream_url);
+        if (response.ok && response.body) {
+            const reader = response.body.getReader();
+            const decoder = new TextDecoder();
+            let buffer = '';
+            while (true) {
+                const { value, done } = await reader.read();
+                if (done) break;
+                buffer += decoder.decode(value, { stream: true });
+                const lines = buffer.split('\n');
+                buffer = lines.pop(); // Keep any incomplete line for the next chunk
+                for (const line of lines) {
+                    if (!line.trim()) continue;
+                    const event = JSON.parse(line);
+                    if (event.event === 'file') {
+                        filesDone += 1;
+                        loadingIndicator.textContent = `Processing files, please wait... (${filesDone} of ${job.total_files} done)`;
+                    } else if (event.event === 'completed') {
+                        return event.summary;
+                    }
+                }
+            }
+        }
+    } catch (err) {
+        console.warn('Progress stream interrupted, polling job status instead:', err);
+    }
+
+    // Fallback: poll the job status until it completes
+    while (true) {
+        const statusResponse = await fetch(job.status_url);
+        const status = await statusResponse.json();
+        if (!statusResponse.ok) {
+            throw new Error(status.detail || `Job status check failed with status ${statusResponse.status}`);
+        }
+        if (status.status === 'completed') {
+            return status.summary;
+        }
+        loadingIndicator.textContent = `Processing files, please wait... (${status.files_completed} of ${status.total_files} done)`;
+        await new Promise(resolve => setTimeout(resolve, 2000));
+    }
+}
+
 // Clear file input and error messages when the page loads
 // This ensures a clean slate for new uploads.
 document.addEventListener('DOMContentLoaded', () => {
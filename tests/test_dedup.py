@@ -0,0 +1,38 @@
+import random
+
+from src.dedup import NearDuplicateIndex, compute_signature, estimate_similarity
+
+VOCABULARY = [f"word{n}" for n in range(2000)]
+
+
+def paper_text(seed, words=1500):
+    generator = random.Random(seed)
+    return " ".join(generator.choice(VOCABULARY) for _ in range(words))
+
+
+def edited(text, every=40):
+    """The same paper with a small share of its words changed (e.g. preprint vs. published)."""
+    words = text.split()
+    return " ".join("edited" if n % every == 0 else word for n, word in enumerate(words))
+
+
+def test_signatures_track_similarity():
+    original = paper_text(1)
+    assert estimate_similarity(compute_signature(original), compute_signature(edited(original))) > 0.6
+    assert estimate_similarity(compute_signature(original), compute_signature(paper_text(2))) < 0.1
+    assert compute_signature("too short to fingerprint") is None
+
+
+def test_index_finds_near_duplicates_for_the_same_model_and_prompt(tmp_path):
+    index = NearDuplicateIndex(str(tmp_path / "dedup.sqlite3"), similarity_threshold=0.6)
+    original = paper_text(1)
+    index.add(compute_signature(original), "hash-1", "original.pdf", "model", "v1", {"title_of_paper": "T"})
+    index.add(compute_signature(paper_text(2)), "hash-2", "other.pdf", "model", "v1", {"title_of_paper": "U"})
+
+    match = index.find(compute_signature(edited(original)), "model", "v1")
+    assert match["content_hash"] == "hash-1"
+    assert match["result"] == {"title_of_paper": "T"}
+    # Reviews from another model or prompt are not reused, and a paper never matches itself.
+    assert index.find(compute_signature(edited(original)), "model", "v2") is None
+    assert index.find(compute_signature(original), "model", "v1", exclude_content_hash="hash-1") is None
+    assert index.find(compute_signature(paper_text(3)), "model", "v1") is None
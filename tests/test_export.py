@@ -0,0 +1,59 @@
+import csv
+import gzip
+import io
+import json
+
+import pytest
+
+from src.export import (
+    EXPORT_COLUMNS, ExportFormatError, check_export_format, export_filename, export_media_type, stream_export
+)
+
+
+def rows(count):
+    return [
+        {"batch_id": "b", "source_filename": f"p{n}.pdf", "content_hash": f"h{n}", "title_of_paper": f"Paper, \"{n}\"",
+         "findings": "Line one\nline two", "year_of_publication": "2020", "id": n}
+        for n in range(count)
+    ]
+
+
+def expected(row):
+    return {column: row.get(column) for column in EXPORT_COLUMNS}
+
+
+def test_csv_round_trip():
+    # More rows than one chunk, so the header must be written only once.
+    source = rows(1200)
+    body = b"".join(stream_export(iter(source), "csv")).decode("utf-8")
+    parsed = list(csv.DictReader(io.StringIO(body)))
+    assert len(parsed) == 1200
+    assert parsed[5] == {column: row or "" for column, row in expected(source[5]).items()}
+
+
+def test_ndjson_round_trip_with_gzip():
+    source = rows(3)
+    body = gzip.decompress(b"".join(stream_export(iter(source), "ndjson", gzip=True)))
+    parsed = [json.loads(line) for line in body.decode("utf-8").splitlines()]
+    assert parsed == [expected(row) for row in source]
+
+
+def test_parquet_and_xlsx_round_trip():
+    pq = pytest.importorskip("pyarrow.parquet")
+    openpyxl = pytest.importorskip("openpyxl")
+    source = rows(3)
+
+    table = pq.read_table(io.BytesIO(b"".join(stream_export(iter(source), "parquet"))))
+    assert table.to_pylist()[1]["title_of_paper"] == source[1]["title_of_paper"]
+
+    sheet = openpyxl.load_workbook(io.BytesIO(b"".join(stream_export(iter(source), "xlsx")))).active
+    values = list(sheet.values)
+    assert list(values[0]) == EXPORT_COLUMNS
+    assert len(values) == 4
+
+
+def test_unknown_format():
+    with pytest.raises(ExportFormatError):
+        check_export_format("pdf")
+    assert export_filename("results", "csv", gzip=True) == "results.csv.gz"
+    assert export_media_type("ndjson") == "application/x-ndjson"
@@ -0,0 +1,40 @@
+import os
+import subprocess
+import sys
+import textwrap
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs an isolated call the way `python -m <cli_module>` would: forkserver children import the
+# parent's __main__ module again, so whatever the CLI imports at the top is paid per child.
+TIMING_SCRIPT = textwrap.dedent("""
+    import importlib, os, sys, time
+    cli = importlib.import_module(sys.argv[1])
+    sys.modules["__main__"] = cli
+    from src.extraction import run_isolated
+    run_isolated(os.getpid) # Starts the forkserver
+    started = time.perf_counter()
+    for _ in range(3):
+        run_isolated(os.getpid)
+    print((time.perf_counter() - started) / 3)
+    print("src.api" in sys.modules)
+""")
+
+
+def run_from_cli(module):
+    output = subprocess.run(
+        [sys.executable, "-c", TIMING_SCRIPT, module], cwd=ROOT, capture_output=True, text=True, check=True
+    ).stdout.split()
+    return float(output[0]), output[1] == "True"
+
+
+def test_isolated_call_from_batch_cli_does_not_import_the_app():
+    seconds, imports_api = run_from_cli("src.batch")
+    assert not imports_api
+    assert seconds < 0.3
+
+
+def test_isolated_call_from_rereview_cli_does_not_import_the_app():
+    seconds, imports_api = run_from_cli("src.rereview")
+    assert not imports_api
+    assert seconds < 0.3
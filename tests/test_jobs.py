@@ -0,0 +1,100 @@
+import asyncio
+import time
+
+from src.jobs import JobStore, JobWorkerPool, FILE_PENDING, FILE_RUNNING, JOB_COMPLETED
+
+
+def make_store(tmp_path, lease_seconds=900):
+    return JobStore(db_path=str(tmp_path / "jobs.sqlite3"), storage_dir=str(tmp_path / "files"),
+                    lease_seconds=lease_seconds)
+
+
+def enqueue(store, filenames):
+    job_id, _ = store.new_job()
+    store.enqueue_job(job_id, [{"filename": name, "stored_path": None, "content_hash": name} for name in filenames])
+    return job_id
+
+
+def test_stop_returns_in_flight_files_to_the_queue(tmp_path):
+    store = make_store(tmp_path)
+    job_id = enqueue(store, ["a.pdf"])
+    started = asyncio.Event()
+
+    async def process(filename, stored_path, content_hash, job):
+        started.set()
+        await asyncio.sleep(3600) # Still running at shutdown
+
+    async def finalize(job, files):
+        return {}
+
+    async def main():
+        pool = JobWorkerPool(store, process, finalize, concurrency=1, poll_interval=0.01)
+        await pool.start()
+        await asyncio.wait_for(started.wait(), 5)
+        assert store.get_job(job_id)["file_counts"] == {FILE_RUNNING: 1}
+        await pool.stop()
+
+    asyncio.run(main())
+    assert store.get_job(job_id)["file_counts"] == {FILE_PENDING: 1}
+    # A new worker picks the file up at once, without waiting for the lease to expire.
+    assert store.claim_next_file("next-worker")["filename"] == "a.pdf"
+
+
+def test_claim_expire_reclaim(tmp_path):
+    store = make_store(tmp_path, lease_seconds=0.05)
+    job_id = enqueue(store, ["a.pdf", "b.pdf"])
+
+    first = store.claim_next_file("worker-1")
+    second = store.claim_next_file("worker-2")
+    assert (first["filename"], second["filename"]) == ("a.pdf", "b.pdf")
+    assert store.claim_next_file("worker-3") is None # Both files are leased
+
+    time.sleep(0.1) # worker-1 died; its lease runs out
+    reclaimed = store.claim_next_file("worker-3")
+    assert (reclaimed["job_id"], reclaimed["file_index"]) == (job_id, first["file_index"])
+
+
+def test_finalize_once_all_files_are_finished(tmp_path):
+    store = make_store(tmp_path)
+    job_id = enqueue(store, ["a.pdf", "b.pdf"])
+    a = store.claim_next_file("worker")
+    store.complete_file(job_id, a["file_index"], result={"title_of_paper": "A"})
+    assert not store.claim_finalization(job_id) # b.pdf is still pending
+
+    b = store.claim_next_file("worker")
+    store.complete_file(job_id, b["file_index"], failure="b.pdf (No text extracted)")
+    assert store.claim_finalization(job_id)
+    assert not store.claim_finalization(job_id) # Only one finalizer wins
+
+    files = store.get_finished_files(job_id)
+    assert [item["filename"] for item in files] == ["a.pdf", "b.pdf"]
+    store.complete_job(job_id, {"processed": 2})
+    job = store.get_job(job_id)
+    assert job["status"] == JOB_COMPLETED
+    assert job["summary"] == {"processed": 2}
+
+
+def test_pool_processes_and_finalizes_a_job(tmp_path):
+    store = make_store(tmp_path)
+    job_id = enqueue(store, ["a.pdf", "b.pdf", "c.pdf"])
+    summaries = []
+
+    async def process(filename, stored_path, content_hash, job):
+        return {"title_of_paper": filename}, None
+
+    async def finalize(job, files):
+        summaries.append([item["filename"] for item in files])
+        return {"files": len(files)}
+
+    async def main():
+        pool = JobWorkerPool(store, process, finalize, concurrency=2, poll_interval=0.01)
+        await pool.start()
+        for _ in range(500):
+            if store.get_job(job_id)["status"] == JOB_COMPLETED:
+                break
+            await asyncio.sleep(0.01)
+        await pool.stop()
+
+    asyncio.run(main())
+    assert summaries == [["a.pdf", "b.pdf", "c.pdf"]]
+    assert store.get_job(job_id)["summary"] == {"files": 3}
@@ -0,0 +1,17 @@
+from src.metrics import failure_category
+
+
+def test_failure_category_with_parentheses_in_detail():
+    failure = "x.pdf (General error: Expecting value: line 1 column 1 (char 0))"
+    assert failure_category(failure) == "General error"
+
+
+def test_failure_category_with_parentheses_in_filename():
+    assert failure_category("report (final).pdf (No text extracted)") == "No text extracted"
+    assert failure_category("a (1).docx (Timed out: model call exceeded 300s)") == "Timed out"
+
+
+def test_failure_category_without_reason():
+    assert failure_category("x.pdf") == "Unknown"
+    assert failure_category("") == "Unknown"
+    assert failure_category(None) == "Unknown"
@@ -0,0 +1,75 @@
+import asyncio
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import src.packing as packing
+from src.deadlines import check_current_scope, work_scope
+from src.packing import PackedReviewer
+from src.reviewer import PACKED_PROMPT_TEMPLATE, PACKED_PAPER_SEPARATOR, format_packed_paper
+from src.sections import estimate_tokens
+
+
+def fake_review_packed(papers):
+    # Like a real model call: waits a little, then stops if its work scope was cancelled.
+    time.sleep(0.2)
+    check_current_scope()
+    return {key: {"title_of_paper": text} for key, text in papers.items()}
+
+
+def fake_review(text):
+    check_current_scope()
+    return json.dumps({"title_of_paper": text})
+
+
+def test_cancelling_one_packed_paper_does_not_fail_the_others(monkeypatch):
+    monkeypatch.setattr(packing, "review_packed", fake_review_packed)
+    monkeypatch.setattr(packing, "review", fake_review)
+
+    async def main():
+        packer = PackedReviewer(ThreadPoolExecutor(max_workers=2), max_papers=3, max_wait_seconds=0.05)
+        scopes = {}
+
+        async def process(name):
+            # Like process_document: each paper runs under its own work scope.
+            with work_scope() as scope:
+                scopes[name] = scope
+                return await packer.review(name)
+
+        # Paper "a" fills the pack last, so the pack is flushed from its context.
+        tasks = {name: asyncio.create_task(process(name)) for name in ("b", "c")}
+        await asyncio.sleep(0)
+        tasks["a"] = asyncio.create_task(process("a"))
+        await asyncio.sleep(0.05)
+        scopes["a"].cancel("client disconnected")
+        tasks["a"].cancel()
+        return await asyncio.gather(*tasks.values(), return_exceptions=True)
+
+    b, c, a = asyncio.run(main())
+    assert isinstance(a, asyncio.CancelledError)
+    assert json.loads(b) == {"title_of_paper": "b"}
+    assert json.loads(c) == {"title_of_paper": "c"}
+
+
+def test_packs_stay_within_token_budget(monkeypatch):
+    sent = []
+
+    def recording_review_packed(papers):
+        sent.append(PACKED_PROMPT_TEMPLATE.format(
+            count=len(papers), papers=PACKED_PAPER_SEPARATOR.join(format_packed_paper(k, t) for k, t in papers.items())
+        ))
+        return {key: {"title_of_paper": text[:10]} for key, text in papers.items()}
+
+    monkeypatch.setattr(packing, "review_packed", recording_review_packed)
+    monkeypatch.setattr(packing, "review", fake_review)
+
+    async def main():
+        packer = PackedReviewer(ThreadPoolExecutor(max_workers=2), token_budget=600, max_paper_tokens=1000,
+                                max_papers=8, max_wait_seconds=0.05)
+        # Short papers, whose header and footer are a large part of what each adds to the pack.
+        papers = [f"paper {n} " + "word " * 20 for n in range(8)]
+        return await asyncio.gather(*(packer.review(paper) for paper in papers))
+
+    asyncio.run(main())
+    assert sent
+    assert all(estimate_tokens(prompt) <= 600 for prompt in sent)
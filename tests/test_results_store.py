@@ -0,0 +1,77 @@
+import pytest
+
+from src.results_store import ResultsStore, decode_cursor, parse_year
+
+
+def make_result(n, **fields):
+    return {
+        "title_of_paper": f"Paper {n}", "author": "Jane Doe", "year_of_publication": str(2000 + n % 10),
+        "country_of_publication": "Kenya", "estimation_techniques": "OLS", "findings": "Growth rises.",
+        "research_gap": "Few panel studies.", **fields,
+    }
+
+
+@pytest.fixture
+def store(tmp_path):
+    return ResultsStore(str(tmp_path / "results.sqlite3"))
+
+
+def test_cursor_pagination_visits_every_row_once(store):
+    for n in range(23):
+        store.add_result("batch-a", f"p{n}.pdf", f"hash{n}", make_result(n))
+
+    seen = []
+    cursor = None
+    while True:
+        rows, cursor = store.query(limit=10, cursor=cursor)
+        seen.extend(row["source_filename"] for row in rows)
+        if cursor is None:
+            break
+    assert len(seen) == 23
+    assert len(set(seen)) == 23
+    assert seen[0] == "p22.pdf" # Newest first
+
+
+def test_last_page_has_no_cursor(store):
+    for n in range(10):
+        store.add_result("batch-a", f"p{n}.pdf", f"hash{n}", make_result(n))
+    rows, cursor = store.query(limit=10)
+    assert len(rows) == 10
+    assert cursor is None
+
+
+def test_full_text_filters(store):
+    store.add_result("b", "smith.pdf", "h1", make_result(1, author="John Smith", findings="Roads raise output."))
+    store.add_result("b", "doe.pdf", "h2", make_result(2, author="Jane Doe", country_of_publication="Ghana",
+                                                         findings="Ports lower costs."))
+
+    rows, _ = store.query(author="smith")
+    assert [row["source_filename"] for row in rows] == ["smith.pdf"]
+    rows, _ = store.query(q="ports")
+    assert [row["source_filename"] for row in rows] == ["doe.pdf"]
+    rows, _ = store.query(country="ghana", q="roads")
+    assert rows == []
+    # Query syntax in user input is matched as plain words.
+    rows, _ = store.query(author='smith" OR author:"doe')
+    assert rows == []
+
+
+def test_year_and_batch_filters(store):
+    store.add_result("b1", "old.pdf", "h1", make_result(0, year_of_publication="March 1999"))
+    store.add_result("b2", "new.pdf", "h2", make_result(0, year_of_publication="2021"))
+    assert [row["source_filename"] for row in store.query(year_from=2000)[0]] == ["new.pdf"]
+    assert [row["source_filename"] for row in store.query(batch_id="b1")[0]] == ["old.pdf"]
+    assert parse_year("N/A") is None
+
+
+def test_iter_results_is_oldest_first_across_chunks(store):
+    for n in range(7):
+        store.add_result("b", f"p{n}.pdf", f"h{n}", make_result(n))
+    assert [row["source_filename"] for row in store.iter_results(chunk_size=3)] == [f"p{n}.pdf" for n in range(7)]
+
+
+def test_malformed_cursor_is_rejected(store):
+    with pytest.raises(ValueError):
+        store.query(cursor="not-a-cursor")
+    with pytest.raises(ValueError):
+        decode_cursor("e30=") # {}
@@ -0,0 +1,64 @@
+import json
+
+from src.reviewer import review_document, review_overrides, PROMPT_TEMPLATE
+from src.sections import estimate_tokens
+
+
+# The start of every review prompt (map prompts differ).
+REVIEW_PROMPT_START = PROMPT_TEMPLATE.format(paper="")[:80]
+
+
+class RecordingBackend:
+    """Stands in for the model: map calls return long notes, the review call returns a fixed JSON."""
+
+    name = "recording"
+    model_name = "recording-model"
+
+    def __init__(self, note_chars):
+        self.note_chars = note_chars
+        self.prompts = []
+
+    def generate(self, prompt):
+        self.prompts.append(prompt)
+        if prompt.startswith(REVIEW_PROMPT_START):
+            return json.dumps({"title_of_paper": "T"})
+        return "note " * (self.note_chars // 5)
+
+
+def long_paper(paragraphs=400):
+    body = "\n\n".join(f"Paragraph {n} about infrastructure investment and growth. " * 6 for n in range(paragraphs))
+    return (
+        "A Long Paper\nJane Doe\n\nAbstract\n" + "Short abstract. " * 50 +
+        "\n\nIntroduction\n" + body + "\n\nMethodology\n" + body + "\n\nResults\n" + body +
+        "\n\nConclusion\n" + body + "\n\nReferences\n" + "Doe, J. (2020). A reference. " * 200
+    )
+
+
+def review_prompt(backend):
+    prompts = [prompt for prompt in backend.prompts if prompt.startswith(REVIEW_PROMPT_START)]
+    assert len(prompts) == 1
+    return prompts[0]
+
+
+def test_map_reduce_prompt_stays_within_budget_with_long_notes():
+    # Each note alone is bigger than the budget, so regrouping ends with one note that must be cut.
+    backend = RecordingBackend(note_chars=60000)
+    with review_overrides(backend=backend):
+        review_document(long_paper(), token_budget=12000, chunk_tokens=4000, strategy="map_reduce")
+    assert estimate_tokens(review_prompt(backend)) <= 12000
+
+
+def test_map_reduce_prompt_stays_within_budget_with_many_notes():
+    backend = RecordingBackend(note_chars=3000)
+    with review_overrides(backend=backend):
+        review_document(long_paper(), token_budget=12000, chunk_tokens=2000, strategy="map_reduce")
+    prompt = review_prompt(backend)
+    assert "[NOTES ON PART 1]" in prompt
+    assert estimate_tokens(prompt) <= 12000
+
+
+def test_section_trimmed_prompt_stays_within_budget():
+    backend = RecordingBackend(note_chars=0)
+    with review_overrides(backend=backend):
+        review_document(long_paper(), token_budget=6000, strategy="sections")
+    assert estimate_tokens(review_prompt(backend)) <= 6000
@@ -0,0 +1,50 @@
+from src.sections import (
+    detect_sections, estimate_tokens, fit_sections_to_budget, split_into_chunks, truncate_to_tokens,
+    CHARS_PER_TOKEN
+)
+
+
+def paper(paragraph_words=400, paragraphs=10):
+    body = "\n\n".join(" ".join(f"w{n}" for n in range(paragraph_words)) + "." for _ in range(paragraphs))
+    return (
+        "Title\nAuthor\n\nAbstract\nShort abstract.\n\n1. Introduction\n" + body + "\n\n2. Methodology\n" + body +
+        "\n\n3. Results\n" + body + "\n\nAppendix\n" + body + "\n\nReferences\n" + body
+    )
+
+
+def test_detect_sections():
+    names = [section["name"] for section in detect_sections(paper())]
+    assert names == ["front_matter", "abstract", "introduction", "methodology", "results", "appendix", "references"]
+
+
+def test_fit_sections_to_budget_stays_within_budget():
+    sections = detect_sections(paper())
+    for budget in (50, 200, 1000, 5000):
+        text = fit_sections_to_budget(sections, budget)
+        assert estimate_tokens(text) <= budget
+    # Low-value sections are dropped, and every kept section keeps its heading.
+    text = fit_sections_to_budget(sections, 5000)
+    assert "[APPENDIX]" not in text
+    assert "[INTRODUCTION]" in text
+
+
+def test_fit_sections_keeps_text_that_fits():
+    sections = detect_sections("Abstract\nShort.\n\nConclusion\nAlso short.")
+    assert fit_sections_to_budget(sections, 1000) == "[ABSTRACT]\nShort.\n\n[CONCLUSION]\nAlso short."
+
+
+def test_split_into_chunks_stays_within_chunk_size():
+    # One paragraph longer than a chunk and without sentence ends forces the hard cut.
+    sections = detect_sections(paper() + "\n\nConclusion\n" + "x" * 20000)
+    chunks = split_into_chunks(sections, 500)
+    assert len(chunks) > 1
+    assert all(len(chunk) <= 500 * CHARS_PER_TOKEN for chunk in chunks)
+    assert not any("[APPENDIX]" in chunk for chunk in chunks)
+
+
+def test_truncate_to_tokens():
+    text = "word " * 1000
+    assert truncate_to_tokens("short", 10) == "short"
+    cut = truncate_to_tokens(text, 100)
+    assert cut.endswith("[...]")
+    assert estimate_tokens(cut) <= 100
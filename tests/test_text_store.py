@@ -0,0 +1,77 @@
+import hashlib
+import sqlite3
+
+from src.text_store import ExtractedTextStore, SCHEMA_VERSION
+
+
+def content_hash(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def test_old_schema_is_dropped_and_rebuilt(tmp_path):
+    conn = sqlite3.connect(str(tmp_path / "index.sqlite3"))
+    conn.execute(
+        "CREATE TABLE texts (content_hash TEXT PRIMARY KEY, filename TEXT, segment_offset INTEGER NOT NULL, "
+        "record_length INTEGER NOT NULL, text_chars INTEGER NOT NULL, created_at REAL NOT NULL)"
+    )
+    conn.execute("INSERT INTO texts VALUES (?, 'old.pdf', 0, 10, 10, 0)", (content_hash("old"),))
+    conn.commit()
+    conn.close()
+
+    store = ExtractedTextStore(str(tmp_path))
+    assert store.stats()["documents"] == 0
+    assert store.put(content_hash("new"), "pdf", "new.pdf", "new text")
+    assert store.get(content_hash("new"), "pdf") == "new text"
+
+    conn = sqlite3.connect(str(tmp_path / "index.sqlite3"))
+    assert conn.execute("PRAGMA user_version").fetchone()[0] == SCHEMA_VERSION
+    conn.close()
+    # A second process opening the migrated store keeps what is there.
+    assert ExtractedTextStore(str(tmp_path)).get(content_hash("new"), "pdf") == "new text"
+
+
+def test_texts_are_keyed_by_extraction_settings(tmp_path):
+    store = ExtractedTextStore(str(tmp_path))
+    digest = content_hash("paper")
+    assert store.put(digest, "window-a", "p.pdf", "first pages only")
+    assert store.get(digest, "window-a") == "first pages only"
+    # Other settings do not see it, and can store their own text for the same document.
+    assert store.get(digest, "window-b") is None
+    assert store.put(digest, "window-b", "p.pdf", "the whole paper")
+    assert store.get(digest, "window-b") == "the whole paper"
+    # A second put under the same settings is a no-op.
+    assert not store.put(digest, "window-a", "p.pdf", "something else")
+    assert store.get(digest, "window-a") == "first pages only"
+    assert [entry["extraction_settings"] for entry in store.find_documents([digest])] == ["window-a", "window-b"]
+
+
+def test_list_documents_pages_in_segment_order(tmp_path):
+    store = ExtractedTextStore(str(tmp_path))
+    digests = [content_hash(f"paper {n}") for n in range(5)]
+    for n, digest in enumerate(digests):
+        store.put(digest, "pdf", f"p{n}.pdf", f"text {n} " * 100)
+    first = store.list_documents(limit=3)
+    rest = store.list_documents(limit=3, cursor=first[-1]["cursor"])
+    assert [entry["content_hash"] for entry in first + rest] == digests
+    assert store.get(digests[3], "pdf") == "text 3 " * 100
+
+
+def test_invalidate(tmp_path):
+    store = ExtractedTextStore(str(tmp_path))
+    store.put(content_hash("a"), "pdf", "a.pdf", "a")
+    store.put(content_hash("b"), "pdf", "b.pdf", "b")
+    assert store.invalidate(content_hash=content_hash("a")) == 1
+    assert store.get(content_hash("a"), "pdf") is None
+    assert store.get(content_hash("b"), "pdf") == "b"
+    assert store.invalidate() == 1
+    assert store.stats()["documents"] == 0
+
+
+def test_corrupt_record_reads_as_missing(tmp_path):
+    store = ExtractedTextStore(str(tmp_path))
+    digest = content_hash("paper")
+    store.put(digest, "pdf", "p.pdf", "some text " * 50)
+    with open(store.segment_path, "r+b") as f:
+        f.seek(-5, 2)
+        f.write(b"XXXXX")
+    assert ExtractedTextStore(str(tmp_path)).get(digest, "pdf") is None